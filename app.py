@@ -1,5 +1,6 @@
 # @title app.py (최종 수정본)
 import os
+import uuid
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -8,12 +9,13 @@ import time
 from langchain_core.messages import HumanMessage, AIMessage
 
 # 모듈 임포트
-from src.data_loader import RFPDataLoader
-from src.vector_db import RFPVectorDB
-from src.generator import RFPGenerator
-from local_src.local_generator import LocalRFPGenerator
-from src.evaluation import RFPEvaluator
+from src.engine_registry import EngineRegistry
+from src.evaluation import DEFAULT_CONCURRENCY, EvaluationRunner, RFPEvaluator
+from src.eval_store import EvalResultStore
 from src.evaluation_dataset_builder import build_eval_dataset
+from src.rule_judge import RuleBasedJudge
+from src.llm_gateway import gateway
+from src.tracing import tracer
 
 # 그래프 한글 설정
 plt.rcParams['font.family'] = 'Malgun Gothic'
@@ -22,63 +24,59 @@ plt.rcParams['axes.unicode_minus'] = False
 st.set_page_config(page_title="입찰메이트 통합 RAG", page_icon="🏢", layout="wide")
 
 # ==========================================
-# [세션 상태 초기화]
+# [세션 상태 초기화] - 세션에는 대화 기록/평가 결과만 저장
 # ==========================================
-if "initialized_b" not in st.session_state:
+if "history_b" not in st.session_state:
     st.session_state.update({
-        "initialized_b": False, "history_b": [], "gen_b": None,
-        "initialized_a": False, "history_a": [], "gen_a": None,
-        "comparison_results": None, "acc_b": 0, "acc_a": 0, "docs": None,
-        "load_error_b": None, "load_error_a": None
+        "history_b": [], "history_a": [], "conversation_id": uuid.uuid4().hex,
+        "comparison_results": None, "acc_b": 0, "acc_a": 0, "judge_stats": None
     })
 
 
 # ==========================================
-# [자동 엔진 로드]
+# [자동 엔진 로드] - 프로세스 공용 (모든 세션이 같은 엔진 공유)
 # ==========================================
-def auto_initialize():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(base_dir, "DATA", "data_list.csv")
-    db_path_b = os.path.join(base_dir, "chroma_db")
-    db_path_a = os.path.join(base_dir, "local_chroma_db")
-
-    if not os.path.exists(csv_path): return
-
-    # 1. GPT 엔진 자동 로드
-    if not st.session_state.initialized_b and os.path.exists(db_path_b):
-        try:
-            with st.spinner("GPT 엔진 연결 중..."):
-                loader = RFPDataLoader(file_path=csv_path)
-                docs = loader.load(use_summary=False)
-                db = RFPVectorDB(db_path=db_path_b)
-                store = db.create_vector_db(docs, force_rebuild=False)
-                gen_b = RFPGenerator(store)
-                gen_b.init_retriever(docs)
-                st.session_state.initialized_b = True
-                st.session_state.gen_b = gen_b
-                st.session_state.docs = docs
-                st.session_state.load_error_b = None
-        except Exception as e:
-            st.session_state.load_error_b = str(e)
-
-    # 2. 로컬 엔진 자동 로드
-    if not st.session_state.initialized_a and os.path.exists(db_path_a):
-        try:
-            loader = RFPDataLoader(file_path=csv_path)
-            docs = loader.load(use_summary=False)
-            db = RFPVectorDB(db_path=db_path_a)
-            store = db.create_vector_db(docs, force_rebuild=False)
-            gen_a = LocalRFPGenerator(store)
-            gen_a.init_retriever(docs)
-            st.session_state.initialized_a = True
-            st.session_state.gen_a = gen_a
-            st.session_state.docs = docs
-            st.session_state.load_error_a = None
-        except Exception as e:
-            st.session_state.load_error_a = str(e)
-
-
-auto_initialize()
+@st.cache_resource
+def get_engine_registry():
+    return EngineRegistry(os.path.dirname(os.path.abspath(__file__)))
+
+
+@st.cache_resource
+def get_eval_store():
+    # 채점이 끝난 행을 바로 기록 (중단/새로고침 후 이어서 실행, 이전 평가 다시 보기)
+    return EvalResultStore(os.path.join("DATA", ".cache", "eval_results.sqlite"))
+
+
+@st.cache_resource
+def configure_tracing():
+    # RAG_TRACE_DIR를 지정하지 않았으면 DATA/.cache에 단계별 span(JSONL)과 Prometheus 지표 기록
+    if not tracer.jsonl_path:
+        tracer.configure(jsonl_path=os.path.join("DATA", ".cache", "traces.jsonl"),
+                         prometheus_path=os.path.join("DATA", ".cache", "metrics.prom"))
+    return tracer
+
+
+def build_comparison(res_b, res_a, sources):
+    comp = []
+    for b_res, a_res, origin_file in zip(res_b, res_a, sources):
+        comp.append({
+            "파일명": origin_file,
+            "질문": b_res.get('질문') or b_res.get('question'),
+            "정답": b_res.get('정답') or b_res.get('ground_truth'),
+            "GPT": b_res['AI 답변'],
+            "GPT결과": "✅" if b_res['결과'] == "정답" else "❌",
+            "로컬": a_res['AI 답변'],
+            "로컬결과": "✅" if a_res['결과'] == "정답" else "❌"
+        })
+    return comp
+
+
+configure_tracing()
+registry = get_engine_registry()
+eval_store = get_eval_store()
+with st.spinner("엔진 연결 중..."):
+    gen_b = registry.get("b")
+    gen_a = registry.get("a")
 
 st.title("🏢 입찰메이트 통합 RAG 대시보드")
 
@@ -89,29 +87,43 @@ with st.sidebar:
     st.header("⚙️ 엔진 상태")
 
     # GPT 상태
-    if st.session_state.initialized_b:
+    if gen_b:
         st.success("API: 🟢 가동됨")
+        cache_stats = gen_b.answer_cache.stats()
+        st.caption(f"💾 답변 캐시 적중률 {cache_stats['hit_rate'] * 100:.0f}% "
+                   f"(exact {cache_stats['exact_hits']} / semantic {cache_stats['semantic_hits']} / miss {cache_stats['misses']})")
     else:
         st.error("API: 🔴 중단됨")
-        if st.session_state.load_error_b:
-            st.caption(f"⚠️ {st.session_state.load_error_b}")
-        if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma_db")):
+        if registry.errors["b"]:
+            st.caption(f"⚠️ {registry.errors['b']}")
+        if registry.has_db("b"):
             if st.button("🔌 API 긴급 연결"):
-                auto_initialize()
                 st.rerun()
 
     # 로컬 상태
-    if st.session_state.initialized_a:
+    if gen_a:
         st.success("로컬: 🟢 가동됨")
     else:
         st.error("로컬: 🔴 중단됨")
-        if st.session_state.load_error_a:
-            st.caption(f"⚠️ {st.session_state.load_error_a}")
-        if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_chroma_db")):
+        if registry.errors["a"]:
+            st.caption(f"⚠️ {registry.errors['a']}")
+        if registry.has_db("a"):
             if st.button("🔌 로컬 긴급 연결"):
-                auto_initialize()
                 st.rerun()
 
+    with st.expander("⏱️ 단계별 지연 시간"):
+        summary = tracer.stage_summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary).set_index("stage"), use_container_width=True)
+            totals = tracer.totals()
+            st.caption(f"🔢 누적 토큰 입력 {totals['tokens_in']:,} / 출력 {totals['tokens_out']:,} "
+                       f"· 추정 비용 ${totals['cost_usd']:.4f}")
+        else:
+            st.caption("아직 기록된 단계가 없습니다.")
+        gateway_stats = gateway.stats()
+        if gateway_stats:
+            st.caption("🌐 LLM 게이트웨이 " + " · ".join(f"{k} {v}" for k, v in sorted(gateway_stats.items())))
+
     st.divider()
     st.header("🛠️ Vector DB 구축")
     use_summary = st.checkbox("문서 요약을 통한 구축", value=True)
@@ -120,36 +132,29 @@ with st.sidebar:
     with col_b:
         if st.button("API 구축"):
             with st.spinner("GPT DB 재구축 중..."):
-                loader = RFPDataLoader(file_path=os.path.join("DATA", "data_list.csv"))
-                docs = loader.load(use_summary=use_summary)
-                db = RFPVectorDB(db_path="./chroma_db")
-                store = db.create_vector_db(docs, force_rebuild=True)
-                gen_b = RFPGenerator(store)
-                gen_b.init_retriever(docs)
-                st.session_state.update({"gen_b": gen_b, "initialized_b": True})
+                registry.rebuild("b", use_summary=use_summary)
             st.success("완료")
             st.rerun()
 
     with col_a:
         if st.button("로컬 구축"):
             with st.spinner("로컬 DB 재구축 중..."):
-                loader = RFPDataLoader(file_path=os.path.join("DATA", "data_list.csv"))
-                docs = loader.load(use_summary=False)
-                db = RFPVectorDB(db_path="./local_chroma_db")
-                store = db.create_vector_db(docs, force_rebuild=True)
-                gen_a = LocalRFPGenerator(store)
-                gen_a.init_retriever(docs)
-                st.session_state.update({"gen_a": gen_a, "initialized_a": True})
+                registry.rebuild("a", use_summary=False)
             st.success("완료")
             st.rerun()
 
     st.divider()
     st.header("📊 A vs B 성능 비교 평가")
     eval_count = st.number_input("평가 문항 수 (MAX 100)", min_value=1, max_value=100, value=5)
+    with st.expander("동시 실행 설정"):
+        openai_concurrency = st.number_input("OpenAI 동시 호출 수", min_value=1, max_value=32,
+                                             value=DEFAULT_CONCURRENCY["openai"])
+        ollama_concurrency = st.number_input("Ollama 동시 호출 수", min_value=1, max_value=8,
+                                             value=DEFAULT_CONCURRENCY["ollama"])
 
     # --- [수정 완료] 버튼 및 평가 로직 ---
     if st.button("🏁 성능 비교 시작"):
-        if st.session_state.initialized_a and st.session_state.initialized_b:
+        if gen_a and gen_b:
             progress_bar = st.progress(0)
             status_text = st.empty()
 
@@ -165,43 +170,29 @@ with st.sidebar:
                 raw_data = build_eval_dataset(os.path.join("DATA", "data_list.csv"), sample_size=eval_count)
                 test_ds = pd.DataFrame(raw_data)
 
-                # 2. GPT-5 평가
-                status_text.write("🤖 GPT-5 채점 시작...")
-                eval_b = RFPEvaluator(st.session_state.gen_b)
-                try:
-                    acc_b, res_b = eval_b.evaluate(test_ds, progress_callback=lambda p, m: update_progress(p,
-                                                                                                           f"GPT-5 평가 중: {int(p * 100)}%"))
-                except TypeError:
-                    acc_b, res_b = eval_b.evaluate(test_ds)
-
-                # 3. 로컬 평가
-                status_text.write("🏠 로컬 모델 채점 시작...")
-                eval_a = RFPEvaluator(st.session_state.gen_a)
-                try:
-                    acc_a, res_a = eval_a.evaluate(test_ds, progress_callback=lambda p, m: update_progress(p,
-                                                                                                           f"로컬 모델 평가 중: {int(p * 100)}%"))
-                except TypeError:
-                    acc_a, res_a = eval_a.evaluate(test_ds)
+                # 2-3. GPT-5 / 로컬 엔진 동시 평가 (백엔드별 동시 호출 수 제한, 결과는 데이터셋 순서 유지)
+                status_text.write("🤖 GPT-5 / 🏠 로컬 모델 동시 채점 시작...")
+                runner = EvaluationRunner({"openai": openai_concurrency, "ollama": ollama_concurrency})
+                rule_judge = RuleBasedJudge()
+                outcome = runner.run(
+                    {"GPT": RFPEvaluator(gen_b, rule_judge), "로컬": RFPEvaluator(gen_a, rule_judge)},
+                    test_ds,
+                    progress_callback=lambda p, m: update_progress(p, f"{m} ({int(p * 100)}%)"),
+                    store=eval_store,
+                )
+                acc_b, res_b = outcome["GPT"]
+                acc_a, res_a = outcome["로컬"]
 
                 # 4. 결과 통합 (들여쓰기 수정됨: try-except 밖으로 이동하여 무조건 실행)
                 status_text.write("📊 결과 집계 중...")
-                comp = []
-                for i, (b_res, a_res) in enumerate(zip(res_b, res_a)):
-                    origin_file = test_ds.iloc[i].get('source', '파일정보없음')
-                    comp.append({
-                        "파일명": origin_file,
-                        "질문": b_res.get('질문') or b_res.get('question'),
-                        "정답": b_res.get('정답') or b_res.get('ground_truth'),
-                        "GPT": b_res['AI 답변'],
-                        "GPT결과": "✅" if b_res['결과'] == "정답" else "❌",
-                        "로컬": a_res['AI 답변'],
-                        "로컬결과": "✅" if a_res['결과'] == "정답" else "❌"
-                    })
+                sources = [test_ds.iloc[i].get('source', '파일정보없음') for i in range(len(test_ds))]
+                comp = build_comparison(res_b, res_a, sources)
 
                 st.session_state.update({
                     "comparison_results": comp,
                     "acc_b": acc_b,
-                    "acc_a": acc_a
+                    "acc_a": acc_a,
+                    "judge_stats": rule_judge.stats()
                 })
 
                 status_text.success("✅ 평가 완료! 리포트 탭을 확인하세요.")
@@ -211,7 +202,7 @@ with st.sidebar:
                 st.rerun()  # 결과 반영을 위해 화면 새로고침
 
             except Exception as e:
-                st.error(f"평가 중 오류 발생: {e}")
+                st.error(f"평가 중 오류 발생: {e} (완료된 문항은 저장되어 다시 시작하면 이어서 진행합니다)")
         else:
             st.error("⚠️ 두 엔진을 먼저 가동해주세요!")
 
@@ -221,36 +212,73 @@ with st.sidebar:
 t1, t2, t3 = st.tabs(["💬 GPT-5 채팅", "🏠 로컬 채팅", "📊 성능 비교"])
 
 with t1:
-    if st.session_state.initialized_b:
+    if gen_b:
         st.success("✅ GPT-5 준비 완료")
         for m in st.session_state.history_b:
             with st.chat_message("user" if isinstance(m, HumanMessage) else "assistant"):
                 st.write(m.content)
         if p := st.chat_input("GPT에게 질문", key="chat_b"):
+            # 이전 대화를 함께 넘겨 '그 사업 예산은?' 같은 후속 질문 처리
+            history = list(st.session_state.history_b)
             st.session_state.history_b.append(HumanMessage(content=p))
             st.chat_message("user").write(p)
-            ans = st.session_state.gen_b.generate_answer(p)
+            with st.chat_message("assistant"):
+                # 토큰 스트리밍 출력 (첫 토큰 지연 시간 표시)
+                ans = st.write_stream(gen_b.stream_answer(p, history, st.session_state.conversation_id))
+                if gen_b.last_ttft is not None:
+                    st.caption(f"⏱️ 첫 토큰 {gen_b.last_ttft:.2f}초")
             st.session_state.history_b.append(AIMessage(content=ans))
-            st.chat_message("assistant").write(ans)
     else:
         st.warning("GPT 엔진 미작동: 사이드바에서 상태를 확인하세요.")
 
 with t2:
-    if st.session_state.initialized_a:
+    if gen_a:
         st.success("✅ 로컬 Llama3 준비 완료")
         for m in st.session_state.history_a:
             with st.chat_message("user" if isinstance(m, HumanMessage) else "assistant"):
                 st.write(m.content)
         if p := st.chat_input("로컬 모델에게 질문", key="chat_a"):
+            # 이전 대화를 함께 넘겨 '그 사업 예산은?' 같은 후속 질문 처리
+            history = list(st.session_state.history_a)
             st.session_state.history_a.append(HumanMessage(content=p))
             st.chat_message("user").write(p)
-            ans = st.session_state.gen_a.generate_answer(p)
+            with st.chat_message("assistant"):
+                # 토큰 스트리밍 출력 (첫 토큰 지연 시간 표시)
+                ans = st.write_stream(gen_a.stream_answer(p, history, st.session_state.conversation_id))
+                if gen_a.last_ttft is not None:
+                    st.caption(f"⏱️ 첫 토큰 {gen_a.last_ttft:.2f}초")
             st.session_state.history_a.append(AIMessage(content=ans))
-            st.chat_message("assistant").write(ans)
     else:
         st.warning("로컬 엔진 미작동: 사이드바에서 상태를 확인하세요.")
 
 with t3:
+    # 이전 평가 실행 불러오기 (중단된 실행도 완료된 행까지 표시)
+    past_runs = eval_store.list_runs()
+    if past_runs:
+        labels = {
+            run["run_id"]: f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(run['created_at']))} · "
+                           f"{run['size']}문항 · " + " / ".join(f"{n} {c}건" for n, c in run["done"].items())
+            for run in past_runs
+        }
+        c_run, c_load = st.columns([4, 1])
+        selected_run = c_run.selectbox("저장된 평가 실행", list(labels), format_func=labels.get)
+        if c_load.button("불러오기"):
+            outcome = eval_store.load_run(selected_run)
+            if outcome and {"GPT", "로컬"} <= set(outcome):
+                acc_b, res_b = outcome["GPT"]
+                acc_a, res_a = outcome["로컬"]
+                by_question = {r["질문"]: r for r in res_a}
+                res_b = [r for r in res_b if r["질문"] in by_question]
+                res_a = [by_question[r["질문"]] for r in res_b]
+                st.session_state.update({
+                    "comparison_results": build_comparison(res_b, res_a, [r["source"] for r in res_b]),
+                    "acc_b": acc_b,
+                    "acc_a": acc_a,
+                    "judge_stats": None
+                })
+            else:
+                st.warning("GPT/로컬 비교 결과가 아닌 실행입니다.")
+
     if st.session_state.comparison_results:
         st.subheader("🏁 모델 성능 비교 리포트")
         c1, c2 = st.columns([1, 2])  # 비율 조정 (그래프:표)
@@ -273,6 +301,11 @@ with t3:
 
             st.metric("GPT 정확도", f"{st.session_state.acc_b}%")
             st.metric("로컬 정확도", f"{st.session_state.acc_a}%")
+            judge_stats = st.session_state.judge_stats
+            if judge_stats:
+                st.caption(f"규칙 채점 {judge_stats['correct'] + judge_stats['incorrect']}건 / "
+                           f"LLM 채점 {judge_stats['llm']}건 "
+                           f"(LLM 호출 {judge_stats['avoided_ratio'] * 100:.0f}% 절감)")
 
         with c2:
             st.write("### 📋 상세 결과표")
@@ -1,31 +1,22 @@
 # @title local_src/local_generator.py
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.retrievers import BM25Retriever
-
-
-class LocalRFPGenerator:
-    def __init__(self, vector_store=None):
-        # 로컬 Ollama (llama3) 호출
-        self.llm = ChatOllama(model="llama3", temperature=0)
-        self.vector_store = vector_store
-        self.hybrid_retriever = None
-
-    def init_retriever(self, all_documents):
-        if not self.vector_store: return
-        vector_retriever = self.vector_store.as_retriever(search_kwargs={"k": 3})
-
-        try:
-            bm25_retriever = BM25Retriever.from_documents(all_documents)
-            # OpenAI용과 동일하게 하이브리드 구성
-            self.hybrid_retriever = vector_retriever
-            print("🏠 로컬 하이브리드 엔진 준비 완료")
-        except:
-            self.hybrid_retriever = vector_retriever
-
-    def generate_answer(self, query: str) -> str:
-        template = """
+from src.bm25_index import BM25IndexRetriever, documents_fingerprint
+from src.chunking import HierarchicalChunker
+from src.generator import RFPGenerator
+from src.llm_gateway import gateway
+from src.query_router import MetadataQueryRouter
+from src.reranker import CrossEncoderReranker
+
+
+class LocalRFPGenerator(RFPGenerator):
+    BACKEND = "ollama"
+    # llama3 컨텍스트 창(8K)에 프롬프트/대화 기록/답변 여유를 남기도록 더 작게
+    CONTEXT_TOKENS = 1500
+    TOKEN_ENCODING = "cl100k_base"
+    HISTORY_TOKENS = 500
+    # 일괄 질의응답 동시 호출 수 (Ollama는 GPU/CPU 하나를 나눠 씀)
+    BATCH_CONCURRENCY = 2
+    # 프롬프트 외 흐름(fast path, 캐시, 스트리밍)은 RFPGenerator와 동일
+    TEMPLATE = """
         당신은 공공 입찰 분석 전문가입니다. 아래 [문서 내용]을 바탕으로 질문에 답하세요.
 
         [규칙]
@@ -37,11 +28,35 @@ class LocalRFPGenerator:
         [문서 내용]
         {context}
 
+        [이전 대화]
+        {history}
+
         질문: {question}
         답변:
         """
-        prompt = ChatPromptTemplate.from_template(template)
-        docs = self.hybrid_retriever.invoke(query)
-        context = "\n\n".join([d.page_content for d in docs])
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"context": context, "question": query})
\ No newline at end of file
+
+    def _create_llm(self):
+        # 로컬 Ollama (llama3) 호출 - API로 대체하지 않음 (로컬/API 비교 평가가 섞이지 않도록)
+        return gateway.chat("llama3", backend="ollama")
+
+    def init_retriever(self, all_documents, bm25_index_dir: str = None, chunker: HierarchicalChunker = None,
+                       reranker: CrossEncoderReranker = None):
+        if not self.vector_store: return
+        self.store_version = documents_fingerprint(all_documents) if all_documents else None
+        if self.use_router and all_documents:
+            self.metadata_router = MetadataQueryRouter(all_documents)
+        k = self._child_k(reranker)
+        self.vector_retriever = self.vector_store.as_retriever(search_kwargs={"k": k})
+        if not all_documents:
+            self.hybrid_retriever = self.vector_retriever
+            return
+        self._init_docstore(all_documents, chunker)
+
+        try:
+            self.bm25_retriever = BM25IndexRetriever.from_documents(self.docstore.children, index_dir=bm25_index_dir,
+                                                                    k=k)
+            # 답변 검색은 벡터 검색만 사용 (BM25는 검색 벤치마크용)
+            print("🏠 로컬 하이브리드 엔진 준비 완료")
+        except:
+            pass
+        self.hybrid_retriever = self._small_to_big(self.vector_retriever, reranker)
@@ -1,5 +1,6 @@
 import os
 import sys
+import uuid
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage  # 대화 기록용 메시지 객체
 
@@ -30,14 +31,15 @@ def main():
     print("📂 벡터 DB를 연결 중입니다...")
     db_manager = RFPVectorDB(db_path="./chroma_db")
     # 이미 구축된 DB 사용 (빠름)
-    db_manager.create_vector_db(documents, force_rebuild=False)
-    retriever = db_manager.get_retriever()
+    vector_store = db_manager.create_vector_db(documents, force_rebuild=False)
 
     # [3단계] 생성기 초기화
-    generator = RFPGenerator()
+    generator = RFPGenerator(vector_store)
+    generator.init_retriever(documents, bm25_index_dir=os.path.join("./chroma_db", "bm25"), chunker=db_manager.chunker)
 
-    # [핵심] 대화 기록을 저장할 리스트 초기화
+    # [핵심] 대화 기록을 저장할 리스트 초기화 (프롬프트에는 생성기가 토큰 상한까지만 넣음)
     chat_history = []
+    conversation_id = uuid.uuid4().hex
 
     print("\n🚀 시스템 준비 완료! (종료: 'exit')")
     print("💡 팁: '그 사업 예산은 얼마야?' 처럼 이어서 질문해보세요!")
@@ -55,25 +57,25 @@ def main():
 
         print("   🔍 답변 생성 중...")
 
-        # 1. 검색 (Retrieval)
-        relevant_docs = retriever.invoke(user_input)
-
-        # 2. 답변 생성 (Generation) - chat_history 함께 전달!
-        answer = generator.generate_answer(user_input, relevant_docs, chat_history)
-
-        # 3. 결과 출력
+        # 1~2. 검색 + 답변 생성 (토큰 단위 스트리밍 출력)
         print("\n" + "=" * 60)
-        print(f"🤖 입찰메이트 AI:\n{answer}")
+        print("🤖 입찰메이트 AI:")
+        tokens = []
+        for token in generator.stream_answer(user_input, chat_history, conversation_id):
+            tokens.append(token)
+            print(token, end="", flush=True)
+        answer = "".join(tokens)
+
+        # 3. 결과 출력 마무리
+        print()
+        if generator.last_ttft is not None:
+            print(f"   ⏱️ 첫 토큰 {generator.last_ttft:.2f}초")
         print("=" * 60)
 
         # 4. [핵심] 대화 기록 업데이트 (Human: 질문 / AI: 답변)
         chat_history.append(HumanMessage(content=user_input))
         chat_history.append(AIMessage(content=answer))
 
-        # (선택사항) 토큰 절약을 위해 대화 기록이 너무 길면 앞부분 삭제 (최근 10턴만 유지)
-        if len(chat_history) > 20:
-            chat_history = chat_history[-20:]
-
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
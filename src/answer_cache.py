@@ -0,0 +1,123 @@
+# @title src/answer_cache.py
+import re
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional
+
+
+class AnswerCache:
+    """
+    generate_answer 결과 캐시 (LRU + TTL).
+    - 1단계(exact): 정규화한 질문 문자열이 같으면 적중
+    - 2단계(semantic, 선택): 같은 사업(project)에 대한 질문끼리만, 질문 임베딩 코사인 유사도가 임계값 이상이면 적중
+      사업명만 다른 질문("A 사업 예산은?" / "B 사업 예산은?")도 유사도가 높으므로 사업을 모르는 질문은 비교하지 않습니다.
+    벡터 DB(문서 집합) 버전이 바뀌면 전체 무효화됩니다.
+    """
+
+    def __init__(self, embeddings=None, max_size: int = 512, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.97, semantic: bool = False):
+        self.embeddings = embeddings
+        self.semantic = semantic
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version = None
+        self._entries = OrderedDict()  # 정규화 질문 -> (답변, 저장 시각, 정규화 임베딩, 사업 id)
+        self._matrix = None  # semantic 검색용 임베딩 행렬 (변경 시 다시 만듦)
+        self._matrix_keys = []
+        self._matrix_projects = []
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        query = re.sub(r"\s+", " ", query.strip().lower())
+        return re.sub(r"[?!.~\s]+$", "", query)
+
+    def _embed(self, query: str, vector=None) -> Optional[np.ndarray]:
+        """질문 임베딩 (이미 계산한 vector가 있으면 정규화만, semantic을 쓰지 않으면 None)"""
+        if not self.semantic:
+            return None
+        if vector is None:
+            if self.embeddings is None:
+                return None
+            try:
+                vector = self.embeddings.embed_query(query)
+            except Exception:
+                return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._matrix = None
+            self.version = version
+
+    def _expire(self):
+        now = time.time()
+        expired = [k for k, entry in self._entries.items() if now - entry[1] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def get(self, query: str, version=None, vector=None, project: str = None) -> Optional[str]:
+        """:param project: 질문이 가리키는 사업 id (없으면 semantic 비교 생략)"""
+        key = self.normalize(query)
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                return self._entries[key][0]
+
+        vector = self._embed(query, vector) if project is not None else None
+        with self._lock:
+            if vector is not None and self._entries:
+                if self._matrix is None:
+                    self._matrix_keys = [k for k, entry in self._entries.items()
+                                         if entry[2] is not None and entry[3] is not None]
+                    self._matrix_projects = [self._entries[k][3] for k in self._matrix_keys]
+                    self._matrix = (np.stack([self._entries[k][2] for k in self._matrix_keys])
+                                    if self._matrix_keys else None)
+                if self._matrix is not None:
+                    sims = np.where(np.asarray(self._matrix_projects) == project, self._matrix @ vector, -1.0)
+                    best = int(np.argmax(sims))
+                    best_key = self._matrix_keys[best]
+                    if sims[best] >= self.similarity_threshold and best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                        self._stats["semantic_hits"] += 1
+                        return self._entries[best_key][0]
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, query: str, answer: str, version=None, vector=None, project: str = None):
+        key = self.normalize(query)
+        vector = self._embed(query, vector) if project is not None else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (answer, time.time(), vector, project)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["semantic_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
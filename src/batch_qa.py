@@ -0,0 +1,108 @@
+# @title src/batch_qa.py
+"""
+질문 목록 일괄 답변 (분석가가 보내는 수백 개 질문 스프레드시트 등).
+RFPGenerator.generate_answers로 답하고, 끝나는 대로 한 줄씩 CSV/JSONL에 기록합니다.
+
+사용 예:
+    python -m src.batch_qa --engine b --input questions.xlsx --output answers.csv
+    python -m src.batch_qa --engine a --input questions.txt --output answers.jsonl --concurrency 2
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+import threading
+import pandas as pd
+from typing import List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class AnswerWriter:
+    """답변을 완료 순서대로 한 줄씩 기록 (.csv는 엑셀에서 한글이 깨지지 않게 utf-8-sig, 그 외는 JSONL)"""
+    FIELDS = ["index", "question", "answer", "path"]
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        self._lock = threading.Lock()
+        if self.is_csv:
+            self._file = open(path, "w", encoding="utf-8-sig", newline="")
+            self._csv = csv.DictWriter(self._file, fieldnames=self.FIELDS, extrasaction="ignore")
+            self._csv.writeheader()
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, row: dict):
+        with self._lock:
+            if self.is_csv:
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_questions(path: str, column: str = "질문") -> List[str]:
+    """.csv / .xlsx는 column 열(없으면 첫 열), .jsonl은 question/질문 필드, 그 외는 한 줄에 질문 하나"""
+    lower = path.lower()
+    if lower.endswith((".csv", ".xlsx")):
+        if lower.endswith(".xlsx"):
+            df = pd.read_excel(path)
+        else:
+            try:
+                df = pd.read_csv(path, encoding="utf-8")
+            except UnicodeDecodeError:
+                df = pd.read_csv(path, encoding="cp949")
+        series = df[column] if column in df.columns else df.iloc[:, 0]
+        return [str(q).strip() for q in series.dropna() if str(q).strip()]
+    with open(path, "r", encoding="utf-8") as f:
+        if lower.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+            questions = [str(r.get("question") or r.get(column) or "").strip() for r in rows]
+            return [q for q in questions if q]
+        return [line.strip() for line in f if line.strip()]
+
+
+def main(argv=None):
+    from src.engine_registry import EngineRegistry
+
+    parser = argparse.ArgumentParser(description="질문 목록 일괄 답변 (CSV / JSONL로 바로바로 기록)")
+    parser.add_argument("--engine", choices=list(EngineRegistry.ENGINES), default="b",
+                        help="b: GPT 엔진(chroma_db), a: 로컬 엔진(local_mmap_db)")
+    parser.add_argument("--input", required=True, help="질문 파일 (.csv / .xlsx / .jsonl / .txt)")
+    parser.add_argument("--column", default="질문", help="CSV/엑셀의 질문 열 이름")
+    parser.add_argument("--output", required=True, help="결과 파일 (.csv 또는 .jsonl)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="LLM 동시 호출 수 (기본값: 엔진별 BATCH_CONCURRENCY)")
+    args = parser.parse_args(argv)
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    registry = EngineRegistry(base_dir)
+    generator = registry.get(args.engine)
+    if generator is None:
+        print(f"🚨 엔진을 열 수 없습니다: {registry.errors[args.engine] or '벡터 DB가 없습니다. 먼저 DB를 구축하세요.'}")
+        return 1
+
+    questions = read_questions(args.input, args.column)
+    print(f"📋 일괄 답변: 질문 {len(questions)}개 -> {args.output}")
+    generator.generate_answers(questions, output_path=args.output, max_concurrency=args.concurrency,
+                               progress_callback=lambda p, m: print(f"\r⏳ {m} ({int(p * 100)}%)", end="", flush=True))
+    print(f"\n💾 결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
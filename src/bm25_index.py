@@ -0,0 +1,155 @@
+# @title src/bm25_index.py
+import os
+import re
+import json
+import numpy as np
+from collections import Counter
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from src.manifest import content_hash
+
+TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어용 토크나이저.
+    조사/어미가 붙는 한글 어절은 글자 bigram으로 나누고 (예: '발주기관은' -> 발주, 주기, 기관, 관은),
+    영문/숫자는 단어 그대로 사용합니다.
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def documents_fingerprint(documents: List[Document]) -> str:
+    hashes = [d.metadata.get("content_hash") or content_hash(d.page_content) for d in documents]
+    return content_hash("|".join(hashes))[:16]
+
+
+class BM25Index:
+    """
+    BM25 역색인을 단어(term) 기준 CSR 희소 행렬(indptr/indices/data)로 저장합니다.
+    각 값은 미리 계산한 BM25 가중치(idf * tf 정규화)라서, 질의 점수 = 질의 단어 행들의 합입니다.
+    배열은 .npy로 저장되고 로드 시 memory-map 되므로 재시작 시 다시 토큰화할 필요가 없습니다.
+    """
+
+    def __init__(self, vocab: dict, indptr, indices, data, n_docs: int, fingerprint: str,
+                 k1: float = 1.5, b: float = 0.75):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_docs = n_docs
+        self.fingerprint = fingerprint
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, documents: List[Document], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        vocab = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_lens = np.zeros(len(documents), dtype=np.float32)
+
+        for doc_id, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            doc_lens[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+
+        # BM25 가중치 사전 계산
+        n_docs = len(documents)
+        avgdl = float(doc_lens.mean()) if n_docs else 0.0
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * doc_lens[doc_ids] / max(avgdl, 1e-9))
+        weights = idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)
+
+        # term 기준 정렬 -> CSR
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df.astype(np.int64), out=indptr[1:])
+        return cls(vocab, indptr, doc_ids[order], weights[order].astype(np.float32), n_docs,
+                   documents_fingerprint(documents), k1, b)
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, "indptr.npy"), self.indptr)
+        np.save(os.path.join(index_dir, "indices.npy"), self.indices)
+        np.save(os.path.join(index_dir, "data.npy"), self.data)
+        with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"vocab": self.vocab, "n_docs": self.n_docs, "fingerprint": self.fingerprint,
+                       "k1": self.k1, "b": self.b}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["BM25Index"]:
+        meta_path = os.path.join(index_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+                  for name in ("indptr", "indices", "data")]
+        return cls(meta["vocab"], *arrays, meta["n_docs"], meta["fingerprint"], meta["k1"], meta["b"])
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term, qtf in Counter(tokenize(query)).items():
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            # 한 단어 행 안의 문서 번호는 중복이 없으므로 팬시 인덱싱 덧셈으로 충분
+            scores[self.indices[start:end]] += self.data[start:end] * qtf
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """:return: [(문서 번호, 점수), ...] 점수 내림차순, 0점 문서 제외"""
+        scores = self.scores(query)
+        k = min(k, self.n_docs)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+class BM25IndexRetriever:
+    """BM25Retriever와 같은 invoke(query) -> List[Document] 인터페이스"""
+
+    def __init__(self, index: BM25Index, documents: List[Document], k: int = 4):
+        self.index = index
+        self.documents = documents
+        self.k = k
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], index_dir: str = None, k: int = 4) -> "BM25IndexRetriever":
+        """
+        index_dir에 같은 문서 집합으로 만든 인덱스가 있으면 불러오고, 없거나 문서가 바뀌었으면 새로 만들어 저장합니다.
+        """
+        index = BM25Index.load(index_dir) if index_dir else None
+        if index is None or index.fingerprint != documents_fingerprint(documents):
+            index = BM25Index.build(documents)
+            if index_dir:
+                index.save(index_dir)
+                index = BM25Index.load(index_dir)
+        return cls(index, documents, k)
+
+    def invoke_with_scores(self, query: str) -> List[Tuple[Document, float]]:
+        return [(self.documents[i], score) for i, score in self.index.top_k(query, self.k)]
+
+    def invoke(self, query: str) -> List[Document]:
+        return [doc for doc, _ in self.invoke_with_scores(query)]
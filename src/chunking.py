@@ -0,0 +1,206 @@
+# @title src/chunking.py
+import re
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.manifest import content_hash
+
+# data_loader가 '[[문서 정보]]' / '[[AI 요약 정보]]' 헤더와 본문 사이에 넣는 구분선
+HEADER_SEPARATOR = "\n================\n"
+
+# 제안요청서 목차 형식의 제목 줄 (Ⅰ. / 제1장 / 1. / 1.1 / 가.)
+MAJOR_HEADING = re.compile(r"^(?:[ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩⅪⅫ]+|[IVX]{1,4}\s*[.)]|제\s*\d+\s*[장절편])")
+HEADING = re.compile(
+    r"^(?:[ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩⅪⅫ]+|[IVX]{1,4}\s*[.)]|제\s*\d+\s*[장절편]"
+    r"|\d{1,2}(?:\.\d{1,2})+\.?\s+\S|\d{1,2}[.)]\s*\S|[가-하][.)]\s*\S)"
+)
+MAX_HEADING_LEN = 80
+
+
+def split_header(text: str) -> Tuple[str, str]:
+    """문서 → (메타데이터 헤더, 본문)"""
+    if HEADER_SEPARATOR in text:
+        header, body = text.split(HEADER_SEPARATOR, 1)
+        return header.strip(), body
+    return "", text
+
+
+def _clean_heading(line: str) -> str:
+    # HWP 표에서 나온 ' | ' 구분자와 공백 정리
+    return re.sub(r"[\s|]+", " ", line).strip()[:60]
+
+
+class HierarchicalChunker:
+    """
+    small-to-big 청킹.
+    - 본문을 제목 줄 기준 섹션으로 나누고, 섹션을 이어서 겹침(overlap) 없이 child_size 이하의 자식(child) 청크로 나눠
+      임베딩/검색에 사용합니다. 자식 본문 앞에는 사업명과 섹션 제목을 붙여 문서 맥락 없이도 매칭되게 하며,
+      이 접두어까지 child_size 안에 들어가도록 자릅니다.
+    - 앞 자식에 자리가 남으면 다음 섹션의 앞부분으로 채워, 작은 섹션/섹션 끝 조각이 따로 임베딩되지 않게 합니다.
+    - 이어지는 자식들을 parent_size까지 묶어 부모(parent) 청크를 만듭니다 (검색 결과로 돌려주는 단위).
+    - 메타데이터 헤더는 첫 번째 자식 앞에 붙여 함께 검색되고, 검색 결과(부모)를 돌려줄 때 항상 앞에 붙습니다.
+    """
+    VERSION = 2  # 청크 경계 규칙이 바뀌면 올려서 기존 벡터 DB를 다시 구축
+
+    def __init__(self, child_size: int = 1000, parent_size: int = 4000):
+        self.child_size = child_size
+        self.parent_size = parent_size
+        # 앞 자식에 이만큼 이상 자리가 남아 있을 때만 다음 섹션 앞부분으로 채움
+        self.min_fill = child_size // 4
+        self._splitters: Dict[int, RecursiveCharacterTextSplitter] = {}
+
+    def config(self) -> dict:
+        return {"chunker": "hierarchical", "version": self.VERSION, "child_size": self.child_size,
+                "parent_size": self.parent_size}
+
+    def _split_text(self, text: str, size: int) -> List[str]:
+        if size not in self._splitters:
+            self._splitters[size] = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=0)
+        return self._splitters[size].split_text(text)
+
+    def _sections(self, body: str) -> List[Tuple[str, str]]:
+        """[(섹션 제목, 섹션 본문)] - 제목 줄은 본문에도 남깁니다."""
+        sections, lines, title, major = [], [], "", ""
+        for line in body.splitlines():
+            stripped = line.strip()
+            if stripped and len(stripped) <= MAX_HEADING_LEN and HEADING.match(stripped):
+                if any(l.strip() for l in lines):
+                    sections.append((title, "\n".join(lines)))
+                lines = []
+                heading = _clean_heading(stripped)
+                if MAJOR_HEADING.match(stripped):
+                    major = title = heading
+                else:
+                    title = f"{major} > {heading}" if major else heading
+            lines.append(line)
+        if any(l.strip() for l in lines):
+            sections.append((title, "\n".join(lines)))
+        return sections
+
+    @staticmethod
+    def _size(child: dict) -> int:
+        prefix = len(child["prefix"]) + 1 if child["prefix"] else 0
+        return prefix + sum(len(text) for _, text in child["parts"]) + len(child["parts"]) - 1
+
+    def _children(self, header: str, title: str, body: str) -> List[dict]:
+        """
+        자식 청크 목록 [{"section", "prefix", "parts": [(헤더 여부, 본문 조각)]}].
+        헤더는 접두어 없이 맨 앞 조각이 되고, 각 섹션은 '사업명 | 섹션' 접두어를 뺀 크기로 나눠 이어 붙입니다.
+        """
+        items = [("", "", header, True)] if header.strip() else []
+        for section, text in self._sections(body):
+            prefix = " | ".join(x for x in (title, section) if x)[:self.child_size // 2]
+            items.append((section, prefix, text, False))
+
+        children = []
+        for section, prefix, text, is_header in items:
+            last = children[-1] if children else None
+            room = self.child_size - self._size(last) - 1 if last else 0
+            if last and room >= self.min_fill:
+                # 앞 자식의 남은 자리를 이 섹션의 앞부분으로 채움
+                head = next(iter(self._split_text(text, room)), "")
+                if head and head in text:
+                    last["parts"].append((is_header, head))
+                    text = text[text.index(head) + len(head):]
+            budget = self.child_size - (len(prefix) + 1 if prefix else 0)
+            for part in self._split_text(text, budget):
+                last = children[-1] if children else None
+                if last and self._size(last) + 1 + len(part) <= self.child_size:
+                    last["parts"].append((is_header, part))
+                else:
+                    children.append({"section": section, "prefix": prefix, "parts": [(is_header, part)]})
+        return children
+
+    def split(self, doc: Document) -> Tuple[List[Document], List[Tuple[str, str, str]], str]:
+        """
+        :return: (자식 청크 목록, [(parent_id, 섹션 제목, 부모 본문)], 메타데이터 헤더)
+                 자식 metadata에는 chunk_id(doc_id#순번), parent_id, section이 들어갑니다.
+        """
+        doc_id = doc.metadata["doc_id"]
+        header, body = split_header(doc.page_content)
+        title = str(doc.metadata.get("title", "")).strip()
+
+        # 이어지는 자식을 parent_size까지 묶어 부모로 (부모 본문에는 헤더 제외)
+        parents, groups, size = [], [], 0
+        for child in self._children(header, title, body):
+            body_size = sum(len(text) + 1 for is_header, text in child["parts"] if not is_header)
+            if not groups or size + body_size - 1 > self.parent_size:
+                groups.append([])
+                size = 0
+            groups[-1].append(child)
+            size += body_size
+
+        child_docs = []
+        for p, group in enumerate(groups):
+            parent_id = f"{doc_id}#p{p}"
+            body_parts = [text for child in group for is_header, text in child["parts"] if not is_header]
+            section = next((child["section"] for child in group if child["section"]), "")
+            parents.append((parent_id, section, "\n".join(body_parts)))
+            for child in group:
+                text = "\n".join(part for _, part in child["parts"])
+                text = f"{child['prefix']}\n{text}" if child["prefix"] else text
+                metadata = dict(doc.metadata, chunk_id=f"{doc_id}#{len(child_docs)}", parent_id=parent_id,
+                                section=child["section"], content_hash=content_hash(text))
+                child_docs.append(Document(page_content=text, metadata=metadata))
+        return child_docs, parents, header
+
+
+class ParentDocStore:
+    """부모 청크 / 문서 헤더 저장소. 검색된 자식 청크를 '헤더 + 부모 섹션' 문서로 바꿔 돌려줍니다."""
+
+    def __init__(self):
+        self.headers: Dict[str, str] = {}
+        self.metadata: Dict[str, dict] = {}
+        self.parents: Dict[str, Tuple[str, str, str]] = {}  # parent_id -> (doc_id, 섹션 제목, 본문)
+        self.children: List[Document] = []
+        self.children_by_doc: Dict[str, List[Document]] = {}
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], chunker: HierarchicalChunker) -> "ParentDocStore":
+        store = cls()
+        for doc in documents:
+            children, parents, header = chunker.split(doc)
+            doc_id = doc.metadata["doc_id"]
+            store.headers[doc_id] = header
+            store.metadata[doc_id] = doc.metadata
+            for parent_id, section, text in parents:
+                store.parents[parent_id] = (doc_id, section, text)
+            store.children.extend(children)
+            store.children_by_doc[doc_id] = children
+        return store
+
+    def parent_document(self, parent_id: str) -> Optional[Document]:
+        if parent_id not in self.parents:
+            return None
+        doc_id, section, text = self.parents[parent_id]
+        header = self.headers.get(doc_id, "")
+        content = f"{header}{HEADER_SEPARATOR}{text}" if header and text else (header or text)
+        metadata = dict(self.metadata.get(doc_id, {}), parent_id=parent_id, section=section)
+        return Document(page_content=content, metadata=metadata)
+
+    def expand(self, children: List[Document], top_k: int) -> List[Document]:
+        """자식 순위대로 부모를 중복 없이 top_k개. parent_id가 없는 청크(이전 방식 DB)는 그대로 사용."""
+        results, seen = [], set()
+        for child in children:
+            parent_id = child.metadata.get("parent_id")
+            key = parent_id or child.metadata.get("chunk_id") or content_hash(child.page_content)
+            if key in seen:
+                continue
+            seen.add(key)
+            parent = self.parent_document(parent_id) if parent_id else None
+            results.append(parent or child)
+            if len(results) >= top_k:
+                break
+        return results
+
+
+class SmallToBigRetriever:
+    """자식 청크 검색기(벡터/하이브리드) 결과를 부모 섹션 + 문서 헤더로 확장합니다."""
+
+    def __init__(self, child_retriever, docstore: ParentDocStore, top_k: int = 3):
+        self.child_retriever = child_retriever
+        self.docstore = docstore
+        self.top_k = top_k
+
+    def invoke(self, query: str) -> List[Document]:
+        return self.docstore.expand(self.child_retriever.invoke(query), self.top_k)
@@ -0,0 +1,165 @@
+# @title src/context_builder.py
+import re
+import math
+import threading
+from collections import Counter
+from typing import List, Tuple
+from langchain_core.documents import Document
+from src.bm25_index import tokenize
+from src.chunking import HEADER_SEPARATOR, split_header
+
+# 문장 경계: 줄바꿈 또는 마침표/물음표 뒤 공백
+SENTENCE_SPLIT = re.compile(r"\n+|(?<=[.!?])\s+")
+HANGUL = re.compile(r"[가-힣]")
+
+_ENCODINGS = {}
+_ENCODING_LOCK = threading.Lock()
+
+
+def _encoding(name: str):
+    if name not in _ENCODINGS:
+        with _ENCODING_LOCK:
+            if name not in _ENCODINGS:
+                try:
+                    import tiktoken
+                    _ENCODINGS[name] = tiktoken.get_encoding(name)
+                except Exception:
+                    # tiktoken 미설치 또는 폐쇄망(인코딩 파일 다운로드 불가) -> 근사치 사용
+                    _ENCODINGS[name] = None
+    return _ENCODINGS[name]
+
+
+def count_tokens(text: str, encoding: str = "o200k_base") -> int:
+    enc = _encoding(encoding) if encoding else None
+    if enc is not None:
+        return len(enc.encode(text))
+    # 근사: 한글 1글자 ≈ 1토큰, 그 외 4글자 ≈ 1토큰 (실제보다 약간 크게 잡아 예산을 넘지 않게 함)
+    hangul = len(HANGUL.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class ContextBuilder:
+    """
+    검색 결과 -> LLM {context} 문자열 (모델별 토큰 예산 이내).
+    - 문서별 메타데이터 헤더는 한 번만, 항상 맨 앞에 둡니다. 헤더도 예산에 포함되며, 넘치면 검색 순위가 낮은
+      문서의 헤더부터 줄 단위로 자르거나 생략합니다.
+    - 본문은 문장 단위로 나눠 질문과 겹치는 문장만 고르고 (bigram, 후보 내 IDF 가중),
+      MMR(관련도 - 이미 고른 문장과의 유사도)로 중복 문장을 건너뜁니다.
+      겹치는 문장이 하나도 없으면(다른 표현으로 물은 경우) 검색 1위 문서의 앞 문장들을 씁니다.
+    - 고른 문장은 문서 안의 원래 순서대로 이어 붙입니다.
+    """
+
+    def __init__(self, max_tokens: int = 3000, encoding: str = "o200k_base", mmr_lambda: float = 0.7,
+                 duplicate_threshold: float = 0.8, min_sentence_chars: int = 8):
+        self.max_tokens = max_tokens
+        self.encoding = encoding
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.min_sentence_chars = min_sentence_chars
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.encoding)
+
+    def _fit(self, text: str, budget: int) -> str:
+        """text의 앞쪽 줄들을 budget 토큰 이내로 (한 줄도 들어가지 않으면 빈 문자열)"""
+        lines, used = [], 0
+        for line in text.splitlines():
+            cost = self.count(line) + 1
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    def _blocks(self, docs: List[Document]) -> List[dict]:
+        """검색 순위대로 문서별 {header, sentences: [(문서 내 순번, 문장, 토큰 집합)]}"""
+        blocks = {}
+        for rank, doc in enumerate(docs):
+            key = doc.metadata.get("doc_id") or doc.metadata.get("source") or rank
+            header, body = split_header(doc.page_content)
+            block = blocks.setdefault(key, {"header": header, "sentences": []})
+            block["header"] = block["header"] or header
+            for text in SENTENCE_SPLIT.split(body):
+                text = text.strip()
+                if len(text) >= self.min_sentence_chars:
+                    block["sentences"].append((len(block["sentences"]), text, set(tokenize(text))))
+        return list(blocks.values())
+
+    def _select(self, query: str, blocks: List[dict], budget: int) -> List[set]:
+        """블록별로 고른 문장 순번 집합"""
+        query_tokens = set(tokenize(query))
+        candidates = [(b, i, text, tokens) for b, block in enumerate(blocks)
+                      for i, text, tokens in block["sentences"]]
+        df = Counter(t for _, _, _, tokens in candidates for t in tokens & query_tokens)
+        n = len(candidates) or 1
+        idf = {t: math.log(1 + n / df[t]) for t in df}
+        max_score = sum(idf.values()) or 1.0
+
+        # 질문 단어가 하나도 없는 문장은 제외, 관련도 높은 순 + 검색 순위가 높은 문서 우선
+        scored = sorted(((sum(idf[t] for t in tokens & query_tokens) / max_score, b, i, text, tokens)
+                         for b, i, text, tokens in candidates if tokens & query_tokens),
+                        key=lambda x: (-x[0], x[1], x[2]))
+        selected = [set() for _ in blocks]
+        redundancy = [0.0] * len(scored)  # 후보별 '이미 고른 문장과의 최대 유사도' (고를 때마다 갱신)
+        remaining, used = set(range(len(scored))), 0
+        while remaining:
+            best = max((c for c in remaining if redundancy[c] < self.duplicate_threshold),
+                       key=lambda c: (self.mmr_lambda * scored[c][0] - (1 - self.mmr_lambda) * redundancy[c], -c),
+                       default=None)
+            if best is None:
+                break
+            remaining.discard(best)
+            _, b, i, text, tokens = scored[best]
+            cost = self.count(text) + 1
+            if used + cost > budget:
+                continue
+            selected[b].add(i)
+            used += cost
+            for c in remaining:
+                redundancy[c] = max(redundancy[c], _jaccard(scored[c][4], tokens))
+
+        if not any(selected):
+            # 질문과 겹치는 문장이 없음 -> 검색 순위가 가장 높은 문서의 앞 문장들
+            top = next((b for b, block in enumerate(blocks) if block["sentences"]), None)
+            for i, text, _ in blocks[top]["sentences"] if top is not None else []:
+                cost = self.count(text) + 1
+                if used + cost > budget:
+                    break
+                selected[top].add(i)
+                used += cost
+        return selected
+
+    def build(self, query: str, docs: List[Document]) -> Tuple[str, dict]:
+        """
+        :return: (context 문자열, {"tokens", "budget", "source_tokens", "documents", "sentences"})
+        """
+        blocks = self._blocks(docs)
+        # 문서 사이 구분("\n\n") 몫을 먼저 빼고, 헤더는 검색 순위대로 남은 예산 안에서만 넣음
+        budget = self.max_tokens - len(blocks)
+        separator = self.count(HEADER_SEPARATOR)
+        for block in blocks:
+            block["header"] = self._fit(block["header"], budget - separator) if block["header"] else ""
+            if block["header"]:
+                budget -= self.count(block["header"]) + separator
+        selected = self._select(query, blocks, max(budget, 0))
+
+        parts = []
+        for block, chosen in zip(blocks, selected):
+            body = "\n".join(text for i, text, _ in block["sentences"] if i in chosen)
+            if block["header"] and body:
+                parts.append(f"{block['header']}{HEADER_SEPARATOR}{body}")
+            elif block["header"] or body:
+                parts.append(block["header"] or body)
+        context = "\n\n".join(parts)
+        stats = {
+            "tokens": self.count(context),
+            "budget": self.max_tokens,
+            "source_tokens": self.count("\n\n".join(doc.page_content for doc in docs)),
+            "documents": len(blocks),
+            "sentences": sum(len(s) for s in selected),
+        }
+        return context, stats
@@ -0,0 +1,145 @@
+# @title src/conversation.py
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+from src.bm25_index import BM25IndexRetriever
+from src.context_builder import count_tokens
+
+# 앞 대화의 사업을 가리키는 표현 ("그 사업 예산은?", "해당 용역 기간은?", "거기 발주처는?")
+FOLLOWUP_PATTERN = re.compile(
+    r"(?<![가-힣])(?:그|이|저|해당|위|앞의|방금)\s*(?:사업|용역|공고|입찰|과업|문서|프로젝트|건|rfp|RFP)"
+    r"|그거|그것|거기"
+)
+# LLM이 다시 쓴 질문 검증: 이보다 길거나, 여러 줄이거나, 질문 형태가 아니면(답변을 쓴 경우 등) 원문 사용
+MAX_CONDENSED_CHARS = 200
+QUESTION_PATTERN = re.compile(
+    r"[?？]\s*$|무엇|뭐|어디|언제|얼마|누구|어떻게|어떤|어느|왜|몇"
+    r"|(?:까|나요|가요|는지|인지|알려\s*줘|알려\s*주세요)[.\s]*$"
+)
+
+CONDENSE_TEMPLATE = """
+    아래 [이전 대화]와 [후속 질문]을 보고, 후속 질문을 이전 대화 없이도 이해되는 독립된 질문 한 문장으로 다시 쓰세요.
+    '그 사업', '해당 용역' 같은 표현은 이전 대화에 나온 실제 사업명으로 바꾸고, 질문 외의 설명은 쓰지 마세요.
+
+    [이전 대화]
+    {history}
+
+    [후속 질문]
+    {question}
+
+    독립 질문:
+    """
+
+
+def is_followup(query: str) -> bool:
+    return bool(FOLLOWUP_PATTERN.search(query))
+
+
+def clean_condensed(text: str) -> Optional[str]:
+    """LLM이 다시 쓴 독립 질문 -> 쓸 수 있으면 정리한 질문, 아니면 None (비었거나 너무 길거나 질문이 아님)"""
+    text = str(text or "").strip().strip("'\"")
+    if not text or "\n" in text or len(text) > MAX_CONDENSED_CHARS:
+        return None
+    return text if QUESTION_PATTERN.search(text) else None
+
+
+def trim_history(messages: list, max_tokens: int, encoding: str = "o200k_base") -> list:
+    """최근 대화부터 max_tokens까지만 남깁니다 (메시지 개수가 아니라 토큰 기준)."""
+    kept, used = [], 0
+    for message in reversed(messages or []):
+        cost = count_tokens(message.content, encoding) + 4
+        if used + cost > max_tokens:
+            break
+        kept.append(message)
+        used += cost
+    return kept[::-1]
+
+
+def format_history(messages: list) -> str:
+    lines = []
+    for message in messages:
+        role = "사용자" if isinstance(message, HumanMessage) else "AI" if isinstance(message, AIMessage) else "시스템"
+        lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
+
+
+class ConversationState:
+    """대화 하나에서 이미 찾은 문서 (후속 질문은 이 문서들 안에서만 검색)"""
+
+    def __init__(self, doc_ids: List[str], title: str):
+        self.doc_ids = doc_ids
+        self.title = title
+        self.updated = time.time()
+        self._retriever = None
+
+    def condense(self, query: str) -> str:
+        """'그 사업 예산은?' -> '<사업명> 예산은?' (가리키는 표현이 없으면 앞에 사업명을 붙임)"""
+        if not self.title:
+            return query
+        if FOLLOWUP_PATTERN.search(query):
+            return FOLLOWUP_PATTERN.sub(self.title, query, count=1)
+        return f"{self.title} {query}"
+
+    def retriever(self, docstore, k: int) -> Optional[BM25IndexRetriever]:
+        """찾아 둔 문서들의 자식 청크만 색인한 작은 BM25 검색기 (최초 후속 질문 때 한 번 생성, 청크가 없으면 None)"""
+        if self._retriever is None:
+            children = [c for doc_id in self.doc_ids for c in docstore.children_by_doc.get(doc_id, [])]
+            if not children:
+                return None
+            self._retriever = BM25IndexRetriever.from_documents(children, k=k)
+        return self._retriever
+
+
+class ConversationStore:
+    """
+    대화별 상태 저장소 (LRU + TTL). 생성기는 여러 세션이 공유하므로 대화 id로 구분합니다.
+    문서 집합 버전이 바뀌면 저장된 상태를 모두 버립니다.
+    """
+
+    def __init__(self, max_conversations: int = 1024, ttl_seconds: float = 3600):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str, version=None) -> Optional[ConversationState]:
+        if not conversation_id:
+            return None
+        with self._lock:
+            if version != self.version:
+                self._states.clear()
+                self.version = version
+            state = self._states.get(conversation_id)
+            if state is None or time.time() - state.updated > self.ttl_seconds:
+                self._states.pop(conversation_id, None)
+                return None
+            state.updated = time.time()
+            self._states.move_to_end(conversation_id)
+            return state
+
+    def remember(self, conversation_id: str, docs: List[Document], version=None):
+        """
+        검색/라우팅으로 답한 사업을 대화 상태로 기록 (이후 '그 사업'의 대상).
+        결과가 한 사업(doc_id)으로 확정될 때만 기록하고, 여러 사업이 섞여 있으면 기존 상태를 그대로 둡니다.
+        """
+        doc_ids = list(dict.fromkeys(d.metadata.get("doc_id") for d in docs if d.metadata.get("doc_id")))
+        if not conversation_id or len(doc_ids) != 1:
+            return
+        with self._lock:
+            if version != self.version:
+                self._states.clear()
+                self.version = version
+            title = next((str(d.metadata.get("title") or "").strip() for d in docs if d.metadata.get("title")), "")
+            previous = self._states.get(conversation_id)
+            if previous is not None and previous.doc_ids == doc_ids:
+                previous.updated = time.time()
+            else:
+                self._states[conversation_id] = ConversationState(doc_ids, title)
+            self._states.move_to_end(conversation_id)
+            while len(self._states) > self.max_conversations:
+                self._states.popitem(last=False)
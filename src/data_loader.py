@@ -1,140 +1,279 @@
 # src/data_loader.py
 # @title 수정된 RFPDataLoader 전체 코드
 import os
+import time
+import unicodedata
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List
 from tqdm import tqdm
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from src.manifest import content_hash, file_hash
+from src.llm_gateway import gateway
+from src.tracing import traced, tracer
+from src.summarizer import RFPSummarizer
+from src.hwp_reader import extract_text as extract_hwp_text
+from src.snapshot import DocumentSnapshot, source_signature
+
+
+def _load_pdf(file_path: str) -> str:
+    pages = PyPDFLoader(file_path).load()
+    return "\n".join([p.page_content for p in pages])
+
+
+def _load_docx(file_path: str) -> str:
+    pages = Docx2txtLoader(file_path).load()
+    return "\n".join([p.page_content for p in pages])
+
+
+def _load_hwp(file_path: str) -> str:
+    # HWP 5.x 본문(BodyText)을 olefile로 직접 파싱 (외부 변환 없음)
+    return extract_hwp_text(file_path)
+
+
+# 추출 로직(파서, 추출기 매핑)이 바뀌면 올려서 추출 텍스트 캐시와 문서 스냅샷을 무효화
+EXTRACTOR_VERSION = 1
+
+# 확장자별 텍스트 추출기 (워커 프로세스에서 호출되므로 모듈 레벨 함수여야 함)
+EXTRACTORS = {
+    'pdf': _load_pdf,
+    'docx': _load_docx,
+    'doc': _load_docx,
+    'hwp': _load_hwp,
+}
+
+
+def extract_file(file_path: str, clean_ext: str, cache_dir: str) -> dict:
+    """
+    파일 하나의 텍스트를 추출합니다. 파일 내용 해시와 EXTRACTOR_VERSION이 같으면 이전에 추출해 둔 텍스트를 그대로 사용합니다.
+    :return: {"content", "status"(ok/cached/failed), "seconds", "error"}
+    """
+    start = time.perf_counter()
+    try:
+        cache_path = os.path.join(cache_dir, f"{file_hash(file_path)}.{clean_ext}.v{EXTRACTOR_VERSION}.txt")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                content, status = f.read(), "cached"
+        else:
+            content, status = EXTRACTORS[clean_ext](file_path), "ok"
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                f.write(content)
+        return {"content": content, "status": status, "seconds": time.perf_counter() - start, "error": None}
+    except Exception as e:
+        return {"content": "", "status": "failed", "seconds": time.perf_counter() - start, "error": str(e)}
+
+
+def _cell(row, column: str, default):
+    """목록의 빈 칸(NaN)은 기본값으로, numpy 스칼라는 파이썬 값으로 (스냅샷으로 다시 읽어도 같은 메타데이터)"""
+    value = row.get(column, default)
+    if pd.isna(value):
+        return default
+    return value.item() if hasattr(value, "item") else value
+
 
 class RFPDataLoader:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, cache_dir: str = None, max_workers: int = None,
+                 summary_concurrency: int = 8):
         self.csv_path = file_path
         self.base_dir = os.path.dirname(file_path)
         self.files_dir = os.path.join(self.base_dir, "files")
+        # 추출 텍스트 캐시 (파일 해시 기준, 변경되지 않은 파일은 다시 파싱하지 않음)
+        self.cache_dir = cache_dir or os.path.join(self.base_dir, ".cache")
+        self.extract_cache_dir = os.path.join(self.cache_dir, "extracted")
+        # 파일 추출 병렬 워커 수 (None이면 CPU 코어 수)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # 마지막 load()의 파일별 추출 시간/실패 기록
+        self.extraction_report = []
 
-        # 요약을 위한 LLM (빠르고 저렴한 gpt-4o-mini 사용 가정)
+        # 요약을 위한 LLM (공용 게이트웨이: 연결 풀 / 모델별 한도 / 429 재시도 / LLM_FAILOVER=1이면 Ollama 대체)
         # 모델명은 실제 사용 가능한 모델명으로 확인해주세요 (예: gpt-4o-mini, gpt-3.5-turbo 등)
-        self.summary_llm = ChatOpenAI(model="gpt-5", temperature=0)
+        self.summary_llm = gateway.chat("gpt-5")
+        # 비동기 동시 요약 + (내용 해시, 프롬프트 버전, 모델) 키 디스크 캐시
+        # 재시도/백오프는 게이트웨이가 하므로 요약기에서는 다시 재시도하지 않음
+        self.summarizer = RFPSummarizer(
+            self.summary_llm,
+            cache_path=os.path.join(self.cache_dir, "summaries.sqlite"),
+            max_concurrency=summary_concurrency,
+            max_retries=0,
+        )
 
     def summarize_content(self, text: str, meta: dict) -> str:
         """
-        긴 텍스트를 RAG에 넣기 좋게 핵심만 요약합니다.
+        긴 텍스트를 RAG에 넣기 좋게 핵심만 요약합니다. (캐시/재시도 포함)
         """
-        if not text or len(text) < 100:  # 너무 짧으면 요약 안 함
-            return text
-
-        template = """
-        당신은 공공 입찰 문서 전처리 전문가입니다. 
-        아래 문서를 RAG 검색에 최적화되도록 핵심만 요약하세요.
+        return self.summarizer.summarize_many([(text, meta)])[0]
 
-        [필수 포함 정보]
-        1. 문서 파일 형식: 원본 파일의 확장자가 {ext}임을 반드시 명시 (예: "이 문서는 hwp 파일입니다.")
-        2. 사업명: {title}
-        3. 예산 정보: 금액 관련 내용이 있다면 숫자와 단위(원)를 정확히 명시
-        4. 발주 기관: {agency}
-        5. 핵심 요약: 사업의 목적과 주요 과업 내용을 3줄 내외로 요약
+    def _resolve_file_path(self, file_name: str) -> str:
+        """
+        CSV의 파일명(NFC)과 디스크의 파일명(NFD, macOS에서 복사된 경우)이 달라도 찾을 수 있도록 정규화합니다.
+        """
+        for form in ("NFC", "NFD"):
+            candidate = os.path.join(self.files_dir, unicodedata.normalize(form, file_name))
+            if os.path.exists(candidate):
+                return candidate
+        return os.path.join(self.files_dir, file_name)
 
-        [원본 텍스트 일부]
-        {text}
+    @staticmethod
+    def _clean_ext(file_name: str) -> str:
+        # [수정됨] 확장자 추출 로직 개선 (os.path 사용으로 정확도 향상)
+        _, ext_temp = os.path.splitext(file_name)
+        # 점(.)을 제거하고 소문자로 변환 (예: .HWP -> hwp)
+        return ext_temp.lower().replace('.', '') if ext_temp else '알수없음'
 
-        [요약 결과]
+    def _extract_files(self, rows) -> dict:
         """
-        prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | self.summary_llm | StrOutputParser()
+        지원 형식(EXTRACTORS) 파일을 프로세스 풀에서 병렬로 파싱합니다.
+        :return: {행 번호: 추출 텍스트}, 파일별 소요 시간/실패 내역은 self.extraction_report에 기록
+        """
+        jobs = {}
+        for idx, row in enumerate(rows):
+            file_name = str(row.get('파일명', ''))
+            clean_ext = self._clean_ext(file_name)
+            file_path = self._resolve_file_path(file_name)
+            if clean_ext in EXTRACTORS and os.path.exists(file_path):
+                jobs[idx] = (file_name, file_path, clean_ext)
+
+        results = {}
+        if self.max_workers <= 1 or len(jobs) <= 1:
+            for idx, (_, file_path, clean_ext) in jobs.items():
+                results[idx] = extract_file(file_path, clean_ext, self.extract_cache_dir)
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+                futures = {
+                    executor.submit(extract_file, file_path, clean_ext, self.extract_cache_dir): idx
+                    for idx, (_, file_path, clean_ext) in jobs.items()
+                }
+                for future in tqdm(as_completed(futures), total=len(futures), desc="파일 추출 중"):
+                    results[futures[future]] = future.result()
+
+        self.extraction_report = [
+            {"file": jobs[idx][0], "ext": jobs[idx][2], "status": res["status"],
+             "seconds": round(res["seconds"], 3), "error": res["error"]}
+            for idx, res in sorted(results.items())
+        ]
+        failed = [r for r in self.extraction_report if r["status"] == "failed"]
+        if self.extraction_report:
+            total_sec = sum(r["seconds"] for r in self.extraction_report)
+            print(f"📑 파일 추출 {len(self.extraction_report)}건 (실패 {len(failed)}건, 누적 {total_sec:.1f}초)")
+        for r in failed:
+            print(f"⚠️ 추출 실패 (CSV 텍스트 사용): {r['file']} - {r['error']}")
+
+        return {idx: res["content"] for idx, res in results.items() if res["status"] != "failed"}
 
+    def _table_path(self) -> str:
+        """목록 파일 경로 (CSV가 없으면 같은 이름의 Excel 파일 사용)"""
+        if os.path.exists(self.csv_path):
+            return self.csv_path
+        xlsx_path = os.path.splitext(self.csv_path)[0] + ".xlsx"
+        if os.path.exists(xlsx_path):
+            return xlsx_path
+        raise FileNotFoundError(f"CSV 파일을 찾을 수 없습니다: {self.csv_path}")
+
+    @staticmethod
+    def _read_table(table_path: str) -> pd.DataFrame:
+        if table_path.endswith(".xlsx"):
+            return pd.read_excel(table_path)
         try:
-            # 텍스트가 너무 길면 앞부분 4000자만 잘라서 요약 (토큰 비용 절약)
-            return chain.invoke({
-                "text": text[:4000],
-                "title": meta['title'],
-                "agency": meta['agency'],
-                "ext": meta['file_ext'] # 메타데이터 키 변경 반영
-            })
-        except Exception as e:
-            print(f"⚠️ 요약 중 에러 발생 (건너뜀): {e}")
-            return text[:500] + "..."  # 실패 시 원본 앞부분만 반환
-
-    def load(self, use_summary: bool = False) -> List[Document]:
+            return pd.read_csv(table_path, encoding='utf-8')
+        except UnicodeDecodeError:
+            return pd.read_csv(table_path, encoding='cp949')
+
+    def snapshot(self, use_summary: bool) -> DocumentSnapshot:
+        name = "documents_summary.arrow" if use_summary else "documents.arrow"
+        return DocumentSnapshot(os.path.join(self.cache_dir, name))
+
+    def _signature(self, table_path: str, use_summary: bool) -> dict:
+        options = {"use_summary": use_summary, "extractor": EXTRACTOR_VERSION}
+        if use_summary:
+            # 요약 프롬프트/모델이 바뀌면 요약 스냅샷도 다시 만들어야 함
+            options["summary"] = [self.summarizer.PROMPT_VERSION, self.summarizer.model_name]
+        return source_signature(table_path, self.files_dir, **options)
+
+    @traced("load")
+    def load(self, use_summary: bool = False, use_snapshot: bool = True) -> List[Document]:
         """
         :param use_summary: True면 LLM을 통해 내용을 요약 후 저장합니다.
+        :param use_snapshot: True면 원본(목록, 첨부 파일)이 바뀌지 않았을 때 Arrow 스냅샷에서 바로 로드합니다.
         """
-        if not os.path.exists(self.csv_path):
-            raise FileNotFoundError(f"CSV 파일을 찾을 수 없습니다: {self.csv_path}")
+        table_path = self._table_path()
+        snapshot = self.snapshot(use_summary)
+        signature = self._signature(table_path, use_summary)
+        if use_snapshot:
+            start = time.perf_counter()
+            with tracer.span("load.snapshot_read"):
+                cached_docs = snapshot.read(signature)
+            if cached_docs is not None:
+                print(f"⚡ 스냅샷에서 로드 완료! 총 {len(cached_docs)}개 문서. ({time.perf_counter() - start:.2f}초)")
+                return cached_docs
 
-        try:
-            df = pd.read_csv(self.csv_path, encoding='utf-8')
-        except UnicodeDecodeError:
-            df = pd.read_csv(self.csv_path, encoding='cp949')
+        with tracer.span("load.table", path=os.path.basename(table_path)):
+            df = self._read_table(table_path)
 
         all_docs = []
         print(f"📊 총 {len(df)}개의 데이터 처리를 시작합니다... (요약 모드: {'ON' if use_summary else 'OFF'})")
 
-        for idx, row in tqdm(df.iterrows(), total=len(df), desc="문서 로딩 중"):
+        # 1. 파일 경로/확장자 정리 후 원본 파일 파싱을 워커 프로세스에 분배 (CSV 행 순서 유지)
+        rows = [row for _, row in df.iterrows()]
+        with tracer.span("load.extract", files=len(rows)):
+            extracted = self._extract_files(rows)
+
+        records = []
+        for idx, row in enumerate(tqdm(rows, total=len(rows), desc="문서 로딩 중")):
             file_name = str(row.get('파일명', ''))
-            file_path = os.path.join(self.files_dir, file_name)
-
-            # [수정됨] 1. 확장자 추출 로직 개선 (os.path 사용으로 정확도 향상)
-            _, ext_temp = os.path.splitext(file_name)
-            # 점(.)을 제거하고 소문자로 변환 (예: .HWP -> hwp)
-            clean_ext = ext_temp.lower().replace('.', '') if ext_temp else '알수없음'
-
-            # 2. 텍스트 추출 (clean_ext 사용)
-            content = ""
-            # PDF 처리
-            if clean_ext == 'pdf' and os.path.exists(file_path):
-                try:
-                    loader = PyPDFLoader(file_path)
-                    pages = loader.load()
-                    content = "\n".join([p.page_content for p in pages])
-                except Exception:
-                    content = row.get('텍스트', '')
-            # DOCX 처리
-            elif clean_ext in ['docx', 'doc'] and os.path.exists(file_path):
-                try:
-                    loader = Docx2txtLoader(file_path)
-                    pages = loader.load()
-                    content = "\n".join([p.page_content for p in pages])
-                except Exception:
-                    content = row.get('텍스트', '')
-            # HWP 또는 기타 (CSV 텍스트 사용)
-            else:
-                content = row.get('텍스트', '')
+            clean_ext = self._clean_ext(file_name)
+
+            # 2. 텍스트 추출 결과 사용 (파일이 없거나 추출에 실패하면 CSV 텍스트 사용)
+            content = extracted.get(idx) or row.get('텍스트', '')
 
             # 내용 없으면 스킵
             if pd.isna(content) or str(content).strip() == "":
                 continue
 
             # [수정됨] 3. 메타데이터 생성 (file_ext 추가)
+            notice_id = row.get('공고 번호', '')
             metadata = {
+                "doc_id": file_name,  # 증분 적재(매니페스트)용 문서 키
+                "notice_id": "" if pd.isna(notice_id) else str(notice_id).removesuffix(".0"),
                 "source": file_name,
-                "title": row.get('사업명', '무제'),
-                "agency": row.get('발주 기관', '알수없음'),
-                "budget": row.get('사업 금액', 0),
+                "title": _cell(row, '사업명', '무제'),
+                "agency": _cell(row, '발주 기관', '알수없음'),
+                "budget": _cell(row, '사업 금액', 0),
                 "file_ext": clean_ext, # ★ 핵심: 필터링을 위한 정확한 확장자 키
                 "extension": clean_ext # (기존 코드 호환성을 위해 유지)
             }
+            records.append((content, metadata))
 
-            # 4. 요약 모드 적용 여부
+        # 4. 요약 모드 적용 여부 (전체 문서를 한 번에 비동기 요약, 캐시된 문서는 LLM 호출 없음)
+        if use_summary:
+            with tracer.span("load.summarize", documents=len(records)):
+                summaries = self.summarizer.summarize_many(records)
+        else:
+            summaries = [None] * len(records)
+
+        for (content, metadata), summary in zip(records, summaries):
             final_content = ""
             if use_summary:
-                summary = self.summarize_content(content, metadata)
                 final_content = f"[[AI 요약 정보]]\n{summary}\n\n================\n[[원본 상세 내용]]\n{content}"
             else:
                 final_content = (
                     f"[[문서 정보]]\n"
-                    f"- 파일형식: {clean_ext}\n" # clean_ext 사용
+                    f"- 파일형식: {metadata['file_ext']}\n" # clean_ext 사용
                     f"- 사업명: {metadata['title']}\n"
                     f"- 기관: {metadata['agency']}\n"
                     f"- 예산: {metadata['budget']}\n"
                     f"================\n{content}"
                 )
 
+            # 내용 + 메타데이터 해시 (벡터 DB 증분 갱신 시 변경 감지에 사용)
+            metadata["content_hash"] = content_hash(final_content + repr(sorted(metadata.items())))
+
             doc = Document(page_content=final_content, metadata=metadata)
             all_docs.append(doc)
 
+        if use_snapshot and snapshot.available():
+            with tracer.span("load.snapshot_write"):
+                snapshot.write(all_docs, signature)
         print(f"✅ 데이터 로드 완료! 총 {len(all_docs)}개 문서.")
         return all_docs
\ No newline at end of file
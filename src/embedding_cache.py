@@ -0,0 +1,137 @@
+# @title src/embedding_cache.py
+import os
+import sqlite3
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from langchain_core.embeddings import Embeddings
+from src.context_builder import count_tokens
+from src.manifest import content_hash
+from src.tracing import tracer
+
+
+class EmbeddingCache:
+    """(모델, 텍스트 해시) 키로 임베딩 벡터를 float32 바이너리(BLOB)로 저장하는 SQLite 캐시"""
+    LOOKUP_CHUNK = 500  # SQLite 파라미터 개수 제한 대응
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT, text_hash TEXT, vector BLOB, PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), self.LOOKUP_CHUNK):
+                chunk = hashes[i:i + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()],
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 모델 앞단의 캐시 래퍼.
+    캐시에 없는 텍스트만 모아 큰 배치로 나누고, 배치들을 스레드 풀에서 동시에 요청합니다.
+    문서/질문 임베딩은 같은 캐시 파일에 저장하되 키를 분리합니다.
+    (e5처럼 "query: " / "passage: " 접두어를 붙이는 모델은 같은 텍스트라도 질문/문서 벡터가 다름)
+    """
+    # 질문 임베딩은 (모델명 + QUERY_SUFFIX) 키로 저장 (문서 임베딩은 기존처럼 모델명 키)
+    QUERY_SUFFIX = "|query"
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache_path: str,
+                 batch_size: int = 512, max_workers: int = 4):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = EmbeddingCache(cache_path)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.stats = {"hits": 0, "misses": 0}
+
+    @property
+    def query_model_key(self) -> str:
+        return self.model_name + self.QUERY_SUFFIX
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with tracer.span("embed", texts=len(texts)) as span:
+            hashes = [content_hash(t) for t in texts]
+            found = self.cache.get_many(self.model_name, list(set(hashes)))
+
+            # 캐시 미스 텍스트 (중복 제거)
+            missing = {}
+            for h, t in zip(hashes, texts):
+                if h not in found and h not in missing:
+                    missing[h] = t
+            self.stats["hits"] += len(texts) - len(missing)
+            self.stats["misses"] += len(missing)
+            span.set(misses=len(missing))
+
+            if missing:
+                miss_hashes = list(missing)
+                batches = [miss_hashes[i:i + self.batch_size] for i in range(0, len(miss_hashes), self.batch_size)]
+
+                def _embed_batch(batch):
+                    return batch, self.underlying.embed_documents([missing[h] for h in batch])
+
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                    for batch, vectors in executor.map(_embed_batch, batches):
+                        new_items = dict(zip(batch, vectors))
+                        self.cache.put_many(self.model_name, new_items)
+                        found.update({h: np.asarray(v, dtype=np.float32) for h, v in new_items.items()})
+                span.add_tokens(self.model_name, sum(count_tokens(t, "cl100k_base") for t in missing.values()))
+
+            return [found[h].tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        h = content_hash(text)
+        found = self.cache.get_many(self.query_model_key, [h])
+        if h in found:
+            self.stats["hits"] += 1
+            return found[h].tolist()
+
+        self.stats["misses"] += 1
+        with tracer.span("embed.query") as span:
+            vector = self.underlying.embed_query(text)
+            span.add_tokens(self.model_name, count_tokens(text, "cl100k_base"))
+        self.cache.put_many(self.query_model_key, {h: vector})
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        embed_query의 배치 버전 (일괄 질의응답용). 캐시 미스 질문만 한 번에 임베딩합니다.
+        모델에 embed_queries가 없으면 embed_documents 사용 (OpenAI는 질문/문서 임베딩이 같음)
+        """
+        hashes = [content_hash(t) for t in texts]
+        found = self.cache.get_many(self.query_model_key, list(set(hashes)))
+        missing = {h: t for h, t in zip(hashes, texts) if h not in found}
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+        if missing:
+            with tracer.span("embed.query", texts=len(missing)) as span:
+                embed = getattr(self.underlying, "embed_queries", None) or self.underlying.embed_documents
+                new_items = dict(zip(missing, embed(list(missing.values()))))
+                span.add_tokens(self.model_name, sum(count_tokens(t, "cl100k_base") for t in missing.values()))
+            self.cache.put_many(self.query_model_key, new_items)
+            found.update({h: np.asarray(v, dtype=np.float32) for h, v in new_items.items()})
+        return [found[h].tolist() for h in hashes]
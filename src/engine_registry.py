@@ -0,0 +1,107 @@
+# @title src/engine_registry.py
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from src.data_loader import RFPDataLoader
+from src.vector_db import RFPVectorDB
+from src.generator import RFPGenerator
+from src.reranker import CrossEncoderReranker
+from local_src.local_generator import LocalRFPGenerator
+
+
+class EngineRegistry:
+    """
+    프로세스 단위 엔진 레지스트리.
+    문서 로드, BM25 인덱스, Chroma 클라이언트, 생성기를 처음 요청될 때 한 번만 만들고
+    모든 세션(Streamlit 사용자)이 읽기 전용으로 공유합니다. 세션에는 대화 기록만 남깁니다.
+    """
+    # DB 폴더에 남기는 구축 옵션 (요약 문서로 구축했는지 - 재시작 후에도 같은 문서 목록으로 엔진을 열기 위해)
+    BUILD_FILE = "engine_build.json"
+    ENGINES = {
+        "b": {"label": "GPT", "db_dir": "chroma_db", "generator": RFPGenerator,
+              "embedding_backend": "openai", "vector_backend": "chroma"},
+        # 로컬 엔진은 임베딩도 CPU 로컬 모델, 벡터 검색도 프로세스 내장 색인 사용 (네트워크/DB 클라이언트 없음)
+        "a": {"label": "로컬", "db_dir": "local_mmap_db", "generator": LocalRFPGenerator,
+              "embedding_backend": "local", "vector_backend": "mmap"},
+    }
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        self.csv_path = os.path.join(base_dir, "DATA", "data_list.csv")
+        self.loader = RFPDataLoader(file_path=self.csv_path)
+        self._documents: Dict[bool, List[Document]] = {}  # use_summary -> 문서 목록
+        self._engines = {}
+        self.errors = {kind: None for kind in self.ENGINES}
+        self._docs_lock = threading.Lock()
+        self._engine_locks = {kind: threading.Lock() for kind in self.ENGINES}
+        # USE_RERANKER=1이면 두 엔진이 CPU cross-encoder 하나(점수 캐시 포함)를 공유
+        self.reranker = CrossEncoderReranker() if os.getenv("USE_RERANKER") == "1" else None
+
+    def db_path(self, kind: str) -> str:
+        return os.path.join(self.base_dir, self.ENGINES[kind]["db_dir"])
+
+    def has_db(self, kind: str) -> bool:
+        return os.path.exists(self.db_path(kind))
+
+    def documents(self, use_summary: bool = False) -> List[Document]:
+        """CSV/원본 파일 로드는 요약 여부별로 프로세스당 한 번 (같은 설정의 엔진끼리 문서 목록 공유)"""
+        if use_summary not in self._documents:
+            with self._docs_lock:
+                if use_summary not in self._documents:
+                    self._documents[use_summary] = self.loader.load(use_summary=use_summary)
+        return self._documents[use_summary]
+
+    def use_summary(self, kind: str) -> bool:
+        """엔진 DB가 요약 문서로 구축되었는지 (기록이 없으면 원문)"""
+        path = os.path.join(self.db_path(kind), self.BUILD_FILE)
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            return bool(json.load(f).get("use_summary", False))
+
+    def _build(self, kind: str, documents: List[Document], force_rebuild: bool):
+        spec = self.ENGINES[kind]
+        db = RFPVectorDB(db_path=self.db_path(kind), embedding_backend=spec["embedding_backend"],
+                         vector_backend=spec["vector_backend"])
+        store = db.create_vector_db(documents, force_rebuild=force_rebuild)
+        generator = spec["generator"](store)
+        generator.init_retriever(documents, bm25_index_dir=os.path.join(self.db_path(kind), "bm25"),
+                                 chunker=db.chunker, reranker=self.reranker)
+        return generator
+
+    def get(self, kind: str):
+        """
+        이미 구축된 DB가 있으면 엔진을 (최초 1회) 열어서 반환합니다. 실패하면 None, 사유는 self.errors[kind]
+        """
+        if kind in self._engines:
+            return self._engines[kind]
+        if not os.path.exists(self.csv_path) or not self.has_db(kind):
+            return None
+        with self._engine_locks[kind]:
+            if kind not in self._engines:
+                try:
+                    documents = self.documents(self.use_summary(kind))
+                    self._engines[kind] = self._build(kind, documents, force_rebuild=False)
+                    self.errors[kind] = None
+                except Exception as e:
+                    self.errors[kind] = str(e)
+                    return None
+        return self._engines[kind]
+
+    def rebuild(self, kind: str, use_summary: bool = False):
+        """
+        DB를 다시 구축하고 새 엔진으로 교체합니다. 진행 중인 세션은 교체 전 엔진을 계속 사용합니다.
+        요약 여부는 DB 폴더에 기록해 이후 엔진을 열 때(BM25/문서 저장소 포함)도 같은 문서 목록을 씁니다.
+        """
+        with self._engine_locks[kind]:
+            self._engines[kind] = self._build(kind, self.documents(use_summary), force_rebuild=True)
+            if os.path.isdir(self.db_path(kind)):
+                with open(os.path.join(self.db_path(kind), self.BUILD_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"use_summary": use_summary}, f)
+            self.errors[kind] = None
+        return self._engines[kind]
+
+    def status(self, kind: str) -> Tuple[bool, Optional[str]]:
+        return kind in self._engines, self.errors[kind]
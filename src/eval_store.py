@@ -0,0 +1,118 @@
+# @title src/eval_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from src.manifest import content_hash
+
+
+def dataset_hash(rows) -> str:
+    """평가 데이터셋(질문, 정답, 출처 파일) 순서까지 포함한 해시"""
+    return content_hash(json.dumps(
+        [[str(r.get("source", "")), str(r.get("question", "")), str(r.get("ground_truth", ""))] for r in rows],
+        ensure_ascii=False,
+    ))
+
+
+class EvalResultStore:
+    """
+    채점이 끝난 평가 행을 즉시 기록하는 SQLite 저장소.
+    (데이터셋 해시, 엔진 설정 키, 질문) 단위로 저장하므로 중단·재실행 시 완료된 행은 다시 생성/채점하지 않고,
+    이전 평가 실행(run)을 리포트 탭에서 다시 불러올 수 있습니다.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "dataset_hash TEXT, engine_key TEXT, question TEXT, idx INTEGER, source TEXT, "
+            "ground_truth TEXT, answer TEXT, verdict TEXT, created_at REAL, "
+            "PRIMARY KEY (dataset_hash, engine_key, question))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, dataset_hash TEXT, engines TEXT, size INTEGER, created_at REAL)"
+        )
+        self._conn.commit()
+
+    def start_run(self, data_hash: str, engines: Dict[str, str], size: int) -> str:
+        """
+        :param engines: {엔진 이름: 엔진 설정 키}
+        :return: run_id (같은 데이터셋 + 같은 엔진 설정이면 같은 run으로 이어서 실행)
+        """
+        run_id = content_hash(data_hash + json.dumps(engines, sort_keys=True, ensure_ascii=False))[:16]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, dataset_hash, engines, size, created_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, data_hash, json.dumps(engines, ensure_ascii=False), size, time.time()),
+            )
+            self._conn.commit()
+        return run_id
+
+    def completed(self, data_hash: str, engine_key: str) -> Dict[str, dict]:
+        """{질문: 결과 행} - 이미 채점까지 끝난 행"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, ground_truth, answer, verdict FROM results WHERE dataset_hash = ? AND engine_key = ?",
+                (data_hash, engine_key),
+            ).fetchall()
+        return {q: {"질문": q, "정답": gt, "AI 답변": answer, "결과": verdict} for q, gt, answer, verdict in rows}
+
+    def put(self, data_hash: str, engine_key: str, idx: int, source: str, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (dataset_hash, engine_key, question, idx, source, ground_truth, "
+                "answer, verdict, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (data_hash, engine_key, result["질문"], idx, source, str(result["정답"]),
+                 result["AI 답변"], result["결과"], time.time()),
+            )
+            self._conn.commit()
+
+    def list_runs(self) -> List[dict]:
+        """최근 실행 순. 각 run의 엔진별 완료 행 수 포함"""
+        with self._lock:
+            runs = self._conn.execute(
+                "SELECT run_id, dataset_hash, engines, size, created_at FROM runs ORDER BY created_at DESC"
+            ).fetchall()
+            summary = []
+            for run_id, data_hash, engines, size, created_at in runs:
+                engines = json.loads(engines)
+                done = {}
+                for name, engine_key in engines.items():
+                    done[name] = self._conn.execute(
+                        "SELECT COUNT(*) FROM results WHERE dataset_hash = ? AND engine_key = ?",
+                        (data_hash, engine_key),
+                    ).fetchone()[0]
+                summary.append({"run_id": run_id, "dataset_hash": data_hash, "engines": engines,
+                                "size": size, "created_at": created_at, "done": done})
+        return summary
+
+    def load_run(self, run_id: str) -> Optional[dict]:
+        """
+        :return: {엔진 이름: (정확도 %, 데이터셋 순서 결과 목록)}, 각 결과에는 source(파일명) 포함
+        """
+        with self._lock:
+            run = self._conn.execute(
+                "SELECT dataset_hash, engines, size FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return None
+            data_hash, engines, size = run
+            outcome = {}
+            for name, engine_key in json.loads(engines).items():
+                rows = self._conn.execute(
+                    "SELECT source, question, ground_truth, answer, verdict FROM results "
+                    "WHERE dataset_hash = ? AND engine_key = ? ORDER BY idx",
+                    (data_hash, engine_key),
+                ).fetchall()
+                results = [{"source": source, "질문": q, "정답": gt, "AI 답변": answer, "결과": verdict}
+                           for source, q, gt, answer, verdict in rows]
+                correct = sum(r["결과"] == "정답" for r in results)
+                outcome[name] = ((correct / size) * 100 if size else 0.0, results)
+        return outcome
@@ -1,20 +1,44 @@
 # @title src/evaluation.py
+import json
+import threading
 import pandas as pd
-from langchain_openai import ChatOpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from src.eval_store import EvalResultStore, dataset_hash
+from src.context_builder import count_tokens
+from src.llm_gateway import gateway
+from src.manifest import content_hash
+from src.tracing import current_span, tracer
+from src.rule_judge import RuleBasedJudge
 
 load_dotenv()
 
+# 백엔드별 동시 호출 수 (OpenAI API는 넉넉히, 로컬 Ollama는 GPU/CPU 하나를 나눠 쓰므로 작게)
+DEFAULT_CONCURRENCY = {"openai": 8, "ollama": 2}
+
 
 class RFPEvaluator:
-    def __init__(self, generator):
+    # 채점 LLM 백엔드
+    JUDGE_BACKEND = "openai"
+
+    def __init__(self, generator, rule_judge: RuleBasedJudge = None):
         self.generator = generator
-        # 채점은 가장 똑똑하고 저렴한 모델로 수행
-        self.judge_llm = ChatOpenAI(model="gpt-5", temperature=0)
+        self.backend = getattr(generator, "BACKEND", "openai")
+        # 예산/기관/확장자 질문은 규칙으로 먼저 채점하고, 애매한 경우만 LLM 호출
+        self.rule_judge = rule_judge or RuleBasedJudge()
+        # 채점은 가장 똑똑하고 저렴한 모델로 수행 (채점 기준이 바뀌지 않도록 다른 모델로 대체하지 않음)
+        self.judge_llm = gateway.chat("gpt-5", fallback=False)
 
     def _judge_answer(self, question, ground_truth, ai_answer):
+        verdict = self.rule_judge.judge(question, ground_truth, ai_answer)
+        span = current_span()
+        if verdict is not None:
+            if span:
+                span.set(judge="rule")
+            return "정답" if verdict else "오답"
+
         judge_template = """
         당신은 입찰 문서 분석 시스템의 유연한 채점관입니다.
         [질문]에 대한 [AI 답변]이 [실제 정답]과 맥락상 일치하거나, 질문의 의도를 더 잘 파악했다면 "정답" 처리하세요.
@@ -39,44 +63,150 @@ class RFPEvaluator:
         prompt = ChatPromptTemplate.from_template(judge_template)
         chain = prompt | self.judge_llm | StrOutputParser()
 
-        return chain.invoke({
+        inputs = {
             "question": question,
             "ground_truth": str(ground_truth),
             "ai_answer": ai_answer
-        })
-
-    def evaluate(self, dataset: pd.DataFrame, progress_callback=None):
-        results = []
-        correct_count = 0
-        total = len(dataset)
-
-        for i, row in dataset.iterrows():
+        }
+        result = chain.invoke(inputs)
+        if span:
+            span.set(judge="llm")
+            span.add_tokens(self.judge_llm.model_name, count_tokens(prompt.format(**inputs)), count_tokens(result))
+        return result
+
+    def evaluate(self, dataset: pd.DataFrame, progress_callback=None, concurrency: dict = None):
+        """
+        :param concurrency: 백엔드별 동시 호출 수 (기본값 DEFAULT_CONCURRENCY). {"openai": 1}이면 기존처럼 순차 실행
+        :return: (정확도 %, 데이터셋 행 순서대로의 결과 목록)
+        """
+        return EvaluationRunner(concurrency).run({"_": self}, dataset, progress_callback)["_"]
+
+    def judge_stats(self) -> dict:
+        """규칙 채점 정답/오답 수, LLM 채점 호출 수, LLM 호출 생략 비율(avoided_ratio)"""
+        return self.rule_judge.stats()
+
+    def config_key(self) -> str:
+        """엔진 설정 키 (생성기 종류, 모델, 프롬프트, 문서 집합 버전, 검색 설정, 채점 모델) - 하나라도 바뀌면 새로 평가"""
+        llm = getattr(self.generator, "llm", None)
+        config = {
+            "generator": type(self.generator).__name__,
+            "model": getattr(llm, "model_name", None) or getattr(llm, "model", None),
+            "template": content_hash(getattr(self.generator, "TEMPLATE", "")),
+            "store_version": getattr(self.generator, "store_version", None),
+            "retrieval": self.generator.retrieval_config() if hasattr(self.generator, "retrieval_config") else None,
+            "judge": self.judge_llm.model_name,
+            "rules": RuleBasedJudge.VERSION,
+            # 라우터/답변 캐시 없이 생성한 답변만 채점 (이전에 저장된 라우터 답변 결과는 재사용하지 않음)
+            "bypass": ["router", "answer_cache"],
+        }
+        return content_hash(json.dumps(config, sort_keys=True, ensure_ascii=False))[:16]
+
+
+class EvaluationRunner:
+    """
+    여러 엔진(RFPEvaluator)을 같은 데이터셋으로 동시에 평가합니다.
+    답변 생성과 채점 호출은 각 백엔드(openai / ollama) 세마포어 안에서만 실행되므로
+    로컬 모델은 적게, API 모델은 많이 동시에 돌리면서도 결과는 데이터셋 순서를 유지합니다.
+    """
+
+    def __init__(self, concurrency: dict = None):
+        self.concurrency = dict(DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.run_id = None
+        self._slots = {backend: threading.Semaphore(n) for backend, n in self.concurrency.items()}
+
+    def _slot(self, backend: str) -> threading.Semaphore:
+        if backend not in self._slots:
+            self._slots[backend] = threading.Semaphore(1)
+        return self._slots[backend]
+
+    def _run_row(self, evaluator: RFPEvaluator, question, ground_truth) -> dict:
+        # 생성 슬롯을 반납한 뒤 채점 슬롯을 잡음 (같은 백엔드여도 교착 없음)
+        with tracer.span("eval.row", engine=evaluator.backend) as span:
+            with self._slot(evaluator.backend):
+                # 라우터(정답 CSV와 같은 메타데이터)와 답변 캐시를 거치지 않고 실제 검색 + 생성 결과를 채점
+                ai_answer = evaluator.generator.generate_answer(question, use_router=False, use_cache=False)
+            with self._slot(evaluator.JUDGE_BACKEND), tracer.span("eval.judge"):
+                result_text = evaluator._judge_answer(question, ground_truth, ai_answer)
+        row = {
+            "질문": question,
+            "정답": ground_truth,
+            "AI 답변": ai_answer,
+            "결과": "정답" if "정답" in result_text else "오답"
+        }
+        if span.attrs.get("failover"):
+            # 대체 모델이 답한 행 (저장소에 기록하지 않아 다음 실행에서 다시 평가)
+            row["_failover"] = True
+        return row
+
+    def run(self, evaluators: dict, dataset: pd.DataFrame, progress_callback=None,
+            store: EvalResultStore = None) -> dict:
+        """
+        :param evaluators: {엔진 이름: RFPEvaluator}
+        :param progress_callback: (진행률, 메시지) - 호출 스레드(Streamlit 스크립트 스레드)에서만 호출됩니다.
+        :param store: 주면 채점이 끝난 행을 바로 기록하고, 이미 기록된 행은 건너뜁니다 (중단 후 이어서 실행)
+        :return: {엔진 이름: (정확도 %, 결과 목록)}, store를 주면 self.run_id에 실행 id 기록
+        """
+        rows = []
+        for _, row in dataset.iterrows():
             # 컬럼명 호환성 처리 (한글/영어)
             question = row.get('질문') or row.get('question')
             ground_truth = row.get('정답') or row.get('ground_truth')
-
-            if not question: continue
-
-            # AI 답변 생성
-            ai_answer = self.generator.generate_answer(question)
-
-            # 유연한 채점
-            result_text = self._judge_answer(question, ground_truth, ai_answer)
-            is_correct = "정답" in result_text
-
-            if is_correct:
-                correct_count += 1
-
-            results.append({
-                "질문": question,
-                "정답": ground_truth,
-                "AI 답변": ai_answer,
-                "결과": "정답" if is_correct else "오답"
-            })
-
-            # 진행률 콜백
-            if progress_callback:
-                progress_callback((i + 1) / total, f"채점 중: {i + 1}/{total}")
-
-        accuracy = (correct_count / total) * 100
-        return accuracy, results
\ No newline at end of file
+            if question:
+                rows.append((question, ground_truth, str(row.get('source', ''))))
+
+        # 질문이 빈 행은 채점 대상이 아니므로 정확도 분모에서도 제외
+        total = len(rows)
+        results = {name: [None] * len(rows) for name in evaluators}
+        pending = {name: list(range(len(rows))) for name in evaluators}
+
+        data_hash, engine_keys = None, {}
+        if store is not None:
+            data_hash = dataset_hash(dataset.to_dict("records"))
+            engine_keys = {name: evaluator.config_key() for name, evaluator in evaluators.items()}
+            self.run_id = store.start_run(data_hash, engine_keys, total)
+            for name in evaluators:
+                completed = store.completed(data_hash, engine_keys[name])
+                for idx, (question, _, _) in enumerate(rows):
+                    if question in completed:
+                        results[name][idx] = completed[question]
+                pending[name] = [idx for idx in pending[name] if results[name][idx] is None]
+
+        done = {name: len(rows) - len(pending[name]) for name in evaluators}
+        jobs = sum(len(p) for p in pending.values())
+        workers = max(1, min(sum(self.concurrency.values()), jobs))
+        errors = []
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {
+                executor.submit(self._run_row, evaluators[name], rows[idx][0], rows[idx][1]): (name, idx)
+                for name, indices in pending.items()
+                for idx in indices
+            }
+            for future in as_completed(futures):
+                name, idx = futures[future]
+                try:
+                    results[name][idx] = future.result()
+                except Exception as e:
+                    # 실패한 행만 빠지고 나머지는 계속 기록 (다시 실행하면 실패한 행부터 이어서)
+                    errors.append(e)
+                    continue
+                if store is not None and not results[name][idx].pop("_failover", False):
+                    store.put(data_hash, engine_keys[name], idx, rows[idx][2], results[name][idx])
+                done[name] += 1
+                # 진행률 콜백 (실패한 행은 세지 않음)
+                if progress_callback:
+                    if len(evaluators) == 1:
+                        progress = f"{done[name]}/{len(rows)}"
+                    else:
+                        progress = " · ".join(f"{n} {c}/{len(rows)}" for n, c in done.items())
+                    progress_callback(sum(done.values()) / (len(rows) * len(evaluators)), f"채점 중: {progress}")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if errors:
+            raise errors[0]
+        return {
+            name: ((sum(r["결과"] == "정답" for r in res) / total) * 100 if total else 0.0, res)
+            for name, res in results.items()
+        }
@@ -1,57 +1,110 @@
 # @title src/generator.py (출력 형식 최적화)
-import sys
-from langchain_openai import ChatOpenAI
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.retrievers import BM25Retriever
+from src.bm25_index import BM25IndexRetriever, documents_fingerprint
+from src.answer_cache import AnswerCache
+from src.batch_qa import AnswerWriter
+from langchain_core.documents import Document
+from src.chunking import HierarchicalChunker, ParentDocStore, SmallToBigRetriever
+from src.context_builder import ContextBuilder
+from src.conversation import (CONDENSE_TEMPLATE, ConversationStore, clean_condensed, format_history, is_followup,
+                              trim_history)
+from src.reranker import CrossEncoderReranker, RerankingRetriever
+from src.manifest import content_hash
+from src.llm_gateway import gateway
+from src.query_router import MetadataQueryRouter
+from src.tracing import current_span, tracer
+
+
+# BM25 / 벡터 검색을 동시에 실행하기 위한 공용 스레드 풀 (요청마다 풀을 만들지 않음)
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-retrieval")
+
+
+def doc_key(doc) -> str:
+    """결과 병합용 키: 청크 id > 문서 id > 본문 해시"""
+    return (doc.metadata.get("chunk_id") or getattr(doc, "id", None)
+            or doc.metadata.get("doc_id") or content_hash(doc.page_content))
 
 
 # 라이브러리 의존성 없이 작동하는 하이브리드 검색기
 class SimpleHybridRetriever:
-    def __init__(self, vector_retriever, bm25_retriever):
+    """
+    BM25와 벡터 검색을 병렬로 실행하고 결과를 융합합니다.
+    - fusion="rrf": Reciprocal Rank Fusion, 점수 = Σ weight / (rrf_k + 순위)
+    - fusion="weighted": 검색기별 점수를 min-max 정규화한 뒤 가중합
+    """
+
+    def __init__(self, vector_retriever, bm25_retriever, fusion: str = "rrf", weights=(0.5, 0.5),
+                 rrf_k: int = 60, top_k: int = 5):
         self.vector_retriever = vector_retriever
         self.bm25_retriever = bm25_retriever
+        self.fusion = fusion
+        self.weights = weights  # (bm25, vector)
+        self.rrf_k = rrf_k
+        self.top_k = top_k
 
-    def invoke(self, query):
-        try:
-            bm25_docs = self.bm25_retriever.invoke(query)
-        except:
-            bm25_docs = []
-        vector_docs = self.vector_retriever.invoke(query)
+    @staticmethod
+    def _search(retriever, query, name: str = "search"):
+        """[(문서, 점수)] 반환. 점수를 주지 않는 검색기는 순위 기반 점수 사용."""
+        with tracer.span(f"retrieve.{name}"):
+            return SimpleHybridRetriever._search_scored(retriever, query)
 
-        combined_docs = []
-        seen_content = set()
-        for doc in bm25_docs + vector_docs:
-            if doc.page_content not in seen_content:
-                combined_docs.append(doc)
-                seen_content.add(doc.page_content)
-        return combined_docs[:5]
+    @staticmethod
+    def _search_scored(retriever, query):
+        try:
+            if hasattr(retriever, "invoke_with_scores"):
+                return retriever.invoke_with_scores(query)
+            if hasattr(retriever, "vectorstore"):
+                # Chroma 점수는 거리(작을수록 유사)이므로 부호를 바꿔 큰 값이 상위가 되게 함
+                k = retriever.search_kwargs.get("k", 4)
+                return [(doc, -dist) for doc, dist in retriever.vectorstore.similarity_search_with_score(query, k=k)]
+            return [(doc, 1.0 / (rank + 1)) for rank, doc in enumerate(retriever.invoke(query))]
+        except Exception as e:
+            print(f"⚠️ 검색 실패 (건너뜀): {e}")
+            return []
 
+    def _fuse(self, ranked_lists):
+        fused, docs = {}, {}
+        for weight, results in zip(self.weights, ranked_lists):
+            if not results:
+                continue
+            scores = [score for _, score in results]
+            low, high = min(scores), max(scores)
+            for rank, (doc, score) in enumerate(results):
+                key = doc_key(doc)
+                docs.setdefault(key, doc)
+                if self.fusion == "weighted":
+                    norm = (score - low) / (high - low) if high > low else 1.0
+                    fused[key] = fused.get(key, 0.0) + weight * norm
+                else:
+                    fused[key] = fused.get(key, 0.0) + weight / (self.rrf_k + rank + 1)
+        ranked = sorted(fused, key=lambda key: fused[key], reverse=True)
+        return [docs[key] for key in ranked[:self.top_k]]
 
-class RFPGenerator:
-    def __init__(self, vector_store=None):
-        self.llm = ChatOpenAI(model="gpt-5-mini", temperature=0)
-        self.vector_store = vector_store
-        self.hybrid_retriever = None
+    def fuse_with_vector_results(self, query, vector_results):
+        """벡터 검색 결과를 미리 (일괄로) 구한 경우 BM25만 실행해 융합"""
+        with tracer.span("retrieve.bm25"):
+            bm25_results = self._search_scored(self.bm25_retriever, query)
+        return self._fuse([bm25_results, vector_results])
 
-    def init_retriever(self, all_documents):
-        if not self.vector_store: return
-        vector_retriever = self.vector_store.as_retriever(search_kwargs={"k": 3})
-        if not all_documents:
-            self.hybrid_retriever = vector_retriever
-            return
-        try:
-            bm25_retriever = BM25Retriever.from_documents(all_documents)
-            self.hybrid_retriever = SimpleHybridRetriever(vector_retriever, bm25_retriever)
-            print("🚀 하이브리드 검색기 가동")
-        except:
-            self.hybrid_retriever = vector_retriever
+    def invoke(self, query):
+        # 두 검색을 동시에 실행 -> 지연 시간은 둘 중 느린 쪽
+        bm25_future = _RETRIEVAL_POOL.submit(tracer.wrap(self._search), self.bm25_retriever, query, "bm25")
+        vector_future = _RETRIEVAL_POOL.submit(tracer.wrap(self._search), self.vector_retriever, query, "vector")
+        return self._fuse([bm25_future.result(), vector_future.result()])
 
-    def generate_answer(self, query: str, chat_history: list = None) -> str:
-        if not self.hybrid_retriever: return "검색기 미초기화"
 
-        # [수정 포인트] 지시 사항을 더 명확하게 변경
-        template = """
+class RFPGenerator:
+    # LLM 호출 백엔드 (평가 러너의 백엔드별 동시 실행 제한 키)
+    BACKEND = "openai"
+    # [수정 포인트] 지시 사항을 더 명확하게 변경
+    TEMPLATE = """
         당신은 공공 입찰 제안요청서(RFP) 분석 전문가입니다. 
         반드시 아래 [Context]의 내용만을 근거로 답변하되, 다음 규칙을 엄격히 지키세요.
 
@@ -64,17 +117,453 @@ class RFPGenerator:
         [Context]
         {context}
 
+        [이전 대화]
+        {history}
+
         [질문]
         {question}
 
         답변:
         """
-        prompt = ChatPromptTemplate.from_template(template)
 
+    # 질문당 {context} 토큰 상한 (프롬프트 크기 = 지연 시간/비용) 및 토큰 계산용 tiktoken 인코딩
+    CONTEXT_TOKENS = 3000
+    TOKEN_ENCODING = "o200k_base"
+    # 프롬프트에 넣는 이전 대화 토큰 상한 (최근 대화부터)
+    HISTORY_TOKENS = 1000
+
+    def __init__(self, vector_store=None, use_router: bool = True, answer_cache: AnswerCache = None):
+        self.llm = self._create_llm()
+        self.vector_store = vector_store
+        # 개별 검색기 (검색 벤치마크에서 따로 측정) + 실제 답변에 쓰는 검색기
+        self.vector_retriever = None
+        self.bm25_retriever = None
+        self.hybrid_retriever = None
+        # 부모 섹션 / 문서 헤더 저장소, (선택) 재순위화 모델 (init_retriever에서 구성)
+        self.chunker = None
+        self.docstore = None
+        self.reranker = None
+        # 예산/발주 기관/확장자 질문은 메타데이터로 바로 답변 (검색 + LLM 호출 생략)
+        self.use_router = use_router
+        self.metadata_router = None
+        # 답변 캐시 (exact, ANSWER_CACHE_SEMANTIC=1이면 같은 사업 질문끼리 semantic). 문서 집합 버전이 바뀌면 무효화
+        self.answer_cache = answer_cache or AnswerCache(embeddings=getattr(vector_store, "embeddings", None),
+                                                        semantic=os.getenv("ANSWER_CACHE_SEMANTIC") == "1")
+        self.store_version = None
+        self.context_builder = ContextBuilder(max_tokens=self.CONTEXT_TOKENS, encoding=self.TOKEN_ENCODING)
+        # 대화별로 이미 찾은 문서 (후속 질문은 전체 검색 없이 이 문서 안에서 검색)
+        self.conversations = ConversationStore()
+        # 생성기는 여러 세션(스레드)이 공유하므로 요청별 값은 스레드 로컬에 저장
+        self._local = threading.local()
+
+    @property
+    def last_ttft(self):
+        """현재 스레드의 마지막 스트리밍 응답에서 첫 토큰까지 걸린 시간(초)"""
+        return getattr(self._local, "ttft", None)
+
+    @last_ttft.setter
+    def last_ttft(self, value):
+        self._local.ttft = value
+
+    @property
+    def last_context_stats(self):
+        """현재 스레드의 마지막 질문에 보낸 context 토큰 통계 (ContextBuilder.build 참고)"""
+        return getattr(self._local, "context_stats", None)
+
+    @last_context_stats.setter
+    def last_context_stats(self, value):
+        self._local.context_stats = value
+
+    def _create_llm(self):
+        # 공용 게이트웨이 (LLM_FAILOVER=1이면 OpenAI 장애/한도 초과가 계속될 때 로컬 Ollama로 대체)
+        return gateway.chat("gpt-5-mini")
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.llm, "model_name", None) or getattr(self.llm, "model", None)
+
+    def _count_llm_tokens(self, span, prompt: ChatPromptTemplate, inputs: dict, output: str):
+        """LLM 호출 span에 (추정) 입력/출력 토큰과 비용 기록"""
+        if span is not None:
+            span.add_tokens(self.model_name, self.context_builder.count(prompt.format(**inputs)),
+                            self.context_builder.count(output))
+
+    # small-to-big: 자식 청크를 CHILD_K개씩 검색/융합한 뒤 부모 섹션(+문서 헤더) PARENT_K개로 확장
+    CHILD_K = 6
+    PARENT_K = 3
+    # 재순위화 사용 시: 검색기별 RERANK_CANDIDATES개씩 후보를 더 가져와 cross-encoder 상위 RERANK_TOP_N개만 사용
+    RERANK_CANDIDATES = 10
+    RERANK_TOP_N = 3
+
+    def _init_docstore(self, all_documents, chunker: HierarchicalChunker = None):
+        """벡터 DB와 같은 청킹으로 부모 섹션 저장소를 만듭니다. (BM25도 자식 청크 단위로 색인)"""
+        self.chunker = chunker or HierarchicalChunker()
+        self.docstore = ParentDocStore.from_documents(all_documents, self.chunker)
+        return self.docstore
+
+    def _child_k(self, reranker) -> int:
+        return self.RERANK_CANDIDATES if reranker is not None else self.CHILD_K
+
+    def _small_to_big(self, child_retriever, reranker: CrossEncoderReranker = None):
+        """(선택) 재순위화 -> 부모 섹션 확장 순으로 답변용 검색기를 구성합니다."""
+        self.reranker = reranker
+        if reranker is not None:
+            child_retriever = RerankingRetriever(child_retriever, reranker, top_n=self.RERANK_TOP_N)
+        return SmallToBigRetriever(child_retriever, self.docstore, top_k=self.PARENT_K)
+
+    def retrieval_config(self) -> dict:
+        """답변에 영향을 주는 검색/context 설정 (평가 결과 재사용 키에 포함)"""
+        return {
+            "chunker": self.chunker.config() if self.chunker else None,
+            "context_tokens": self.CONTEXT_TOKENS,
+            "reranker": self.reranker.model_id if self.reranker else None,
+            "rerank_top_n": self.RERANK_TOP_N if self.reranker else None,
+        }
+
+    def init_retriever(self, all_documents, bm25_index_dir: str = None, fusion: str = "rrf",
+                       chunker: HierarchicalChunker = None, reranker: CrossEncoderReranker = None):
+        """
+        :param bm25_index_dir: BM25 인덱스 저장 위치. 지정하면 문서가 바뀌지 않은 한 디스크에서 바로 불러옵니다.
+        :param fusion: 하이브리드 결과 융합 방식 ("rrf" 또는 "weighted")
+        :param chunker: 벡터 DB 구축에 쓴 청크 분할기 (RFPVectorDB.chunker)
+        :param reranker: 지정하면 융합 후보를 cross-encoder로 재순위화해 상위 RERANK_TOP_N개만 사용
+        """
+        if not self.vector_store: return
+        self.store_version = documents_fingerprint(all_documents) if all_documents else None
+        if self.use_router and all_documents:
+            self.metadata_router = MetadataQueryRouter(all_documents)
+        k = self._child_k(reranker)
+        self.vector_retriever = self.vector_store.as_retriever(search_kwargs={"k": k})
+        if not all_documents:
+            self.hybrid_retriever = self.vector_retriever
+            return
+        self._init_docstore(all_documents, chunker)
+        try:
+            self.bm25_retriever = BM25IndexRetriever.from_documents(self.docstore.children, index_dir=bm25_index_dir,
+                                                                    k=k)
+            child_retriever = SimpleHybridRetriever(self.vector_retriever, self.bm25_retriever, fusion=fusion,
+                                                    top_k=k * 2)
+            print("🚀 하이브리드 검색기 가동")
+        except:
+            child_retriever = self.vector_retriever
+        self.hybrid_retriever = self._small_to_big(child_retriever, reranker)
+
+    def _condense(self, query: str, history: list, state):
+        """
+        후속 질문을 독립 질문으로 바꿉니다.
+        대화 상태(앞서 찾은 사업)가 있으면 규칙으로 치환하고, 없으면 이전 대화를 보고 LLM이 다시 씁니다.
+        :return: (검색/답변에 쓸 질문, 대화 상태의 문서를 재사용할지 여부)
+        """
+        if not history or not is_followup(query):
+            return query, False
+        if state is not None:
+            return state.condense(query), True
+        try:
+            prompt = ChatPromptTemplate.from_template(CONDENSE_TEMPLATE)
+            inputs = {"history": format_history(history), "question": query}
+            condensed = (prompt | self.llm | StrOutputParser()).invoke(inputs)
+            self._count_llm_tokens(current_span(), prompt, inputs, condensed)
+            checked = clean_condensed(condensed)
+            if checked is None:
+                print(f"⚠️ 후속 질문 변환 결과가 질문이 아님 (원문으로 검색): {condensed[:50]!r}")
+                return query, False
+            return checked, False
+        except Exception as e:
+            print(f"⚠️ 후속 질문 변환 실패 (원문으로 검색): {e}")
+            return query, False
+
+    def _project_id(self, question: str):
+        """질문에 이름이 나온 사업의 doc_id (답변 캐시 semantic 비교 범위, 없으면 None)"""
+        record = self.metadata_router.mentioned(question) if self.metadata_router else None
+        return record["doc_id"] if record else None
+
+    def _build_context(self, question: str, retrieved_docs) -> str:
+        with tracer.span("context") as span:
+            context_text, stats = self.context_builder.build(question, retrieved_docs)
+            span.set(context_tokens=stats["tokens"], budget=stats["budget"], source_tokens=stats["source_tokens"],
+                     documents=stats["documents"], sentences=stats["sentences"])
+        self.last_context_stats = stats
+        # 질문마다 LLM에 보낸 토큰 수 기록 (tracer 설정과 무관하게 항상 출력)
+        print(f"🧮 context {stats['tokens']}/{stats['budget']} 토큰 "
+              f"(검색 원문 {stats['source_tokens']} 토큰, 문서 {stats['documents']}개, 문장 {stats['sentences']}개)")
+        return context_text
+
+    def _prepare(self, query: str, chat_history: list = None, conversation_id: str = None,
+                 use_router: bool = True, use_cache: bool = True):
+        """
+        LLM 호출 전 단계 (후속 질문 변환 -> fast path -> 캐시 -> 검색).
+        :param conversation_id: 대화 id. 지정하면 대화에서 찾은 문서를 기억해 후속 질문에 재사용
+        :param use_router: False면 메타데이터 fast path를 건너뜀 (평가 시 정답 CSV로 답하지 않도록)
+        :param use_cache: False면 답변 캐시를 읽지도 쓰지도 않음 (이전 대화가 있으면 stream_answer에서 끔)
+        :return: (바로 반환할 답변, None, None) 또는 (None, chain, chain 입력)
+        """
+        if not self.hybrid_retriever:
+            return "검색기 미초기화", None, None
+
+        history = trim_history(chat_history, self.HISTORY_TOKENS, self.TOKEN_ENCODING)
+        state = self.conversations.get(conversation_id, version=self.store_version)
+        with tracer.span("condense", history_messages=len(history)) as span:
+            question, reuse = self._condense(query, history, state)
+            span.set(rewritten=question != query, reuse=reuse)
+        if question != query:
+            print(f"💬 후속 질문 변환: {query} -> {question}")
+
+        # 0. 정형 메타데이터 질문 fast path
+        if self.metadata_router and use_router:
+            with tracer.span("route") as span:
+                routed, record = self.metadata_router.route_record(question)
+                span.set(hit=routed is not None)
+            if routed:
+                self.conversations.remember(conversation_id, [Document(page_content="", metadata=record)],
+                                            version=self.store_version)
+                return routed, None, None
+
+        # 1. 답변 캐시 (같은/거의 같은 질문이 최근에 있었으면 재사용)
+        if use_cache:
+            with tracer.span("answer_cache") as span:
+                cached = self.answer_cache.get(question, version=self.store_version,
+                                               project=self._project_id(question))
+                span.set(hit=cached is not None)
+            if cached is not None:
+                return cached, None, None
+
+        # 2. 검색 (같은 사업에 대한 후속 질문이면 앞서 찾은 문서 안에서만)
+        prompt = ChatPromptTemplate.from_template(self.TEMPLATE)
+        scoped = state.retriever(self.docstore, self.CHILD_K) if reuse and self.docstore is not None else None
+        with tracer.span("retrieve", scoped=scoped is not None) as span:
+            if scoped is not None:
+                retrieved_docs = SmallToBigRetriever(scoped, self.docstore, top_k=self.PARENT_K).invoke(question)
+            else:
+                retrieved_docs = self.hybrid_retriever.invoke(question)
+                # 대화 상태는 질문에 이름이 나온 사업, 아니면 검색 결과가 한 사업일 때만 기록
+                record = self.metadata_router.mentioned(question) if self.metadata_router else None
+                remembered = [Document(page_content="", metadata=record)] if record else retrieved_docs
+                self.conversations.remember(conversation_id, remembered, version=self.store_version)
+            span.set(documents=len(retrieved_docs))
+        # 3. 토큰 예산 안에서 헤더 + 관련 문장만 추려 context 구성
+        context_text = self._build_context(question, retrieved_docs)
+        chain = prompt | self.llm | StrOutputParser()
+        return None, chain, {"question": question, "context": context_text,
+                             "history": format_history(history) or "(없음)"}
+
+    def stream_answer(self, query: str, chat_history: list = None, conversation_id: str = None,
+                      use_router: bool = True, use_cache: bool = True):
+        """
+        답변을 토큰 단위로 내보내는 동기 제너레이터 (Streamlit write_stream, CLI용)
+        :param chat_history: 이번 질문 이전까지의 대화 (HumanMessage/AIMessage 목록)
+        :param use_router / use_cache: _prepare 참고 (평가는 둘 다 끄고 실제 검색 + 생성 결과로 채점)
+        """
+        # 이전 대화를 보고 만든 답변은 대화마다 다르므로 답변 캐시를 읽지도 쓰지도 않음
+        use_cache = use_cache and not chat_history
+        start = time.perf_counter()
+        with tracer.span("answer", engine=self.BACKEND) as span:
+            try:
+                answer, chain, inputs = self._prepare(query, chat_history, conversation_id, use_router, use_cache)
+                if answer is not None:
+                    self.last_ttft = time.perf_counter() - start
+                    span.set(fast_path=True)
+                    yield answer
+                    return
+
+                parts = []
+                with tracer.span("llm.generate") as llm_span:
+                    for token in chain.stream(inputs):
+                        if not parts:
+                            self.last_ttft = time.perf_counter() - start
+                            llm_span.set(ttft_ms=round(self.last_ttft * 1000, 1))
+                        parts.append(token)
+                        yield token
+                    self._count_llm_tokens(llm_span, chain.first, inputs, "".join(parts))
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {e}"
+                yield f"오류 발생: {str(e)}"
+                return
+            # 대체 모델(failover)이 답한 결과는 캐시하지 않음
+            if use_cache and not llm_span.attrs.get("failover"):
+                self.answer_cache.put(inputs["question"], "".join(parts), version=self.store_version,
+                                      project=self._project_id(inputs["question"]))
+
+    async def astream_answer(self, query: str, chat_history: list = None, conversation_id: str = None,
+                             use_router: bool = True, use_cache: bool = True):
+        """stream_answer의 비동기 버전"""
+        # 이전 대화를 보고 만든 답변은 대화마다 다르므로 답변 캐시를 읽지도 쓰지도 않음
+        use_cache = use_cache and not chat_history
+        start = time.perf_counter()
+        with tracer.span("answer", engine=self.BACKEND) as span:
+            try:
+                answer, chain, inputs = await asyncio.to_thread(self._prepare, query, chat_history, conversation_id,
+                                                                 use_router, use_cache)
+                if answer is not None:
+                    self.last_ttft = time.perf_counter() - start
+                    span.set(fast_path=True)
+                    yield answer
+                    return
+
+                parts = []
+                with tracer.span("llm.generate") as llm_span:
+                    async for token in chain.astream(inputs):
+                        if not parts:
+                            self.last_ttft = time.perf_counter() - start
+                            llm_span.set(ttft_ms=round(self.last_ttft * 1000, 1))
+                        parts.append(token)
+                        yield token
+                    self._count_llm_tokens(llm_span, chain.first, inputs, "".join(parts))
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {e}"
+                yield f"오류 발생: {str(e)}"
+                return
+            # 대체 모델(failover)이 답한 결과는 캐시하지 않음
+            if use_cache and not llm_span.attrs.get("failover"):
+                self.answer_cache.put(inputs["question"], "".join(parts), version=self.store_version,
+                                      project=self._project_id(inputs["question"]))
+
+    def generate_answer(self, query: str, chat_history: list = None, conversation_id: str = None,
+                        use_router: bool = True, use_cache: bool = True) -> str:
+        return "".join(self.stream_answer(query, chat_history, conversation_id, use_router, use_cache))
+
+    # ---------- 일괄 질의응답 ----------
+    # generate_answers의 LLM 동시 호출 수 (게이트웨이의 모델별 한도 안에서 실행)
+    BATCH_CONCURRENCY = 8
+
+    def _embed_queries(self, questions: List[str]) -> list:
+        """질문 임베딩을 한 번에 계산 (실패하거나 임베딩이 없으면 None -> 질문별 검색)"""
+        embeddings = getattr(self.vector_store, "embeddings", None)
+        if embeddings is None or not questions:
+            return [None] * len(questions)
         try:
-            retrieved_docs = self.hybrid_retriever.invoke(query)
-            context_text = "\n\n".join([doc.page_content for doc in retrieved_docs])
-            chain = prompt | self.llm | StrOutputParser()
-            return chain.invoke({"question": query, "context": context_text})
+            if hasattr(embeddings, "embed_queries"):
+                return embeddings.embed_queries(questions)
+            return [embeddings.embed_query(q) for q in questions]
         except Exception as e:
-            return f"오류 발생: {str(e)}"
\ No newline at end of file
+            print(f"⚠️ 질문 일괄 임베딩 실패 (질문별 검색으로 대체): {e}")
+            return [None] * len(questions)
+
+    def _vector_search_many(self, vectors: list, k: int) -> list:
+        """질문 벡터 여러 개를 한 번에 검색 -> 질문별 [(문서, 거리)] (일괄 검색이 없는 저장소는 질문별 검색)"""
+        store = self.vector_store
+        if hasattr(store, "similarity_search_by_vectors_with_score"):
+            return store.similarity_search_by_vectors_with_score(vectors, k=k)
+        return [[(doc, float(rank)) for rank, doc in enumerate(store.similarity_search_by_vector(v, k=k))]
+                for v in vectors]
+
+    def _retrieve_many(self, questions: List[str], vectors: list) -> list:
+        """
+        답변용 검색기(init_retriever 구성)를 질문 여러 개에 한 번에 적용합니다.
+        벡터 검색은 행렬 연산 한 번, BM25 / 재순위화 / 부모 섹션 확장은 질문별로 실행
+        """
+        retriever = self.hybrid_retriever
+        if not isinstance(retriever, SmallToBigRetriever) or any(v is None for v in vectors):
+            return [retriever.invoke(q) for q in questions]
+        reranking = retriever.child_retriever if isinstance(retriever.child_retriever, RerankingRetriever) else None
+        base = reranking.retriever if reranking else retriever.child_retriever
+        hybrid = base if isinstance(base, SimpleHybridRetriever) else None
+        vector_retriever = hybrid.vector_retriever if hybrid else base
+        if not hasattr(vector_retriever, "search_kwargs"):
+            return [retriever.invoke(q) for q in questions]
+
+        with tracer.span("retrieve.vector", queries=len(questions)):
+            k = vector_retriever.search_kwargs.get("k", 4)
+            # 거리(작을수록 유사) -> 점수(클수록 유사)
+            vector_results = [[(doc, -dist) for doc, dist in results]
+                              for results in self._vector_search_many(vectors, k)]
+        retrieved = []
+        for question, results in zip(questions, vector_results):
+            children = (hybrid.fuse_with_vector_results(question, results) if hybrid
+                        else [doc for doc, _ in results])
+            if reranking:
+                children = reranking.rerank(question, children)
+            retrieved.append(retriever.docstore.expand(children, retriever.top_k))
+        return retrieved
+
+    def generate_answers(self, queries: List[str], output_path: str = None, max_concurrency: int = None,
+                         progress_callback=None) -> List[str]:
+        """
+        질문 여러 개를 일괄 답변합니다 (대화 기록 없이 독립 질문으로 처리).
+        - 같은 질문(정규화 기준)은 한 번만 검색/생성
+        - 메타데이터 fast path -> 남은 질문은 한 번에 임베딩 -> 답변 캐시 -> 벡터 검색 한 번에
+        - LLM 호출은 max_concurrency개씩 동시에 실행하고, 끝나는 대로 output_path(.csv / .jsonl)에 기록
+        :param progress_callback: (진행률 0~1, 메시지)
+        :return: 입력 순서대로의 답변 목록
+        """
+        answers = [None] * len(queries)
+        positions = {}  # 정규화 질문 -> 입력 위치 목록
+        for i, query in enumerate(queries):
+            positions.setdefault(AnswerCache.normalize(query), []).append(i)
+        unique = [queries[indexes[0]] for indexes in positions.values()]
+        writer = AnswerWriter(output_path) if output_path else None
+        lock = threading.Lock()
+        done = 0
+
+        def _finish(question: str, answer: str, path: str):
+            nonlocal done
+            with lock:
+                indexes = positions[AnswerCache.normalize(question)]
+                for i in indexes:
+                    answers[i] = answer
+                    if writer:
+                        writer.write({"index": i, "question": queries[i], "answer": answer, "path": path})
+                done += len(indexes)
+                if progress_callback:
+                    progress_callback(done / max(len(queries), 1), f"{done}/{len(queries)}")
+
+        try:
+            with tracer.span("batch", questions=len(queries), unique=len(unique)) as span:
+                if not self.hybrid_retriever:
+                    for question in unique:
+                        _finish(question, "검색기 미초기화", "error")
+                    return answers
+
+                # 0. 정형 메타데이터 질문 fast path
+                pending = []
+                for question in unique:
+                    routed = self.metadata_router.route_record(question)[0] if self.metadata_router else None
+                    if routed:
+                        _finish(question, routed, "router")
+                    else:
+                        pending.append(question)
+
+                # 1. 질문 임베딩 한 번에 -> 답변 캐시 (semantic 비교에도 같은 벡터 사용)
+                misses = []
+                for question, vector in zip(pending, self._embed_queries(pending)):
+                    cached = self.answer_cache.get(question, version=self.store_version, vector=vector,
+                                                   project=self._project_id(question))
+                    if cached is not None:
+                        _finish(question, cached, "cache")
+                    else:
+                        misses.append((question, vector))
+                span.set(llm_questions=len(misses))
+                if not misses:
+                    return answers
+
+                # 2. 검색 (벡터 검색은 행렬 연산 한 번)
+                with tracer.span("retrieve", queries=len(misses)):
+                    retrieved = self._retrieve_many([q for q, _ in misses], [v for _, v in misses])
+
+                # 3. context 구성 + LLM 호출을 동시에 (완료 순서대로 기록)
+                prompt = ChatPromptTemplate.from_template(self.TEMPLATE)
+                chain = prompt | self.llm | StrOutputParser()
+
+                def _answer(question, vector, docs):
+                    inputs = {"question": question, "context": self._build_context(question, docs),
+                              "history": "(없음)"}
+                    with tracer.span("llm.generate") as llm_span:
+                        answer = chain.invoke(inputs)
+                        self._count_llm_tokens(llm_span, prompt, inputs, answer)
+                    if not llm_span.attrs.get("failover"):
+                        self.answer_cache.put(question, answer, version=self.store_version, vector=vector,
+                                              project=self._project_id(question))
+                    return answer
+
+                workers = max_concurrency or self.BATCH_CONCURRENCY
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-answer") as executor:
+                    futures = {executor.submit(tracer.wrap(_answer), question, vector, docs): question
+                               for (question, vector), docs in zip(misses, retrieved)}
+                    for future in as_completed(futures):
+                        try:
+                            _finish(futures[future], future.result(), "llm")
+                        except Exception as e:
+                            _finish(futures[future], f"오류 발생: {str(e)}", "error")
+        finally:
+            if writer:
+                writer.close()
+        return answers
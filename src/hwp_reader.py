@@ -0,0 +1,164 @@
+# @title src/hwp_reader.py
+import re
+import struct
+import zlib
+from typing import Iterator, List, Tuple, Union
+
+import olefile
+
+# HWP 5.x 레코드 태그 (HWPTAG_BEGIN = 0x10)
+HWPTAG_PARA_HEADER = 0x42
+HWPTAG_PARA_TEXT = 0x43
+HWPTAG_CTRL_HEADER = 0x47
+HWPTAG_LIST_HEADER = 0x48
+HWPTAG_TABLE = 0x4D
+
+# PARA_TEXT 안의 제어 문자 분류 (문자 제어는 1 WCHAR, 인라인/확장 제어는 8 WCHAR 차지)
+CHAR_CONTROLS = {0, 10, 13, 24, 25, 26, 27, 28, 29, 30, 31}
+INLINE_CONTROLS = {4, 5, 6, 7, 8, 9, 19, 20}
+EXTENDED_CONTROLS = {1, 2, 3, 11, 12, 14, 15, 16, 17, 18, 21, 22, 23}
+
+READ_BLOCK_SIZE = 64 * 1024
+
+Block = Tuple[str, Union[str, List[List[str]]]]
+
+
+class HWPReadError(Exception):
+    pass
+
+
+def _section_names(ole: olefile.OleFileIO) -> List[str]:
+    sections = [
+        "/".join(entry) for entry in ole.listdir()
+        if len(entry) == 2 and entry[0] == "BodyText" and entry[1].startswith("Section")
+    ]
+    return sorted(sections, key=lambda name: int(re.sub(r"\D", "", name) or 0))
+
+
+def _iter_section_bytes(stream, compressed: bool) -> Iterator[bytes]:
+    """섹션 스트림을 블록 단위로 읽으면서 압축(raw deflate)을 점진적으로 해제합니다."""
+    decompressor = zlib.decompressobj(-15) if compressed else None
+    while True:
+        block = stream.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        yield decompressor.decompress(block) if decompressor else block
+    if decompressor:
+        yield decompressor.flush()
+
+
+def _iter_records(chunks: Iterator[bytes]) -> Iterator[Tuple[int, int, bytes]]:
+    """(tag_id, level, data) 레코드를 스트리밍으로 파싱합니다."""
+    buffer = bytearray()
+    pos = 0
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while True:
+            if len(buffer) - pos < 4:
+                break
+            header, = struct.unpack_from("<I", buffer, pos)
+            tag_id, level, size = header & 0x3FF, (header >> 10) & 0x3FF, (header >> 20) & 0xFFF
+            offset = pos + 4
+            if size == 0xFFF:
+                if len(buffer) - offset < 4:
+                    break
+                size, = struct.unpack_from("<I", buffer, offset)
+                offset += 4
+            if len(buffer) - offset < size:
+                break
+            yield tag_id, level, bytes(buffer[offset:offset + size])
+            pos = offset + size
+        # 소비한 앞부분은 버려서 버퍼가 섹션 크기만큼 커지지 않게 함
+        del buffer[:pos]
+        pos = 0
+
+
+def _decode_para_text(data: bytes) -> str:
+    units = struct.unpack(f"<{len(data) // 2}H", data[:len(data) // 2 * 2])
+    out = []
+    i = 0
+    while i < len(units):
+        code = units[i]
+        if code >= 32:
+            out.append(code)
+            i += 1
+        elif code in CHAR_CONTROLS:
+            if code == 10:
+                out.append(0x0A)
+            i += 1
+        elif code in INLINE_CONTROLS or code in EXTENDED_CONTROLS:
+            if code == 9:
+                out.append(0x09)
+            i += 8
+        else:
+            i += 1
+    return struct.pack(f"<{len(out)}H", *out).decode("utf-16-le", errors="replace").strip()
+
+
+def iter_blocks(file_path: str) -> Iterator[Block]:
+    """
+    HWP 5.x 본문을 순서대로 읽어 ("paragraph", 텍스트) 또는 ("table", 행별 셀 텍스트) 블록을 반환합니다.
+    섹션 스트림 전체를 메모리에 올리지 않고 블록 단위로 압축 해제하며 처리합니다.
+    """
+    if not olefile.isOleFile(file_path):
+        raise HWPReadError(f"HWP 5.x(OLE) 형식이 아닙니다: {file_path}")
+
+    with olefile.OleFileIO(file_path) as ole:
+        header = ole.openstream("FileHeader").read()
+        if not header.startswith(b"HWP Document File"):
+            raise HWPReadError(f"HWP 파일 헤더가 올바르지 않습니다: {file_path}")
+        flags, = struct.unpack_from("<I", header, 36)
+        if flags & 0x2:
+            raise HWPReadError("암호가 설정된 HWP 문서는 지원하지 않습니다.")
+        if flags & 0x4:
+            raise HWPReadError("배포용 HWP 문서는 지원하지 않습니다.")
+        compressed = bool(flags & 0x1)
+
+        for section in _section_names(ole):
+            stream = ole.openstream(section)
+            table_level = None  # 현재 표 컨트롤(CTRL_HEADER)의 레벨
+            cells = {}
+            cell_key = None
+
+            for tag_id, level, data in _iter_records(_iter_section_bytes(stream, compressed)):
+                # 표 영역이 끝나면 (표 컨트롤 레벨 이하의 레코드 등장) 표 블록 반환
+                if table_level is not None and level <= table_level:
+                    yield "table", _cells_to_rows(cells)
+                    table_level, cells, cell_key = None, {}, None
+
+                if tag_id == HWPTAG_CTRL_HEADER and table_level is None and data[:4][::-1] == b"tbl ":
+                    table_level = level
+                elif table_level is not None:
+                    if tag_id == HWPTAG_LIST_HEADER and level == table_level + 1 and len(data) >= 12:
+                        col, row = struct.unpack_from("<HH", data, 8)
+                        cell_key = (row, col)
+                        cells.setdefault(cell_key, [])
+                    elif tag_id == HWPTAG_PARA_TEXT and cell_key is not None:
+                        text = _decode_para_text(data)
+                        if text:
+                            cells[cell_key].append(text)
+                elif tag_id == HWPTAG_PARA_TEXT:
+                    text = _decode_para_text(data)
+                    if text:
+                        yield "paragraph", text
+
+            if table_level is not None:
+                yield "table", _cells_to_rows(cells)
+
+
+def _cells_to_rows(cells: dict) -> List[List[str]]:
+    rows = {}
+    for (row, col), texts in sorted(cells.items()):
+        rows.setdefault(row, []).append(" ".join(texts))
+    return [cols for _, cols in sorted(rows.items())]
+
+
+def extract_text(file_path: str) -> str:
+    """HWP 본문 텍스트를 추출합니다. 표는 한 행씩 '셀 | 셀' 형태로 펼칩니다."""
+    lines = []
+    for kind, value in iter_blocks(file_path):
+        if kind == "table":
+            lines.extend(" | ".join(cols) for cols in value if any(cols))
+        else:
+            lines.append(value)
+    return "\n".join(lines)
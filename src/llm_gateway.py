@@ -0,0 +1,456 @@
+# @title src/llm_gateway.py
+"""
+LLM 호출 공용 게이트웨이. 로더(요약), 생성기, 평가(채점)가 모두 이 모듈을 통해 LLM을 만듭니다.
+- 모델별 클라이언트는 프로세스당 하나 (HTTP 연결 풀 공유, keep-alive)
+- 모델별 분당 요청/토큰 한도 + 동시 호출 수 (한도를 넘으면 실패 대신 대기)
+- 429/5xx/연결 오류는 지수 백오프 + 지터로 재시도 (Retry-After 헤더 우선)
+- (LLM_FAILOVER=1일 때만) 재시도를 다 써도 실패하면 대체 백엔드(OpenAI -> Ollama)로 넘기고, 실패한 백엔드는 잠시 건너뜀
+  대체 모델이 답한 호출은 상위 span에 failover=True가 남으므로 답변/요약 캐시와 평가 결과에서 제외합니다.
+
+한도는 LLM_BUDGETS 환경 변수(JSON)로 바꿀 수 있습니다. 예) {"gpt-5": {"tokens_per_minute": 30000}}
+오프라인 처리량 테스트는 src/mock_llm_server.py 참고.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import httpx
+import openai
+from collections import defaultdict
+from typing import Iterator, AsyncIterator, List, Optional, Tuple
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from src.context_builder import count_tokens
+from src.tracing import tracer
+
+# 재시도 대상 HTTP 상태 (요청 시간 초과, 충돌, 속도 제한, 서버 오류)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# 재시도해도 소용없지만 다른 백엔드로는 넘길 수 있는 상태 (인증 실패, 모델 없음)
+FAILOVER_STATUS = {401, 403, 404}
+
+
+def _status(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and isinstance(response, httpx.Response):
+        status = response.status_code
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if not isinstance(response, httpx.Response):
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = _status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (openai.APIConnectionError, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _prompt_text(value) -> str:
+    if hasattr(value, "to_string"):
+        return value.to_string()
+    if isinstance(value, list):
+        return "\n".join(str(getattr(m, "content", m)) for m in value)
+    return str(value)
+
+
+def _content(message) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+class ModelBudget:
+    """
+    모델별 분당 요청 수 / 분당 토큰 수 (token bucket) + 동시 호출 수.
+    입력 토큰은 호출 전에 (추정치로) 예약하고, 출력 토큰은 호출이 끝난 뒤 차감합니다.
+    """
+
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None, max_concurrency: int = 8):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._active = 0
+        self._lock = threading.Lock()
+        self.stats = {"waits": 0, "wait_seconds": 0.0}
+
+    def _refill(self, now: float):
+        elapsed, self._updated = now - self._updated, now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def try_acquire(self, tokens: int) -> float:
+        """자리가 있으면 예약하고 0, 없으면 기다려야 할 초 반환"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._active >= self.max_concurrency:
+                return 0.05
+            waits = []
+            if self.requests_per_minute and self._requests < 1:
+                waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                need = min(tokens, self.tokens_per_minute)
+                if self._tokens < need:
+                    waits.append((need - self._tokens) * 60 / self.tokens_per_minute)
+            if waits:
+                return max(waits)
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            self._active += 1
+            return 0.0
+
+    def _waited(self, seconds: float):
+        with self._lock:
+            self.stats["waits"] += 1
+            self.stats["wait_seconds"] += seconds
+
+    def acquire(self, tokens: int):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            self._waited(wait)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            self._waited(wait)
+            await asyncio.sleep(wait)
+
+    def release(self, output_tokens: int = 0):
+        with self._lock:
+            self._active -= 1
+            if self.tokens_per_minute:
+                self._tokens -= output_tokens
+
+
+class GatewayChatModel(Runnable[LanguageModelInput, BaseMessage]):
+    """
+    ChatOpenAI / ChatOllama 대신 쓰는 Runnable (prompt | llm | parser 체인에 그대로 연결).
+    routes 순서대로 시도하며, 실제 호출은 게이트웨이의 공유 클라이언트/한도/재시도를 거칩니다.
+    """
+
+    def __init__(self, gateway: "LLMGateway", routes: List[Tuple[str, str]]):
+        self.gateway = gateway
+        self.routes = routes
+        self.backend, self.model_name = routes[0]
+
+    def invoke(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None, **kwargs) -> BaseMessage:
+        return self.gateway.invoke(self.routes, input, config, **kwargs)
+
+    async def ainvoke(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None,
+                      **kwargs) -> BaseMessage:
+        return await self.gateway.ainvoke(self.routes, input, config, **kwargs)
+
+    def stream(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None,
+               **kwargs) -> Iterator[BaseMessage]:
+        return self.gateway.stream(self.routes, input, config, **kwargs)
+
+    def astream(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None,
+                **kwargs) -> AsyncIterator[BaseMessage]:
+        return self.gateway.astream(self.routes, input, config, **kwargs)
+
+
+class LLMGateway:
+    """프로세스 공용 LLM 게이트웨이 (스레드 안전). 모듈 전역 `gateway`를 사용하세요."""
+    # 기본 한도 (계정 등급에 맞게 LLM_BUDGETS로 조정). Ollama는 GPU/CPU 하나를 나눠 쓰므로 동시 2개
+    DEFAULT_BUDGETS = {
+        "gpt-5": {"requests_per_minute": 500, "tokens_per_minute": 500_000, "max_concurrency": 8},
+        "gpt-5-mini": {"requests_per_minute": 500, "tokens_per_minute": 500_000, "max_concurrency": 16},
+        "llama3": {"max_concurrency": 2},
+    }
+    DEFAULT_CONCURRENCY = 8
+    # 재시도를 다 써도 실패하면 넘길 백엔드. GPT 답변이 몰래 llama3 답변으로 바뀌지 않도록 LLM_FAILOVER=1일 때만 사용
+    FALLBACK = {"openai": ("ollama", os.getenv("OLLAMA_FALLBACK_MODEL", "llama3"))}
+    MAX_RETRIES = 4
+    BASE_DELAY = 1.0
+    MAX_DELAY = 30.0
+    # 실패한 백엔드를 건너뛰는 시간 (초)
+    COOLDOWN_SECONDS = 30.0
+    MAX_CONNECTIONS = 64
+    MAX_KEEPALIVE = 32
+    TIMEOUT = 120.0
+
+    def __init__(self):
+        self._clients = {}
+        self._budgets = {}
+        self._http_client = None
+        self._down_until = {}
+        self._lock = threading.Lock()
+        self._stats = defaultdict(int)
+        self._overrides = json.loads(os.getenv("LLM_BUDGETS") or "{}")
+
+    # ---------- 클라이언트 / 한도 ----------
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.MAX_CONNECTIONS, max_keepalive_connections=self.MAX_KEEPALIVE)
+
+    def http_client(self) -> httpx.Client:
+        """OpenAI 동기 호출이 공유하는 연결 풀 (비동기 클라이언트는 이벤트 루프에 묶이므로 SDK 기본값 사용)"""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self._limits(), timeout=self.TIMEOUT)
+            return self._http_client
+
+    def _create(self, backend: str, model: str):
+        if backend == "openai":
+            from langchain_openai import ChatOpenAI
+            # 재시도는 게이트웨이가 하므로 SDK 재시도는 끔
+            return ChatOpenAI(model=model, temperature=0, max_retries=0, timeout=self.TIMEOUT,
+                              http_client=self.http_client())
+        if backend == "ollama":
+            from langchain_ollama import ChatOllama
+            return ChatOllama(model=model, temperature=0, base_url=os.getenv("OLLAMA_HOST"),
+                              client_kwargs={"limits": self._limits(), "timeout": self.TIMEOUT})
+        raise ValueError(f"지원하지 않는 LLM 백엔드: {backend}")
+
+    def client(self, backend: str, model: str):
+        key = (backend, model)
+        if key not in self._clients:
+            llm = self._create(backend, model)
+            with self._lock:
+                self._clients.setdefault(key, llm)
+        return self._clients[key]
+
+    def budget(self, model: str) -> ModelBudget:
+        if model not in self._budgets:
+            config = dict(self.DEFAULT_BUDGETS.get(model, {"max_concurrency": self.DEFAULT_CONCURRENCY}),
+                          **self._overrides.get(model, {}))
+            with self._lock:
+                self._budgets.setdefault(model, ModelBudget(**config))
+        return self._budgets[model]
+
+    def set_budget(self, model: str, **config):
+        """모델 한도 변경 (requests_per_minute, tokens_per_minute, max_concurrency)"""
+        with self._lock:
+            self._overrides[model] = dict(self._overrides.get(model, {}), **config)
+            self._budgets.pop(model, None)
+
+    def chat(self, model: str, backend: str = "openai", fallback=True) -> GatewayChatModel:
+        """
+        :param fallback: True면 FALLBACK 기본값, (백엔드, 모델)이면 그 모델, False/None이면 대체 없음
+                         (어느 경우든 LLM_FAILOVER=1일 때만 대체 - 기본 꺼짐)
+        """
+        routes = [(backend, model)]
+        if fallback is True:
+            fallback = self.FALLBACK.get(backend)
+        if fallback and os.getenv("LLM_FAILOVER", "0") == "1":
+            routes.append(tuple(fallback))
+        return GatewayChatModel(self, routes)
+
+    def embeddings(self, model: str):
+        """OpenAI 임베딩 (연결 풀 공유, 429는 SDK 재시도 사용)"""
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=model, max_retries=self.MAX_RETRIES, http_client=self.http_client())
+
+    # ---------- 재시도 / 대체 ----------
+    def _plan(self, routes: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """쉬는 중인 백엔드는 뒤로 (모두 쉬는 중이면 원래 순서대로 다시 시도)"""
+        now = time.monotonic()
+        healthy = [r for r in routes if self._down_until.get(r[0], 0) <= now]
+        return healthy + [r for r in routes if r not in healthy]
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(self.MAX_DELAY, retry_after) + random.uniform(0, self.BASE_DELAY)
+        # full jitter
+        return random.uniform(0, min(self.MAX_DELAY, self.BASE_DELAY * 2 ** attempt))
+
+    def _on_error(self, error: Exception, backend: str, attempt: int, span) -> Optional[float]:
+        """재시도 전 대기 초. 다음 백엔드로 넘겨야 하면 None, 재시도/대체 대상이 아니면 그대로 raise"""
+        status = _status(error)
+        with self._lock:
+            self._stats[f"{backend}.errors"] += 1
+            if status == 429:
+                self._stats[f"{backend}.rate_limited"] += 1
+        if _is_retryable(error) and attempt < self.MAX_RETRIES:
+            with self._lock:
+                self._stats[f"{backend}.retries"] += 1
+            span.set(retries=span.attrs.get("retries", 0) + 1)
+            return self._backoff(error, attempt)
+        # API 키 없음 같은 클라이언트 오류(상태 코드 없음)도 다른 백엔드로 넘김
+        client_error = status is None and isinstance(error, openai.OpenAIError)
+        if _is_retryable(error) or status in FAILOVER_STATUS or client_error:
+            self._down_until[backend] = time.monotonic() + self.COOLDOWN_SECONDS
+            return None
+        raise error
+
+    def _succeeded(self, backend: str, model: str, span, first: Tuple[str, str]):
+        self._down_until.pop(backend, None)
+        with self._lock:
+            self._stats[f"{backend}.calls"] += 1
+            if (backend, model) != first:
+                self._stats["failovers"] += 1
+        failover = (backend, model) != first
+        span.set(backend=backend, llm=model, failover=failover)
+        # 호출한 쪽 span(생성, 요약, 평가 행 등)에도 표시 -> 대체 모델 결과를 캐시/평가 저장소에 넣지 않도록
+        parent = span.parent
+        while failover and parent is not None:
+            parent.set(failover=True)
+            parent = parent.parent
+
+    def _attempt_client(self, backend: str, model: str, span):
+        try:
+            return self.client(backend, model)
+        except Exception as e:
+            # API 키 없음 등 클라이언트 생성 실패 -> 다음 백엔드
+            span.set(error_detail=f"{backend}: {e}")
+            return None
+
+    def invoke(self, routes, input, config=None, **kwargs):
+        tokens = count_tokens(_prompt_text(input))
+        error = None
+        with tracer.span("llm.call", target=routes[0][1]) as span:
+            for backend, model in self._plan(routes):
+                llm = self._attempt_client(backend, model, span)
+                budget = self.budget(model)
+                attempt = 0
+                while llm is not None:
+                    budget.acquire(tokens)
+                    output = ""
+                    try:
+                        result = llm.invoke(input, config, **kwargs)
+                        output = _content(result)
+                        self._succeeded(backend, model, span, routes[0])
+                        return result
+                    except Exception as e:
+                        error = e
+                        delay = self._on_error(e, backend, attempt, span)
+                        if delay is None:
+                            break
+                        time.sleep(delay)
+                        attempt += 1
+                    finally:
+                        budget.release(count_tokens(output))
+            raise error or RuntimeError(f"사용 가능한 LLM 백엔드가 없습니다: {routes}")
+
+    async def ainvoke(self, routes, input, config=None, **kwargs):
+        tokens = count_tokens(_prompt_text(input))
+        error = None
+        with tracer.span("llm.call", target=routes[0][1]) as span:
+            for backend, model in self._plan(routes):
+                llm = self._attempt_client(backend, model, span)
+                budget = self.budget(model)
+                attempt = 0
+                while llm is not None:
+                    await budget.aacquire(tokens)
+                    output = ""
+                    try:
+                        result = await llm.ainvoke(input, config, **kwargs)
+                        output = _content(result)
+                        self._succeeded(backend, model, span, routes[0])
+                        return result
+                    except Exception as e:
+                        error = e
+                        delay = self._on_error(e, backend, attempt, span)
+                        if delay is None:
+                            break
+                        await asyncio.sleep(delay)
+                        attempt += 1
+                    finally:
+                        budget.release(count_tokens(output))
+            raise error or RuntimeError(f"사용 가능한 LLM 백엔드가 없습니다: {routes}")
+
+    def stream(self, routes, input, config=None, **kwargs):
+        """첫 토큰을 받기 전의 실패만 재시도/대체 (이미 내보낸 토큰은 되돌릴 수 없으므로)"""
+        tokens = count_tokens(_prompt_text(input))
+        error = None
+        with tracer.span("llm.call", target=routes[0][1], stream=True) as span:
+            for backend, model in self._plan(routes):
+                llm = self._attempt_client(backend, model, span)
+                budget = self.budget(model)
+                attempt = 0
+                while llm is not None:
+                    budget.acquire(tokens)
+                    parts = []
+                    try:
+                        for chunk in llm.stream(input, config, **kwargs):
+                            parts.append(_content(chunk))
+                            yield chunk
+                        self._succeeded(backend, model, span, routes[0])
+                        return
+                    except Exception as e:
+                        if parts:
+                            raise
+                        error = e
+                        delay = self._on_error(e, backend, attempt, span)
+                        if delay is None:
+                            break
+                        time.sleep(delay)
+                        attempt += 1
+                    finally:
+                        budget.release(count_tokens("".join(parts)))
+            raise error or RuntimeError(f"사용 가능한 LLM 백엔드가 없습니다: {routes}")
+
+    async def astream(self, routes, input, config=None, **kwargs):
+        tokens = count_tokens(_prompt_text(input))
+        error = None
+        with tracer.span("llm.call", target=routes[0][1], stream=True) as span:
+            for backend, model in self._plan(routes):
+                llm = self._attempt_client(backend, model, span)
+                budget = self.budget(model)
+                attempt = 0
+                while llm is not None:
+                    await budget.aacquire(tokens)
+                    parts = []
+                    try:
+                        async for chunk in llm.astream(input, config, **kwargs):
+                            parts.append(_content(chunk))
+                            yield chunk
+                        self._succeeded(backend, model, span, routes[0])
+                        return
+                    except Exception as e:
+                        if parts:
+                            raise
+                        error = e
+                        delay = self._on_error(e, backend, attempt, span)
+                        if delay is None:
+                            break
+                        await asyncio.sleep(delay)
+                        attempt += 1
+                    finally:
+                        budget.release(count_tokens("".join(parts)))
+            raise error or RuntimeError(f"사용 가능한 LLM 백엔드가 없습니다: {routes}")
+
+    def stats(self) -> dict:
+        """백엔드별 호출/재시도/429/오류 수, 대체 횟수, 모델별 한도 대기"""
+        with self._lock:
+            stats = dict(self._stats)
+        for model, budget in list(self._budgets.items()):
+            if not budget.stats["waits"]:
+                continue
+            stats[f"{model}.budget_waits"] = budget.stats["waits"]
+            stats[f"{model}.budget_wait_seconds"] = round(budget.stats["wait_seconds"], 2)
+        return stats
+
+    def reset(self):
+        """클라이언트/한도/통계 초기화 (환경 변수로 엔드포인트를 바꾼 뒤 등)"""
+        with self._lock:
+            self._clients.clear()
+            self._budgets.clear()
+            self._down_until.clear()
+            self._stats.clear()
+            self._overrides = json.loads(os.getenv("LLM_BUDGETS") or "{}")
+
+
+gateway = LLMGateway()
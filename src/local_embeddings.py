@@ -0,0 +1,205 @@
+# @title src/local_embeddings.py
+import os
+import glob
+import threading
+import numpy as np
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+
+class CpuModel:
+    """
+    CPU 추론 모델 공통 부분 (LocalEmbeddings, CrossEncoderReranker).
+    모델 폴더/HF 캐시 해석, ONNX 파일 선택과 int8 동적 양자화, 추론 스레드 수, 길이 기반 동적 배치.
+    하위 클래스는 _load_onnx / _load_sentence_transformers를 구현합니다.
+    """
+    MAX_LENGTH = 512
+
+    def __init__(self, model_name: str, backend: str = "auto", num_threads: int = None, quantize: bool = False,
+                 max_batch_tokens: int = 16384, max_batch_size: int = 64):
+        self.model_name = model_name
+        self.backend = backend
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.quantize = quantize
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        """캐시/매니페스트에 기록하는 모델 식별자 (양자화 여부 포함)"""
+        return f"{self.model_name}:int8" if self.quantize else self.model_name
+
+    # ---------- 모델 로드 ----------
+    def _model_dir(self) -> str:
+        if os.path.isdir(self.model_name):
+            return self.model_name
+        # HF 캐시에서 찾고, 없으면 내려받음 (HF_HUB_OFFLINE=1이면 캐시만 사용)
+        from huggingface_hub import snapshot_download
+        return snapshot_download(self.model_name, allow_patterns=["*.json", "*.txt", "*.model", "*.onnx", "onnx/*"])
+
+    def _onnx_file(self, model_dir: str) -> str:
+        fp32 = [p for p in (os.path.join(model_dir, "onnx", "model.onnx"), os.path.join(model_dir, "model.onnx"))
+                if os.path.exists(p)]
+        if not self.quantize:
+            if not fp32:
+                raise FileNotFoundError(f"ONNX 모델 파일이 없습니다: {model_dir}")
+            return fp32[0]
+
+        # 미리 양자화된 파일이 있으면 사용, 없으면 fp32 모델을 int8로 동적 양자화해 저장
+        for pattern in ("*int8*.onnx", "*quantized*.onnx", "*qint8*.onnx"):
+            found = sorted(glob.glob(os.path.join(model_dir, "onnx", pattern)) + glob.glob(os.path.join(model_dir, pattern)))
+            if found:
+                return found[0]
+        if not fp32:
+            raise FileNotFoundError(f"ONNX 모델 파일이 없습니다: {model_dir}")
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        target = os.path.join(os.path.dirname(fp32[0]), "model_int8.onnx")
+        quantize_dynamic(fp32[0], target, weight_type=QuantType.QInt8)
+        return target
+
+    def _onnx_session(self, model_dir: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(self._onnx_file(model_dir), options, providers=["CPUExecutionProvider"])
+
+    def _load(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    if self.backend == "onnx":
+                        self._model = self._load_onnx()
+                    elif self.backend == "sentence-transformers":
+                        self._model = self._load_sentence_transformers()
+                    else:
+                        try:
+                            self._model = self._load_onnx()
+                        except (ImportError, FileNotFoundError, OSError):
+                            self._model = self._load_sentence_transformers()
+        return self._model
+
+    # ---------- 추론 ----------
+    def _batches(self, lengths: List[int]) -> List[List[int]]:
+        """길이순으로 정렬해 (배치 크기 x 배치 내 최대 길이) <= max_batch_tokens 가 되도록 묶습니다."""
+        batches, current, current_max = [], [], 0
+        for idx in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            longest = max(current_max, lengths[idx])
+            if current and (len(current) >= self.max_batch_size or longest * (len(current) + 1) > self.max_batch_tokens):
+                batches.append(current)
+                current, longest = [], lengths[idx]
+            current.append(idx)
+            current_max = longest
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _pad(encodings, batch: List[int], pad_id: int):
+        """배치 최대 길이까지만 패딩한 (input_ids, attention_mask, token_type_ids)"""
+        width = max(len(encodings[i].ids) for i in batch)
+        input_ids = np.full((len(batch), width), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+        token_type_ids = np.zeros((len(batch), width), dtype=np.int64)
+        for row, i in enumerate(batch):
+            ids = encodings[i].ids
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+            token_type_ids[row, :len(ids)] = encodings[i].type_ids
+        return input_ids, attention_mask, token_type_ids
+
+
+class LocalEmbeddings(CpuModel, Embeddings):
+    """
+    CPU 전용 로컬 다국어 임베딩 (OpenAI 등 네트워크 호출 없음, 폐쇄망 배포용).
+    - backend="onnx": onnxruntime + tokenizers (모델 폴더의 *.onnx, tokenizer.json)
+    - backend="sentence-transformers": PyTorch CPU 추론
+    - backend="auto": onnx 우선, 필요한 패키지/파일이 없으면 sentence-transformers
+    길이가 비슷한 텍스트끼리 토큰 예산 안에서 묶어(동적 배치) 패딩 낭비를 줄이고,
+    추론 스레드 수(num_threads)와 int8 동적 양자화(quantize)를 지정할 수 있습니다.
+
+    폐쇄망에서는 LOCAL_EMBEDDING_MODEL에 미리 받아 둔 모델 폴더 경로를 지정하세요.
+    LOCAL_EMBEDDING_QUANTIZE=1이면 기본으로 int8 양자화 모델을 사용합니다.
+    """
+    DEFAULT_MODEL = "intfloat/multilingual-e5-small"
+
+    def __init__(self, model_name: str = None, backend: str = "auto", num_threads: int = None,
+                 quantize: bool = None, max_batch_tokens: int = 16384, max_batch_size: int = 64,
+                 query_prefix: str = None, passage_prefix: str = None):
+        super().__init__(
+            model_name or os.getenv("LOCAL_EMBEDDING_MODEL", self.DEFAULT_MODEL), backend=backend,
+            num_threads=num_threads,
+            quantize=quantize if quantize is not None else os.getenv("LOCAL_EMBEDDING_QUANTIZE") == "1",
+            max_batch_tokens=max_batch_tokens, max_batch_size=max_batch_size,
+        )
+        # e5 계열은 질의/문서 접두어를 붙여야 성능이 나옴
+        is_e5 = "e5" in os.path.basename(self.model_name.rstrip("/")).lower()
+        self.query_prefix = query_prefix if query_prefix is not None else ("query: " if is_e5 else "")
+        self.passage_prefix = passage_prefix if passage_prefix is not None else ("passage: " if is_e5 else "")
+
+    # ---------- 모델 로드 ----------
+    def _load_onnx(self):
+        from tokenizers import Tokenizer
+
+        model_dir = self._model_dir()
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=self.MAX_LENGTH)
+        tokenizer.no_padding()  # 배치별로 직접 패딩 (배치 최대 길이까지만)
+        pad_id = next((tokenizer.token_to_id(t) for t in ("<pad>", "[PAD]") if tokenizer.token_to_id(t) is not None), 0)
+
+        session = self._onnx_session(model_dir)
+        return {"kind": "onnx", "session": session, "tokenizer": tokenizer, "pad_id": pad_id,
+                "inputs": {i.name for i in session.get_inputs()}}
+
+    def _load_sentence_transformers(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(self.num_threads)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return {"kind": "sentence-transformers", "model": model}
+
+    # ---------- 추론 ----------
+    def _run_onnx(self, model: dict, texts: List[str]) -> np.ndarray:
+        encodings = model["tokenizer"].encode_batch(texts)
+        vectors = [None] * len(texts)
+        for batch in self._batches([len(e.ids) for e in encodings]):
+            input_ids, attention_mask, _ = self._pad(encodings, batch, model["pad_id"])
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in model["inputs"]:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            output = model["session"].run(None, {k: v for k, v in feeds.items() if k in model["inputs"]})[0]
+            if output.ndim == 3:
+                # 토큰 임베딩 평균 (패딩 제외)
+                mask = attention_mask[..., None].astype(np.float32)
+                output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            for row, i in enumerate(batch):
+                vectors[i] = output[row]
+        return np.stack(vectors).astype(np.float32)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        model = self._load()
+        if model["kind"] == "onnx":
+            vectors = self._run_onnx(model, texts)
+        else:
+            vectors = model["model"].encode(texts, batch_size=self.max_batch_size, convert_to_numpy=True)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.clip(norms, 1e-12, None)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([self.passage_prefix + t for t in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([self.query_prefix + text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """여러 질문을 한 번에 (embed_query와 같은 접두어, 동적 배치)"""
+        return self._embed([self.query_prefix + t for t in texts])
@@ -0,0 +1,88 @@
+# @title src/manifest.py
+import os
+import json
+import hashlib
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+
+
+def content_hash(text: str) -> str:
+    """문자열의 sha256 해시 (변경 감지용)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """파일 바이트의 sha256 해시"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    """
+    벡터 DB에 적재된 문서 목록을 기록하는 매니페스트.
+    문서(doc_id = 파일명)별로 공고 번호, 내용 해시, 청크 id 목록을 저장해 두고
+    다음 구축 때 신규/변경 문서만 다시 임베딩하고 삭제된 문서는 제거합니다.
+    """
+    FILE_NAME = "ingest_manifest.json"
+
+    def __init__(self, db_path: str):
+        self.path = os.path.join(db_path, self.FILE_NAME)
+        self.config = {}
+        self.entries: Dict[str, dict] = {}
+
+    @classmethod
+    def load(cls, db_path: str) -> "IngestManifest":
+        manifest = cls(db_path)
+        if os.path.exists(manifest.path):
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.config = data.get("config", {})
+            manifest.entries = data.get("entries", {})
+        return manifest
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"config": self.config, "entries": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def version(self) -> str:
+        """적재된 전체 문서 상태를 나타내는 해시 (문서가 바뀌면 값이 바뀜)"""
+        items = sorted((k, v.get("content_hash", "")) for k, v in self.entries.items())
+        return content_hash(json.dumps([self.config, items], ensure_ascii=False))[:16]
+
+    def diff(self, documents: List[Document]) -> Tuple[List[Document], List[str]]:
+        """
+        :return: (신규/변경 문서 목록, 삭제된 doc_id 목록)
+        """
+        current = {}
+        for doc in documents:
+            current[doc.metadata["doc_id"]] = doc
+
+        changed = [
+            doc for doc_id, doc in current.items()
+            if self.entries.get(doc_id, {}).get("content_hash") != doc.metadata["content_hash"]
+        ]
+        removed = [doc_id for doc_id in self.entries if doc_id not in current]
+        return changed, removed
+
+    def record(self, doc: Document, chunk_ids: List[str]):
+        self.entries[doc.metadata["doc_id"]] = {
+            "notice_id": doc.metadata.get("notice_id", ""),
+            "content_hash": doc.metadata["content_hash"],
+            "chunk_ids": chunk_ids,
+        }
+
+    def chunk_ids(self, doc_id: str) -> List[str]:
+        return self.entries.get(doc_id, {}).get("chunk_ids", [])
+
+    def remove(self, doc_id: str) -> List[str]:
+        return self.entries.pop(doc_id, {}).get("chunk_ids", [])
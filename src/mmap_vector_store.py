@@ -0,0 +1,411 @@
+# @title src/mmap_vector_store.py
+import os
+import json
+import mmap
+import uuid
+import shutil
+import threading
+import numpy as np
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# 메타데이터 필터 비교 연산자 (Chroma where 문법과 동일)
+_OPERATORS = {
+    "$eq": lambda v, x: v == x,
+    "$ne": lambda v, x: v != x,
+    "$in": lambda v, x: v in x,
+    "$nin": lambda v, x: v not in x,
+    "$gt": lambda v, x: v is not None and v > x,
+    "$gte": lambda v, x: v is not None and v >= x,
+    "$lt": lambda v, x: v is not None and v < x,
+    "$lte": lambda v, x: v is not None and v <= x,
+}
+
+
+def match_filter(metadata: dict, where: Optional[dict]) -> bool:
+    """{"file_ext": "hwp"}, {"budget": {"$gte": 1e8}}, {"$and": [...]}, {"$or": [...]} 형식"""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_filter(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(match_filter(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            if not all(_OPERATORS[op](value, x) for op, x in cond.items()):
+                return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """정규화 벡터용 spherical k-means (코사인 유사도 기준). 학습은 최대 100k개 표본으로."""
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= 100_000 else vectors[rng.choice(len(vectors), 100_000, replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            # 빈 군집은 임의 표본으로 다시 시작
+            centroids[c] = members.sum(axis=0) if len(members) else sample[rng.integers(len(sample))]
+        centroids = _normalize_rows(centroids)
+    return centroids.astype(np.float32)
+
+
+class _Records:
+    """
+    레코드(본문 또는 메타데이터 JSON)의 UTF-8 바이트 + 오프셋 색인.
+    파일은 memory-map으로 열어 워커 프로세스끼리 페이지 캐시를 공유하고, 필요한 행만 그때 디코딩합니다.
+    """
+
+    def __init__(self, blob=b"", offsets=None):
+        self._blob = blob
+        self.offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+
+    @classmethod
+    def open(cls, path: str) -> "_Records":
+        offsets = np.load(path + ".idx.npy", mmap_mode="r")
+        if not os.path.getsize(path):
+            return cls(b"", offsets)
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), offsets)
+
+    @classmethod
+    def from_values(cls, values: List[bytes]) -> "_Records":
+        return cls(b"".join(values), np.concatenate([[0], np.cumsum([len(v) for v in values])]).astype(np.int64))
+
+    @staticmethod
+    def write(path: str, values: Iterable[bytes]):
+        offsets = [0]
+        with open(path, "wb") as f:
+            for value in values:
+                f.write(value)
+                offsets.append(offsets[-1] + len(value))
+        np.save(path + ".idx.npy", np.asarray(offsets, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self._blob[int(self.offsets[i]):int(self.offsets[i + 1])])
+
+    def text(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+    def json(self, i: int):
+        return json.loads(self.raw(i))
+
+
+def _encode_text(text: str) -> bytes:
+    return text.encode("utf-8")
+
+
+def _encode_json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+class _IndexData:
+    """한 세대(gen-*)의 문서/벡터/IVF 색인 (읽기 전용). 본문/메타데이터는 행 단위로 필요할 때만 디코딩"""
+
+    def __init__(self, ids, texts: _Records, metadatas: _Records, f32, i8, scales, centroids=None, offsets=None,
+                 members=None, trained: int = 0):
+        self.ids, self.texts, self.metadatas = ids, texts, metadatas
+        self.f32, self.i8, self.scales = f32, i8, scales
+        self.centroids, self.offsets, self.members = centroids, offsets, members
+        self.trained = trained  # 군집 중심을 학습할 때의 벡터 수
+        self.id_index = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    def metadata(self, i: int) -> dict:
+        return self.metadatas.json(i)
+
+    def document(self, i: int) -> Document:
+        return Document(id=self.ids[i], page_content=self.texts.text(i), metadata=self.metadata(i))
+
+    def assignments(self) -> Optional[np.ndarray]:
+        """행별 IVF 군집 번호 (색인이 없으면 None)"""
+        if self.centroids is None:
+            return None
+        assign = np.empty(len(self.ids), dtype=np.int64)
+        assign[self.members] = np.repeat(np.arange(len(self.centroids)), np.diff(self.offsets))
+        return assign
+
+
+class MmapVectorStore(VectorStore):
+    """
+    프로세스 내장형 벡터 저장소 (Chroma 대체 백엔드).
+    - 벡터는 정규화 float32 행렬 + 행별 스케일 int8 행렬(.npy), 본문/메타데이터는 오프셋 색인 바이트 파일로 저장하고
+      모두 memory-map으로 열어 여러 워커 프로세스가 같은 페이지 캐시를 공유합니다 (행은 읽을 때만 디코딩).
+    - 문서가 IVF_MIN_VECTORS개 이상이면 IVF(k-means 군집) 색인으로 nprobe개 군집만 탐색합니다.
+      (메타데이터 필터 검색은 필터를 통과한 행 전체를 탐색)
+      증분 추가 때는 기존 군집 중심에 새 벡터만 배정하고, 문서 수가 학습 때의 절반~2배를 벗어나면 다시 학습합니다.
+    - int8 근사 점수로 후보를 고른 뒤 float32로 정확히 다시 채점(rescore)합니다.
+    - 메타데이터 필터(Chroma where 문법)와 id 기준 추가/삭제를 지원해 매니페스트 증분 갱신에 그대로 쓸 수 있습니다.
+      변경은 새 세대(gen-*) 폴더에 쓰고 CURRENT 포인터를 바꾸며, 직전 세대는 다음 쓰기 때까지 남겨
+      CURRENT를 막 읽은 다른 프로세스도 열 수 있게 합니다.
+    similarity_search_with_score는 Chroma처럼 거리(코사인 거리, 작을수록 유사)를 반환합니다.
+    """
+    IVF_MIN_VECTORS = 2048
+
+    def __init__(self, persist_directory: str, embedding_function: Embeddings, nprobe: int = 8,
+                 rescore: bool = True, rescore_factor: int = 4):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.nprobe = nprobe
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    # ---------- 저장 / 로드 ----------
+    def _current_generation(self) -> Optional[str]:
+        pointer = os.path.join(self.persist_directory, "CURRENT")
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer, "r", encoding="utf-8") as f:
+            return f.read().strip()
+
+    def _load(self, attempts: int = 3):
+        """현재 세대를 열어 self._data를 한 번에 교체합니다 (검색 중인 스레드는 이전 스냅샷을 계속 사용)."""
+        for attempt in range(attempts):
+            generation = self._current_generation()
+            try:
+                self._data = self._open(generation)
+                return
+            except FileNotFoundError:
+                # CURRENT를 읽은 뒤 세대가 두 번 이상 바뀌어 정리된 경우 -> 포인터를 다시 읽음
+                if attempt == attempts - 1:
+                    raise
+
+    def _open(self, generation: Optional[str]) -> _IndexData:
+        if generation is None and os.path.exists(os.path.join(self.persist_directory, "chroma.sqlite3")):
+            # 예전 Chroma DB 폴더를 빈 저장소로 열면 context 없이 답변하게 되므로 중단
+            raise ValueError(f"{self.persist_directory}는 Chroma DB 폴더입니다. "
+                             f"mmap 저장소로 DB를 다시 구축하세요.")
+        if generation is None:
+            return _IndexData([], _Records(), _Records(), np.zeros((0, 0), dtype=np.float32),
+                              np.zeros((0, 0), dtype=np.int8), np.zeros(0, dtype=np.float32))
+        current = os.path.join(self.persist_directory, generation)
+        load = lambda name: np.load(os.path.join(current, name), mmap_mode="r")
+        with open(os.path.join(current, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if os.path.exists(os.path.join(current, "records.jsonl")):
+            # 이전 형식 세대 (레코드 전체를 메모리로 읽음, 다음 쓰기 때 새 형식으로 저장됨)
+            with open(os.path.join(current, "records.jsonl"), "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            ids = [r["id"] for r in records]
+            texts = _Records.from_values([_encode_text(r["text"]) for r in records])
+            metadatas = _Records.from_values([_encode_json(r["metadata"]) for r in records])
+        else:
+            with open(os.path.join(current, "ids.json"), "r", encoding="utf-8") as f:
+                ids = json.load(f)
+            texts = _Records.open(os.path.join(current, "texts.bin"))
+            metadatas = _Records.open(os.path.join(current, "metadata.bin"))
+        ivf = (load("ivf_centroids.npy"), load("ivf_offsets.npy"), load("ivf_members.npy")) \
+            if os.path.exists(os.path.join(current, "ivf_centroids.npy")) else (None, None, None)
+        return _IndexData(ids, texts, metadatas, load("vectors_f32.npy"), load("vectors_i8.npy"), load("scales.npy"),
+                          *ivf, trained=meta.get("ivf_trained", meta.get("count", 0)))
+
+    def _write(self, ids: List[str], texts: Iterable[bytes], metadatas: Iterable[bytes], vectors: np.ndarray,
+               centroids: Optional[np.ndarray] = None, assign: Optional[np.ndarray] = None, trained: int = 0):
+        """
+        새 세대(gen-*) 폴더에 전부 쓰고 CURRENT 포인터를 교체합니다. 읽는 중인 이전 세대 mmap은 영향 없음.
+        :param centroids: 재사용할 IVF 군집 중심 (assign: 앞쪽 행들의 기존 배정, 나머지 행만 새로 배정)
+        """
+        os.makedirs(self.persist_directory, exist_ok=True)
+        previous = self._current_generation()
+        generation = f"gen-{uuid.uuid4().hex[:12]}"
+        target = os.path.join(self.persist_directory, generation)
+        os.makedirs(target)
+
+        vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0, dtype=np.float32)
+        quantized = np.round(vectors / np.clip(scales[:, None], 1e-12, None)).astype(np.int8)
+        np.save(os.path.join(target, "vectors_f32.npy"), vectors)
+        np.save(os.path.join(target, "vectors_i8.npy"), quantized)
+        np.save(os.path.join(target, "scales.npy"), scales.astype(np.float32))
+
+        if len(vectors) >= self.IVF_MIN_VECTORS:
+            if centroids is None or not trained / 2 <= len(vectors) <= trained * 2:
+                # 군집 중심 (재)학습
+                centroids, assign, trained = _kmeans(vectors, int(np.sqrt(len(vectors)))), None, len(vectors)
+            assign = np.zeros(0, dtype=np.int64) if assign is None else assign
+            new_assign = np.argmax(vectors[len(assign):] @ centroids.T, axis=1) if len(assign) < len(vectors) \
+                else np.zeros(0, dtype=np.int64)
+            assign = np.concatenate([assign, new_assign]).astype(np.int64)
+            nlist = len(centroids)
+            members = np.argsort(assign, kind="stable").astype(np.int64)
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+            np.save(os.path.join(target, "ivf_centroids.npy"), np.asarray(centroids, dtype=np.float32))
+            np.save(os.path.join(target, "ivf_offsets.npy"), offsets)
+            np.save(os.path.join(target, "ivf_members.npy"), members)
+        else:
+            trained = 0
+
+        with open(os.path.join(target, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(ids, f, ensure_ascii=False)
+        _Records.write(os.path.join(target, "texts.bin"), texts)
+        _Records.write(os.path.join(target, "metadata.bin"), metadatas)
+        with open(os.path.join(target, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"count": len(ids), "dim": int(vectors.shape[1]) if len(vectors) else 0,
+                       "ivf_trained": trained}, f)
+
+        pointer = os.path.join(self.persist_directory, "CURRENT")
+        with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(pointer + ".tmp", pointer)
+
+        # 직전 세대는 남기고 그보다 오래된 세대만 정리
+        # (다른 프로세스가 CURRENT를 읽고 아직 파일을 열기 전일 수 있음, 이미 열린 mmap은 지워져도 계속 읽힘)
+        for name in os.listdir(self.persist_directory):
+            if name.startswith("gen-") and name not in (generation, previous):
+                shutil.rmtree(os.path.join(self.persist_directory, name), ignore_errors=True)
+
+    # ---------- 추가 / 삭제 ----------
+    def _rewrite(self, keep: List[int], ids: List[str], texts: List[str], metadatas: List[dict],
+                 vectors: Optional[np.ndarray]):
+        """기존 문서 중 keep 행 + 새 문서로 새 세대를 쓰고 다시 엽니다 (기존 행은 디코딩 없이 바이트 그대로 복사)."""
+        data = self._data
+        old_vectors = np.asarray(data.f32[keep], dtype=np.float32)
+        if vectors is not None and len(vectors):
+            all_vectors = np.concatenate([old_vectors, vectors]) if len(old_vectors) else vectors
+        else:
+            all_vectors = old_vectors
+        assign = data.assignments()
+        self._write(
+            [data.ids[i] for i in keep] + ids,
+            [data.texts.raw(i) for i in keep] + [_encode_text(t) for t in texts],
+            [data.metadatas.raw(i) for i in keep] + [_encode_json(m) for m in metadatas],
+            all_vectors,
+            centroids=data.centroids, assign=assign[keep] if assign is not None else None, trained=data.trained,
+        )
+        self._load()
+
+    def _apply(self, delete_ids: Iterable[str], texts: List[str], metadatas: List[dict], ids: List[str]) -> bool:
+        """삭제 + 추가(같은 id는 교체)를 새 세대 한 번으로 반영. 바뀐 것이 없으면 False"""
+        vectors = np.asarray(self.embedding_function.embed_documents(texts), dtype=np.float32) if texts else None
+        with self._lock:
+            removed = set(delete_ids) | set(ids)
+            keep = [i for i, doc_id in enumerate(self._data.ids) if doc_id not in removed]
+            if not texts and len(keep) == len(self._data.ids):
+                return False
+            self._rewrite(keep, ids, texts, metadatas, vectors)
+        return True
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        # 같은 id는 교체 (Chroma upsert와 동일)
+        self._apply([], texts, metadatas, ids)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        return self._apply(ids, [], [], [])
+
+    def apply_changes(self, delete_ids: List[str], documents: List[Document], ids: List[str]):
+        """매니페스트 증분 갱신: 오래된 청크 삭제 + 새 청크 추가를 세대 한 번 쓰기로 반영합니다."""
+        self._apply(delete_ids, [d.page_content for d in documents], [d.metadata for d in documents], ids)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        data = self._data
+        return [data.document(data.id_index[doc_id]) for doc_id in ids if doc_id in data.id_index]
+
+    # ---------- 검색 ----------
+    def _candidates(self, data: _IndexData, query: np.ndarray) -> np.ndarray:
+        if data.centroids is None:
+            return np.arange(len(data.ids))
+        probes = np.argsort(-(data.centroids @ query))[:self.nprobe]
+        return np.concatenate([data.members[data.offsets[c]:data.offsets[c + 1]] for c in probes])
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        data = self._data
+        if not data.ids:
+            return []
+        query = _normalize_rows(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        if filter:
+            # 필터가 있으면 IVF 탐색 없이 필터를 통과한 전체 행에서 검색 (탐색 군집 밖의 문서도 빠지지 않게)
+            candidates = np.array([i for i in range(len(data.ids)) if match_filter(data.metadata(i), filter)],
+                                  dtype=np.int64)
+            if not len(candidates):
+                return []
+        else:
+            candidates = self._candidates(data, query)
+
+        # 1) int8 근사 점수로 후보 축소 -> 2) float32 정확 재채점
+        approx = (data.i8[candidates].astype(np.float32) @ query) * data.scales[candidates]
+        if self.rescore:
+            shortlist = candidates[np.argsort(-approx)[:k * self.rescore_factor]]
+            scores = data.f32[shortlist] @ query
+        else:
+            shortlist, scores = candidates, approx
+        order = np.argsort(-scores)[:k]
+        return [(data.document(int(shortlist[i])), float(1.0 - scores[i])) for i in order]
+
+    def similarity_search_by_vectors_with_score(self, embeddings, k: int = 4, filter: Optional[dict] = None,
+                                                max_block_floats: int = 2 ** 26) -> List[List[Tuple[Document, float]]]:
+        """
+        여러 질문 벡터를 행렬 곱으로 한 번에 검색합니다 (일괄 질의응답용).
+        IVF/int8 근사 없이 전체 float32 정확 점수 - 점수 행렬이 max_block_floats를 넘지 않게 질문을 나눠 계산
+        """
+        data = self._data
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        if not data.ids or not len(queries):
+            return [[] for _ in range(len(queries))]
+        if filter:
+            return [self.similarity_search_by_vector_with_score(q, k, filter) for q in queries]
+        k = min(k, len(data.ids))
+        block = max(1, min(len(queries), max_block_floats // len(data.ids)))
+        results = []
+        for start in range(0, len(queries), block):
+            scores = data.f32 @ queries[start:start + block].T  # (문서 수, 질문 수)
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+            for j in range(top.shape[1]):
+                rows = top[:, j][np.argsort(-scores[top[:, j], j])]
+                results.append([(data.document(int(i)), float(1.0 - scores[i, j])) for i in rows])
+        return results
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # 코사인 거리 -> 유사도
+        return lambda distance: 1.0 - distance
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: str = "./mmap_db",
+                   **kwargs: Any) -> "MmapVectorStore":
+        store = cls(persist_directory=persist_directory, embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
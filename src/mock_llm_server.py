@@ -0,0 +1,278 @@
+# @title src/mock_llm_server.py
+"""
+오프라인 처리량 테스트용 모의 LLM 서버 (표준 라이브러리만 사용).
+- OpenAI 호환: POST /v1/chat/completions (stream 포함), POST /v1/embeddings
+- Ollama 호환: POST /api/chat (NDJSON stream 포함)
+- 첫 토큰 지연, 초당 토큰 수, 분당 요청 한도(429 + Retry-After), 임의 503 비율을 흉내냅니다.
+
+사용 예)
+    python -m src.mock_llm_server --port 8011 --rpm 600                 # 서버만 실행
+    OPENAI_BASE_URL=http://127.0.0.1:8011/v1 OLLAMA_HOST=http://127.0.0.1:8011 streamlit run app.py
+    python -m src.mock_llm_server --bench 300 --concurrency 32 --rpm 600 --error-rate 0.05
+"""
+import os
+import json
+import time
+import uuid
+import base64
+import random
+import hashlib
+import argparse
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_ANSWER = "요청하신 사업의 예산은 1억 3천만 원이며, 발주 기관은 한국모의기관입니다."
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.2, tokens_per_second: float = 200.0, rpm: int = None,
+                 error_rate: float = 0.0, answer: str = MOCK_ANSWER):
+        super().__init__(address, MockLLMHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.answer = answer
+        self._window = deque()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self) -> float:
+        """분당 요청 한도 검사. 받으면 0, 초과면 Retry-After 초"""
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if self.rpm and len(self._window) >= self.rpm:
+                self.stats["rate_limited"] += 1
+                return round(60 - (now - self._window[0]), 3)
+            self._window.append(now)
+            return 0.0
+
+    def tokens(self):
+        # 글자 2개를 토큰 하나로 흉내
+        return [self.answer[i:i + 2] for i in range(0, len(self.answer), 2)]
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive (게이트웨이 연결 풀 재사용 확인용)
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---------- 응답 헬퍼 ----------
+    def _json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _stream_tokens(self):
+        time.sleep(self.server.latency)
+        for token in self.server.tokens():
+            if self.server.tokens_per_second:
+                time.sleep(1 / self.server.tokens_per_second)
+            yield token
+
+    def _reject(self) -> bool:
+        """한도 초과(429) 또는 임의 장애(503)면 오류 응답 후 True"""
+        retry_after = self.server.admit()
+        if retry_after:
+            self._json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                       "code": "rate_limit_exceeded"}}, {"Retry-After": retry_after})
+            return True
+        if random.random() < self.server.error_rate:
+            with self.server._lock:
+                self.server.stats["errors"] += 1
+            self._json(503, {"error": {"message": "Service unavailable (mock)", "type": "server_error"}})
+            return True
+        return False
+
+    # ---------- 라우팅 ----------
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/api/tags", "/v1/models"):
+            self._json(200, {"models": [], "data": [], "stats": self.server.stats})
+        else:
+            self._json(404, {"error": {"message": f"not found: {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        routes = {"/v1/chat/completions": self._openai_chat, "/v1/embeddings": self._openai_embeddings,
+                  "/api/chat": self._ollama_chat}
+        handler = routes.get(self.path.split("?")[0])
+        if handler is None:
+            self._json(404, {"error": {"message": f"not found: {self.path}"}})
+        elif not self._reject():
+            handler(body)
+
+    def _openai_chat(self, body: dict):
+        model = body.get("model", "mock")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 2
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        base = {"id": completion_id, "created": int(time.time()), "model": model}
+        if not body.get("stream"):
+            answer = "".join(self._stream_tokens())
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(self.server.tokens()),
+                     "total_tokens": prompt_tokens + len(self.server.tokens())}
+            self._json(200, dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}]))
+            return
+
+        self._start_chunked("text/event-stream")
+        chunk = dict(base, object="chat.completion.chunk")
+        for token in self._stream_tokens():
+            delta = {"index": 0, "delta": {"content": token}, "finish_reason": None}
+            self._chunk(f"data: {json.dumps(dict(chunk, choices=[delta]), ensure_ascii=False)}\n\n")
+        stop = {"index": 0, "delta": {}, "finish_reason": "stop"}
+        self._chunk(f"data: {json.dumps(dict(chunk, choices=[stop]))}\n\n")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(self.server.tokens()),
+                     "total_tokens": prompt_tokens + len(self.server.tokens())}
+            self._chunk(f"data: {json.dumps(dict(chunk, choices=[], usage=usage))}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self._end_chunked()
+
+    def _openai_embeddings(self, body: dict):
+        inputs = body.get("input", [])
+        inputs = inputs if isinstance(inputs, list) and inputs and not isinstance(inputs[0], int) else [inputs]
+        dimensions = body.get("dimensions") or 1536
+        data = []
+        for i, text in enumerate(inputs):
+            seed = int(hashlib.sha256(json.dumps(text, ensure_ascii=False).encode("utf-8")).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            embedding = (base64.b64encode(vector.tobytes()).decode() if body.get("encoding_format") == "base64"
+                         else vector.tolist())
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        time.sleep(self.server.latency / 4)
+        self._json(200, {"object": "list", "data": data, "model": body.get("model", "mock"),
+                         "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}})
+
+    def _ollama_chat(self, body: dict):
+        model = body.get("model", "mock")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 2
+        done = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                "prompt_eval_count": prompt_tokens, "eval_count": len(self.server.tokens())}
+        if body.get("stream") is False:
+            done["message"]["content"] = "".join(self._stream_tokens())
+            self._json(200, done)
+            return
+
+        self._start_chunked("application/x-ndjson")
+        for token in self._stream_tokens():
+            line = {"model": model, "created_at": done["created_at"],
+                    "message": {"role": "assistant", "content": token}, "done": False}
+            self._chunk(json.dumps(line, ensure_ascii=False) + "\n")
+        self._chunk(json.dumps(done, ensure_ascii=False) + "\n")
+        self._end_chunked()
+
+
+def serve(port: int = 8011, host: str = "127.0.0.1", background: bool = False, **options) -> MockLLMServer:
+    server = MockLLMServer((host, port), **options)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        print(f"🧪 모의 LLM 서버 {server.url} (OpenAI: {server.url}/v1, Ollama: {server.url})")
+        server.serve_forever()
+    return server
+
+
+def run_load_test(server: MockLLMServer, requests: int = 200, concurrency: int = 32, model: str = "gpt-5-mini",
+                  backend: str = "openai", stream: bool = False) -> dict:
+    """모의 서버를 가리키도록 환경 변수를 바꾸고 게이트웨이로 동시 호출해 처리량/지연/재시도를 측정"""
+    os.environ["OPENAI_BASE_URL"] = f"{server.url}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ["OLLAMA_HOST"] = server.url
+    from src.llm_gateway import gateway
+
+    gateway.reset()
+    llm = gateway.chat(model, backend=backend)
+
+    def _call(i):
+        start = time.perf_counter()
+        prompt = f"모의 질문 {i}: 사업 예산은 얼마인가요?"
+        try:
+            if stream:
+                "".join(chunk.content for chunk in llm.stream(prompt))
+            else:
+                llm.invoke(prompt)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(_call, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([seconds for seconds, _ in results])
+    failures = [error for _, error in results if error]
+    return {
+        "requests": requests, "concurrency": concurrency, "seconds": round(elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+        "failed": len(failures), "first_error": failures[0] if failures else None,
+        "server": dict(server.stats), "gateway": gateway.stats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="오프라인 처리량 테스트용 모의 LLM 서버 (OpenAI / Ollama 호환)")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--latency", type=float, default=0.2, help="첫 토큰까지 지연 (초)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--rpm", type=int, default=None, help="분당 요청 한도 (초과 시 429 + Retry-After)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="임의 503 응답 비율")
+    parser.add_argument("--bench", type=int, default=0, help="지정하면 서버를 띄우고 게이트웨이로 N건 동시 호출")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--model", default="gpt-5-mini")
+    parser.add_argument("--backend", default="openai", choices=["openai", "ollama"])
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args(argv)
+
+    options = {"latency": args.latency, "tokens_per_second": args.tokens_per_second, "rpm": args.rpm,
+               "error_rate": args.error_rate}
+    if not args.bench:
+        serve(args.port, **options)
+        return
+    server = serve(args.port, background=True, **options)
+    report = run_load_test(server, args.bench, args.concurrency, model=args.model, backend=args.backend,
+                           stream=args.stream)
+    server.shutdown()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# @title src/query_router.py
+import re
+from collections import defaultdict
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+
+# 정형 메타데이터로 바로 답할 수 있는 질문 유형 (build_eval_dataset 템플릿 + 자주 쓰는 구어체)
+# 질문 전체가 "<사업명/파일명>의 <항목>은 <의문사>?" 형태일 때만 인식합니다.
+# ("X의 예산 중 인건비 비율은?", "X의 발주 기관 담당자 연락처는?"처럼 뒤에 다른 내용이 붙으면 일반 RAG로)
+_ASK = r"\s*(?:은|는|이|가)?\s*(?:{words})\s*(?:인가요|인가|입니까|인지|이에요|예요|에요|이야|야|죠|지)?\s*[?？.]*"
+INTENT_PATTERNS = [
+    ("budget", re.compile(r"(?P<name>.+?)\s*의\s*(?:사업\s*)?(?:예산|사업\s*금액)" + _ASK.format(words="얼마"))),
+    ("agency", re.compile(r"(?P<name>.+?)\s*의\s*(?:발주\s*기관|발주처)" + _ASK.format(words="어디|누구|무엇|뭐"))),
+    ("file_ext", re.compile(r"(?P<name>.+?)\s*의\s*(?:파일\s*)?(?:확장자|파일\s*형식)" + _ASK.format(words="무엇|뭐"))),
+]
+# 사업명/파일명 뒤에 붙는 조사, 따옴표 등
+NAME_SUFFIX = re.compile(r"(?:\s|['\"]|의|문서|파일)+$")
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^0-9a-z가-힣]", "", str(text).lower())
+
+
+def _trigrams(text: str) -> set:
+    norm = _normalize(text)
+    if len(norm) < 3:
+        return {norm} if norm else set()
+    return {norm[i:i + 3] for i in range(len(norm) - 2)}
+
+
+def format_budget(budget) -> Optional[str]:
+    try:
+        amount = int(float(budget))
+    except (TypeError, ValueError):
+        return None
+    return f"{amount:,}원" if amount > 0 else None
+
+
+def detect_intent(query: str) -> Optional[Tuple[str, str]]:
+    """
+    :return: (질문 유형, 사업명/파일명) - 질문 전체가 의도 문장과 일치하지 않으면 None
+    """
+    query = str(query).strip()
+    for intent, pattern in INTENT_PATTERNS:
+        match = pattern.fullmatch(query)
+        if match:
+            name = NAME_SUFFIX.sub("", match.group("name")).strip(" '\"")
+            return (intent, name) if name else None
+    return None
+
+
+class MetadataQueryRouter:
+    """
+    예산 / 발주 기관 / 파일 확장자 질문을 감지해 CSV 메타데이터로 바로 답합니다.
+    사업명·파일명은 글자 trigram 역색인으로 퍼지 매칭하며,
+    확신할 수 없으면 None을 반환해 일반 RAG(검색 + LLM) 경로로 넘깁니다.
+    """
+
+    def __init__(self, documents: List[Document], min_score: float = 0.6, min_margin: float = 0.1):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        # 메타데이터 테이블 (문서당 1행)
+        self.records = []
+        self.by_file = {}
+        seen = set()
+        for doc in documents:
+            meta = doc.metadata
+            key = meta.get("doc_id") or meta.get("source")
+            if key in seen:
+                continue
+            seen.add(key)
+            self.by_file[_normalize(meta.get("source", ""))] = len(self.records)
+            self.records.append({
+                "doc_id": key,
+                "title": str(meta.get("title", "")),
+                "agency": str(meta.get("agency", "")),
+                "budget": meta.get("budget"),
+                "source": str(meta.get("source", "")),
+                "file_ext": meta.get("file_ext", ""),
+            })
+
+        # 사업명 + 파일명(확장자 제외) trigram 역색인
+        self.grams = []
+        self.inverted = defaultdict(set)
+        for i, rec in enumerate(self.records):
+            grams = _trigrams(rec["title"]) | _trigrams(rec["source"].rsplit(".", 1)[0])
+            self.grams.append(grams)
+            for gram in grams:
+                self.inverted[gram].add(i)
+
+    def detect_intent(self, query: str) -> Optional[Tuple[str, str]]:
+        return detect_intent(query)
+
+    def resolve(self, name: str) -> Optional[dict]:
+        """사업명/파일명으로 문서 메타데이터 1건을 찾습니다 (애매하면 None)."""
+        exact = self.by_file.get(_normalize(name))
+        if exact is not None:
+            return self.records[exact]
+
+        query_grams = _trigrams(name)
+        if not query_grams:
+            return None
+        candidates = set()
+        for gram in query_grams:
+            candidates |= self.inverted.get(gram, set())
+
+        scored = []
+        for i in candidates:
+            # 질의 trigram 중 해당 문서의 사업명/파일명에 포함된 비율
+            scored.append((len(query_grams & self.grams[i]) / len(query_grams), i))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        best_score, best = scored[0]
+        second_score = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score < self.min_score or best_score - second_score < self.min_margin:
+            return None
+        return self.records[best]
+
+    # 질문에 그대로 들어 있을 때 사업을 확정할 수 있는 최소 이름 길이 (정규화 후 글자 수)
+    MIN_MENTION_CHARS = 6
+
+    def mentioned(self, query: str) -> Optional[dict]:
+        """질문에 사업명/파일명이 그대로 들어 있으면 그 문서 메타데이터 (여럿이면 가장 긴 이름, 없으면 None)"""
+        norm = _normalize(query)
+        best, best_len = None, 0
+        for rec in self.records:
+            for name in (rec["title"], rec["source"].rsplit(".", 1)[0]):
+                key = _normalize(name)
+                if len(key) >= max(self.MIN_MENTION_CHARS, best_len + 1) and key in norm:
+                    best, best_len = rec, len(key)
+        return best
+
+    def route(self, query: str) -> Optional[str]:
+        return self.route_record(query)[0]
+
+    def route_record(self, query: str) -> Tuple[Optional[str], Optional[dict]]:
+        """:return: (답변, 답변에 쓴 문서 메타데이터) - 답할 수 없으면 (None, None)"""
+        detected = self.detect_intent(query)
+        if not detected:
+            return None, None
+        intent, name = detected
+        rec = self.resolve(name)
+        if rec is None:
+            return None, None
+
+        answer = None
+        if intent == "budget":
+            budget = format_budget(rec["budget"])
+            answer = f"{rec['title']}의 사업 예산은 {budget}입니다." if budget else None
+        elif intent == "agency":
+            answer = f"{rec['title']}의 발주 기관은 {rec['agency']}입니다." if rec["agency"] else None
+        elif intent == "file_ext":
+            answer = f"'{rec['source']}' 문서의 파일 확장자는 {rec['file_ext']}입니다." if rec["file_ext"] else None
+        return (answer, rec) if answer else (None, None)
@@ -0,0 +1,149 @@
+# @title src/reranker.py
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List
+from langchain_core.documents import Document
+from src.local_embeddings import CpuModel
+from src.manifest import content_hash
+from src.tracing import tracer
+
+
+class CrossEncoderReranker(CpuModel):
+    """
+    CPU cross-encoder 재순위화 (질문-청크 쌍을 함께 읽어 관련도 점수 계산).
+    - backend / num_threads / quantize / 동적 배치는 LocalEmbeddings와 동일 (ONNX 우선)
+    - 점수 캐시: (모델, 질문, 청크 본문) -> 점수 LRU. 같은 질문 재검색이나 평가 반복 시 추론 생략
+
+    폐쇄망에서는 LOCAL_RERANKER_MODEL에 미리 받아 둔 모델 폴더 경로를 지정하세요.
+    """
+    DEFAULT_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+    def __init__(self, model_name: str = None, backend: str = "auto", num_threads: int = None,
+                 quantize: bool = None, max_batch_tokens: int = 8192, max_batch_size: int = 32,
+                 cache_size: int = 4096):
+        super().__init__(
+            model_name or os.getenv("LOCAL_RERANKER_MODEL", self.DEFAULT_MODEL), backend=backend,
+            num_threads=num_threads,
+            quantize=quantize if quantize is not None else os.getenv("LOCAL_RERANKER_QUANTIZE") == "1",
+            max_batch_tokens=max_batch_tokens, max_batch_size=max_batch_size,
+        )
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    # ---------- 모델 로드 ----------
+    def _load_onnx(self):
+        from tokenizers import Tokenizer
+
+        model_dir = self._model_dir()
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        # 길이 초과 시 질문은 남기고 청크 쪽을 자름
+        tokenizer.enable_truncation(max_length=self.MAX_LENGTH, strategy="only_second")
+        tokenizer.no_padding()
+        pad_id = next((tokenizer.token_to_id(t) for t in ("<pad>", "[PAD]") if tokenizer.token_to_id(t) is not None), 0)
+
+        session = self._onnx_session(model_dir)
+        return {"kind": "onnx", "session": session, "tokenizer": tokenizer, "pad_id": pad_id,
+                "inputs": {i.name for i in session.get_inputs()}}
+
+    def _load_sentence_transformers(self):
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        torch.set_num_threads(self.num_threads)
+        model = CrossEncoder(self.model_name, device="cpu", max_length=self.MAX_LENGTH)
+        if self.quantize:
+            model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+        return {"kind": "sentence-transformers", "model": model}
+
+    def load(self):
+        """모델을 (최초 1회) 로드합니다. 패키지/모델 파일이 없으면 ImportError / OSError"""
+        return self._load()
+
+    # ---------- 추론 ----------
+    def _run_onnx(self, model: dict, query: str, passages: List[str]) -> np.ndarray:
+        encodings = model["tokenizer"].encode_batch([(query, p) for p in passages])
+        scores = np.zeros(len(passages), dtype=np.float32)
+        for batch in self._batches([len(e.ids) for e in encodings]):
+            input_ids, attention_mask, token_type_ids = self._pad(encodings, batch, model["pad_id"])
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+            logits = model["session"].run(None, {k: v for k, v in feeds.items() if k in model["inputs"]})[0]
+            # 출력이 1개면 관련도 logit, 2개(비관련/관련)면 관련 쪽 logit
+            scores[batch] = logits[:, -1] if logits.ndim == 2 else logits
+        return scores
+
+    def _score(self, query: str, passages: List[str]) -> List[float]:
+        model = self._load()
+        if model["kind"] == "onnx":
+            return self._run_onnx(model, query, passages).tolist()
+        pairs = [(query, p) for p in passages]
+        return np.asarray(model["model"].predict(pairs, batch_size=self.max_batch_size)).reshape(-1).tolist()
+
+    def score(self, query: str, passages: List[str]) -> List[float]:
+        """청크별 관련도 점수 (캐시에 없는 청크만 한 번에 배치 추론)"""
+        keys = [content_hash(f"{self.model_id}\x00{query}\x00{p}") for p in passages]
+        scores = [None] * len(passages)
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        self._stats["hits"] += len(passages) - len(missing)
+        self._stats["misses"] += len(missing)
+        if missing:
+            for i, value in zip(missing, self._score(query, [passages[i] for i in missing])):
+                scores[i] = float(value)
+            with self._cache_lock:
+                for i in missing:
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(self, query: str, docs: List[Document], top_n: int = 3) -> List[Document]:
+        if not docs:
+            return []
+        scores = self.score(query, [doc.page_content for doc in docs])
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order[:top_n]]
+
+    def stats(self) -> dict:
+        return dict(self._stats, cached=len(self._cache))
+
+
+class RerankingRetriever:
+    """
+    후보를 넉넉히 검색(over-fetch)한 뒤 cross-encoder 점수로 top_n개만 남깁니다.
+    재순위화 모델을 쓸 수 없으면(패키지/모델 없음) 경고 후 이후 질문도 원래 순위를 그대로 사용하고,
+    질문 하나의 추론 오류는 그 질문만 원래 순위로 답합니다.
+    """
+
+    def __init__(self, retriever, reranker: CrossEncoderReranker, top_n: int = 3):
+        self.retriever = retriever
+        self.reranker = reranker
+        self.top_n = top_n
+        self.enabled = True
+
+    def invoke(self, query: str) -> List[Document]:
+        return self.rerank(query, self.retriever.invoke(query))
+
+    def rerank(self, query: str, candidates: List[Document]) -> List[Document]:
+        """이미 검색한 후보를 재순위화 (일괄 질의응답은 후보를 한꺼번에 검색한 뒤 질문별로 호출)"""
+        if not self.enabled:
+            return candidates[:self.top_n]
+        try:
+            self.reranker.load()
+        except (ImportError, OSError) as e:
+            self.enabled = False
+            print(f"⚠️ 재순위화 모델을 사용할 수 없어 검색 순위를 그대로 사용합니다: {e}")
+            return candidates[:self.top_n]
+        try:
+            with tracer.span("rerank", candidates=len(candidates), reranker=self.reranker.model_id):
+                return self.reranker.rerank(query, candidates, self.top_n)
+        except Exception as e:
+            print(f"⚠️ 재순위화 실패 (이번 질문만 검색 순위 사용): {e}")
+            return candidates[:self.top_n]
@@ -0,0 +1,185 @@
+# @title src/retrieval_benchmark.py
+"""
+검색 단계만 측정하는 벤치마크 (LLM 호출 없음).
+build_eval_dataset의 질문별 source(파일명)를 정답 문서로 보고 BM25 / 벡터 / 하이브리드 검색기의
+recall@k, MRR, 지연 시간(p50/p95/p99)을 구합니다.
+
+사용 예:
+    python -m src.retrieval_benchmark --engine b --ks 1,3,5 --output bench.json
+    # 같은 문서로 저장소 백엔드 비교 (DB가 없으면 구축)
+    python -m src.retrieval_benchmark --db-path ./bench_mmap --vector-backend mmap --output mmap.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, List
+from dotenv import load_dotenv
+from src.engine_registry import EngineRegistry
+from src.evaluation_dataset_builder import build_eval_dataset
+from src.bm25_index import BM25IndexRetriever
+from src.chunking import SmallToBigRetriever
+from src.generator import RFPGenerator, SimpleHybridRetriever
+from src.reranker import CrossEncoderReranker, RerankingRetriever
+from src.vector_db import EMBEDDING_BACKENDS, VECTOR_BACKENDS, RFPVectorDB
+
+load_dotenv()
+
+
+def _set_depth(retriever, depth: int):
+    """검색기가 돌려주는 후보 수를 depth로 맞춥니다."""
+    if hasattr(retriever, "search_kwargs"):
+        retriever.search_kwargs["k"] = depth
+    elif hasattr(retriever, "k"):
+        retriever.k = depth
+
+
+def _first_relevant_rank(docs, source: str):
+    for rank, doc in enumerate(docs, start=1):
+        if doc.metadata.get("source") == source:
+            return rank
+    return None
+
+
+def benchmark_retriever(retriever, dataset: List[dict], ks: List[int], warmup: int = 1) -> dict:
+    """
+    :return: {"queries", "recall@k"..., "mrr", "latency_ms": {"mean", "p50", "p95", "p99"}}
+    """
+    for row in dataset[:warmup]:
+        retriever.invoke(row["question"])
+
+    ranks, latencies = [], []
+    for row in dataset:
+        start = time.perf_counter()
+        docs = retriever.invoke(row["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranks.append(_first_relevant_rank(docs, row["source"]))
+
+    n = len(dataset)
+    report = {"queries": n}
+    for k in ks:
+        report[f"recall@{k}"] = round(sum(1 for r in ranks if r is not None and r <= k) / n, 4) if n else 0.0
+    report["mrr"] = round(sum(1.0 / r for r in ranks if r is not None) / n, 4) if n else 0.0
+    report["latency_ms"] = {
+        "mean": round(float(np.mean(latencies)), 2) if latencies else 0.0,
+        **{f"p{p}": round(float(np.percentile(latencies, p)), 2) if latencies else 0.0 for p in (50, 95, 99)},
+    }
+    return report
+
+
+def run_benchmark(generator, dataset: List[dict], ks: List[int], depth: int = None,
+                  fusion: str = "rrf", weights=(0.5, 0.5), retrievers=("bm25", "vector", "hybrid"),
+                  warmup: int = 1, reranker: CrossEncoderReranker = None, rerank_candidates: int = 20) -> Dict[str, dict]:
+    """
+    init_retriever로 준비된 생성기의 BM25 / 벡터 검색기와, 같은 두 검색기를 융합한 하이브리드 검색기를 측정합니다.
+    :param depth: 검색기별 반환 후보 수 (기본값 max(ks))
+    :param reranker: 지정하면 하이브리드 후보 rerank_candidates개를 재순위화한 "reranked"도 측정
+    """
+    depth = depth or max(ks)
+    candidates = {"bm25": generator.bm25_retriever, "vector": generator.vector_retriever}
+    for retriever in candidates.values():
+        if retriever is not None:
+            _set_depth(retriever, depth)
+    if candidates["bm25"] is not None and candidates["vector"] is not None:
+        candidates["hybrid"] = SimpleHybridRetriever(candidates["vector"], candidates["bm25"], fusion=fusion,
+                                                     weights=weights, top_k=depth)
+        if getattr(generator, "docstore", None) is not None:
+            # 하이브리드 자식 청크 -> 부모 섹션 확장 (실제 답변 경로와 같은 방식)
+            candidates["small_to_big"] = SmallToBigRetriever(
+                SimpleHybridRetriever(candidates["vector"], candidates["bm25"], fusion=fusion, weights=weights,
+                                      top_k=depth * 2),
+                generator.docstore, top_k=depth)
+        if reranker is not None:
+            # 재순위화 후보는 검색기별 depth와 무관하게 넉넉히 (별도 검색기로 구성)
+            vector = generator.vector_store.as_retriever(search_kwargs={"k": rerank_candidates // 2})
+            bm25 = BM25IndexRetriever(candidates["bm25"].index, candidates["bm25"].documents,
+                                      k=rerank_candidates // 2)
+            candidates["reranked"] = RerankingRetriever(
+                SimpleHybridRetriever(vector, bm25, fusion=fusion, weights=weights, top_k=rerank_candidates),
+                reranker, top_n=depth)
+
+    results = {}
+    for name in retrievers:
+        if candidates.get(name) is None:
+            print(f"⚠️ {name} 검색기가 없어 건너뜁니다.")
+            continue
+        results[name] = benchmark_retriever(candidates[name], dataset, ks, warmup=warmup)
+    return results
+
+
+def _print_table(results: Dict[str, dict], ks: List[int]):
+    header = ["retriever"] + [f"R@{k}" for k in ks] + ["MRR", "p50ms", "p95ms", "p99ms"]
+    print(" | ".join(f"{h:>9}" for h in header))
+    for name, rep in results.items():
+        cells = [name] + [f"{rep[f'recall@{k}']:.3f}" for k in ks] + [f"{rep['mrr']:.3f}"]
+        cells += [f"{rep['latency_ms'][p]:.1f}" for p in ("p50", "p95", "p99")]
+        print(" | ".join(f"{c:>9}" for c in cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="검색 단계 벤치마크 (recall@k, MRR, 지연 시간)")
+    parser.add_argument("--engine", choices=list(EngineRegistry.ENGINES), default="b",
+                        help="b: GPT 엔진(chroma_db), a: 로컬 엔진(local_mmap_db)")
+    parser.add_argument("--db-path", default=None,
+                        help="엔진 대신 이 경로의 벡터 DB로 측정 (없으면 아래 백엔드로 구축)")
+    parser.add_argument("--vector-backend", choices=list(VECTOR_BACKENDS), default="chroma")
+    parser.add_argument("--embedding-backend", choices=list(EMBEDDING_BACKENDS), default="openai")
+    parser.add_argument("--ks", default="1,3,5", help="recall@k의 k 목록 (쉼표 구분)")
+    parser.add_argument("--depth", type=int, default=None, help="검색기별 후보 수 (기본값: k 최댓값)")
+    parser.add_argument("--fusion", choices=["rrf", "weighted"], default="rrf")
+    parser.add_argument("--weights", default="0.5,0.5", help="하이브리드 가중치 (bm25,vector)")
+    parser.add_argument("--retrievers", default="bm25,vector,hybrid",
+                        help="bm25, vector, hybrid, small_to_big, reranked 중 쉼표 구분")
+    parser.add_argument("--rerank", action="store_true", help="CPU cross-encoder 재순위화(reranked)도 측정")
+    parser.add_argument("--rerank-candidates", type=int, default=20, help="재순위화 전 하이브리드 후보 수")
+    parser.add_argument("--sample-size", type=int, default=None, help="평가 질문 수 (기본값: 전체)")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 예열 질의 수")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args(argv)
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    registry = EngineRegistry(base_dir)
+    if args.db_path:
+        documents = registry.documents()
+        db = RFPVectorDB(db_path=args.db_path, embedding_backend=args.embedding_backend,
+                         vector_backend=args.vector_backend)
+        generator = RFPGenerator(db.create_vector_db(documents))
+        generator.init_retriever(documents, bm25_index_dir=os.path.join(args.db_path, "bm25"), chunker=db.chunker)
+    else:
+        generator = registry.get(args.engine)
+        if generator is None:
+            print(f"🚨 엔진을 열 수 없습니다: {registry.errors[args.engine] or '벡터 DB가 없습니다. 먼저 DB를 구축하세요.'}")
+            return 1
+
+    ks = sorted({int(k) for k in args.ks.split(",")})
+    weights = tuple(float(w) for w in args.weights.split(","))
+    dataset = build_eval_dataset(registry.csv_path, sample_size=args.sample_size)
+    print(f"📏 검색 벤치마크: 질문 {len(dataset)}개, k={ks}, fusion={args.fusion}")
+
+    retrievers = args.retrievers.split(",")
+    if args.rerank and "reranked" not in retrievers:
+        retrievers.append("reranked")
+    results = run_benchmark(generator, dataset, ks, depth=args.depth, fusion=args.fusion, weights=weights,
+                            retrievers=retrievers, warmup=args.warmup,
+                            reranker=CrossEncoderReranker() if args.rerank else None,
+                            rerank_candidates=args.rerank_candidates)
+    _print_table(results, ks)
+
+    if args.output:
+        payload = {
+            "config": {"engine": args.engine, "db_path": args.db_path, "vector_backend": args.vector_backend,
+                       "embedding_backend": args.embedding_backend, "ks": ks, "depth": args.depth or max(ks),
+                       "fusion": args.fusion, "weights": list(weights), "queries": len(dataset),
+                       "rerank": args.rerank, "store_version": generator.store_version},
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
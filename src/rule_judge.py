@@ -0,0 +1,154 @@
+# @title src/rule_judge.py
+import re
+import threading
+from typing import List, Optional
+from src.query_router import detect_intent
+
+# 한글 수사 / 자릿수 단위
+HANGUL_DIGITS = {"영": 0, "일": 1, "이": 2, "삼": 3, "사": 4, "오": 5, "육": 6, "칠": 7, "팔": 8, "구": 9}
+SMALL_UNITS = {"십": 10, "백": 100, "천": 1000}
+BIG_UNITS = {"만": 10 ** 4, "억": 10 ** 8, "조": 10 ** 12}
+
+# 금액 후보 (예: 130,000,000원 / 1억 3천만 원 / 1.3억 / 삼천만원)
+AMOUNT_RE = re.compile(r"[\d일이삼사오육칠팔구십백천만억조][\d,.\s일이삼사오육칠팔구십백천만억조]*원?")
+AMOUNT_PART_RE = re.compile(r"(\d+(?:\.\d+)?)|([영일이삼사오육칠팔구])|([십백천])|([만억조])")
+# 사업 예산으로 볼 수 없는 작은 수 (연도, 개수 등)
+MIN_AMOUNT = 10_000
+# 부가세 포함/별도 금액 차이는 LLM 채점관에게 넘김
+VAT_RATE = 0.1
+
+KNOWN_EXTS = ["hwpx", "hwp", "pdf", "docx", "doc", "xlsx", "xls", "pptx", "ppt", "txt", "zip"]
+EXT_RE = re.compile(r"(?<![a-z0-9])(" + "|".join(KNOWN_EXTS) + r")(?![a-z0-9])")
+
+# 채점 가이드 4번 (정보 부재 = 오답)
+NO_INFO_RE = re.compile(r"찾을\s*수\s*없|알\s*수\s*없|확인할\s*수\s*없|모르|정보가\s*없|명시되어\s*있지\s*않|언급되어\s*있지\s*않")
+
+
+def _parse_token(token: str) -> List[int]:
+    """'1억 3천만' -> [130000000]. 큰 단위가 다시 커지면 새 금액으로 봅니다 ('1억 2억' -> 두 건)."""
+    amounts = []
+    total, section, num, last_big = 0, 0, None, None
+    for digits, hangul, small, big in AMOUNT_PART_RE.findall(token.replace(",", "")):
+        if digits or hangul:
+            if num is not None:  # 단위 없이 숫자가 연달아 나오면 별개 금액
+                amounts.append(total + section + num)
+                total, section, last_big = 0, 0, None
+            num = float(digits) if digits else HANGUL_DIGITS[hangul]
+        elif small:
+            section += (num if num is not None else 1) * SMALL_UNITS[small]
+            num = None
+        else:
+            if last_big is not None and BIG_UNITS[big] >= last_big:
+                amounts.append(total + section)
+                total, section = 0, 0
+            section += num if num is not None else 0
+            total += (section or 1) * BIG_UNITS[big]
+            section, num, last_big = 0, None, BIG_UNITS[big]
+    amounts.append(total + section + (num or 0))
+    return [int(round(a)) for a in amounts]
+
+
+def parse_amounts(text: str) -> List[int]:
+    """답변 속 금액 후보를 모두 원 단위 정수로 변환합니다."""
+    amounts = []
+    for match in AMOUNT_RE.finditer(str(text)):
+        token = match.group().strip(" ,.")
+        has_digit = any(ch.isdigit() for ch in token)
+        # '이 사업', '천안시', '만약' 같은 일반 단어는 제외 (한글 수사만 있으면 '원'으로 끝날 때만 금액)
+        if not token or (not has_digit and not token.endswith("원")):
+            continue
+        for part in re.split(r",\s+", token):
+            amounts.extend(a for a in _parse_token(part) if a >= MIN_AMOUNT)
+    return amounts
+
+
+def normalize_agency(name: str) -> str:
+    name = re.sub(r"\(.*?\)|㈜|㈔|㈐|주식회사|재단법인|사단법인", "", str(name))
+    name = re.sub(r"[^0-9a-z가-힣]", "", name.lower())
+    # '한영대학' = '한영대학교'
+    return name.replace("대학교", "대학")
+
+
+class RuleBasedJudge:
+    """
+    build_eval_dataset의 예산 / 발주 기관 / 파일 확장자 질문을 규칙으로 채점합니다.
+    확실한 정답·오답만 판정하고(True/False), 애매하면 None을 반환해 LLM 채점관에게 넘깁니다.
+    """
+    # 규칙이 바뀌면 올려서 저장된 평가 결과(EvalResultStore)와 구분
+    VERSION = 1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"correct": 0, "incorrect": 0, "llm": 0}
+
+    def judge(self, question: str, ground_truth, ai_answer: str) -> Optional[bool]:
+        verdict = self._judge(str(question), str(ground_truth).strip(), str(ai_answer))
+        with self._lock:
+            key = "llm" if verdict is None else ("correct" if verdict else "incorrect")
+            self._stats[key] += 1
+        return verdict
+
+    def _judge(self, question: str, ground_truth: str, ai_answer: str) -> Optional[bool]:
+        detected = detect_intent(question)
+        if not detected or not ground_truth or ground_truth.lower() in ("nan", "none", "알수없음"):
+            return None
+        intent = detected[0]
+        if intent == "budget":
+            return self._judge_budget(ground_truth, ai_answer)
+        if intent == "agency":
+            return self._judge_agency(ground_truth, ai_answer)
+        if intent == "file_ext":
+            return self._judge_ext(ground_truth, ai_answer)
+        return None
+
+    @staticmethod
+    def _judge_budget(ground_truth: str, ai_answer: str) -> Optional[bool]:
+        try:
+            expected = int(round(float(ground_truth.replace(",", ""))))
+        except ValueError:
+            return None
+        if expected <= 0:
+            return None
+        candidates = set(parse_amounts(ai_answer))
+        if expected in candidates:
+            return True
+        if not candidates:
+            return False if NO_INFO_RE.search(ai_answer) else None
+        # 부가세 포함/별도 금액일 수 있으면 LLM 판단
+        for amount in candidates:
+            if abs(amount * (1 + VAT_RATE) - expected) <= expected * 0.01 or \
+                    abs(amount - expected * (1 + VAT_RATE)) <= expected * 0.01:
+                return None
+        # 금액을 하나만 제시했는데 다르면 오답, 여러 금액이면 맥락 판단이 필요
+        return False if len(candidates) == 1 else None
+
+    @staticmethod
+    def _judge_agency(ground_truth: str, ai_answer: str) -> Optional[bool]:
+        expected = normalize_agency(ground_truth)
+        if not expected:
+            return None
+        if expected in normalize_agency(ai_answer):
+            return True
+        return False if NO_INFO_RE.search(ai_answer) else None
+
+    @staticmethod
+    def _judge_ext(ground_truth: str, ai_answer: str) -> Optional[bool]:
+        expected = ground_truth.lower().lstrip(".")
+        found = set(EXT_RE.findall(ai_answer.lower()))
+        if found == {expected}:
+            return True
+        if found and expected not in found:
+            return False
+        if not found and NO_INFO_RE.search(ai_answer):
+            return False
+        # '제안요청서' 같은 문서 유형 답변은 채점 가이드 3번에 따라 LLM 판단
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        stats["total"] = total
+        # LLM 채점 호출을 생략한 비율
+        stats["avoided_ratio"] = round((stats["correct"] + stats["incorrect"]) / total, 3) if total else 0.0
+        return stats
@@ -0,0 +1,95 @@
+# @title src/snapshot.py
+import os
+import json
+import math
+from typing import List, Optional
+from langchain_core.documents import Document
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pyarrow가 없으면 스냅샷 없이 매번 원본에서 로드
+    pa = None
+
+# 스냅샷 구조나 로더의 문서 생성 방식이 바뀌면 버전을 올려 기존 스냅샷을 무효화합니다.
+SNAPSHOT_VERSION = 2
+
+
+def source_signature(table_path: str, files_dir: str, **options) -> dict:
+    """원본(CSV/Excel, 첨부 파일 폴더)의 크기/수정 시각 + 로드 옵션. 하나라도 바뀌면 스냅샷은 무효."""
+    stat = os.stat(table_path)
+    files = []
+    if os.path.isdir(files_dir):
+        for entry in sorted(os.scandir(files_dir), key=lambda e: e.name):
+            if entry.is_file():
+                file_stat = entry.stat()
+                files.append([entry.name, file_stat.st_size, file_stat.st_mtime_ns])
+    return {
+        "version": SNAPSHOT_VERSION,
+        "table": [os.path.basename(table_path), stat.st_size, stat.st_mtime_ns],
+        "files": files,
+        "options": options,
+    }
+
+
+class DocumentSnapshot:
+    """
+    로드된 문서(본문 + 메타데이터)를 Arrow IPC 파일(컬럼 형식)로 저장합니다.
+    읽을 때는 memory-map으로 열어서 CSV 재파싱, HWP/PDF 재추출 없이 바로 문서를 복원합니다.
+    메타데이터는 키/타입을 그대로 보존하도록 문서별 JSON 문자열 컬럼에 저장합니다 (NaN은 None).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def available() -> bool:
+        return pa is not None
+
+    def write(self, documents: List[Document], signature: dict):
+        if pa is None:
+            return
+        columns = {
+            "page_content": pa.array([d.page_content for d in documents], type=pa.large_string()),
+            "metadata": pa.array([_metadata_json(d.metadata) for d in documents], type=pa.large_string()),
+        }
+        table = pa.table(columns).replace_schema_metadata({"signature": json.dumps(signature, ensure_ascii=False)})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        # 압축하지 않아야 memory-map 시 복사 없이 읽을 수 있음
+        with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, self.path)
+
+    def read(self, signature: dict) -> Optional[List[Document]]:
+        """스냅샷이 최신이면 문서 목록, 없거나 오래되었으면 None"""
+        if pa is None or not os.path.exists(self.path):
+            return None
+        try:
+            with pa.memory_map(self.path, "r") as source:
+                reader = ipc.open_file(source)
+                saved = json.loads((reader.schema.metadata or {}).get(b"signature", b"{}"))
+                if saved != signature:
+                    return None
+                table = reader.read_all()
+        except (pa.ArrowInvalid, OSError, ValueError):
+            return None
+
+        contents = table.column("page_content").to_pylist()
+        metadatas = table.column("metadata").to_pylist()
+        return [Document(page_content=content, metadata=json.loads(metadata))
+                for content, metadata in zip(contents, metadatas)]
+
+
+def _json_value(value):
+    """JSON으로 저장할 수 없는 값 정리 (NaN/inf -> None, numpy 스칼라 -> 파이썬 값)"""
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _metadata_json(metadata: dict) -> str:
+    return json.dumps({key: _json_value(value) for key, value in metadata.items()}, ensure_ascii=False,
+                      allow_nan=False, default=str)
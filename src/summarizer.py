@@ -0,0 +1,156 @@
+# @title src/summarizer.py
+import os
+import asyncio
+import random
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from src.manifest import content_hash
+from src.tracing import tracer
+
+
+class SummaryCache:
+    """(내용 해시, 프롬프트 버전, 모델) 키로 요약 결과를 저장하는 SQLite 캐시"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, summary TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, model: str, prompt_version: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, model, prompt_version, summary) VALUES (?, ?, ?, ?)",
+                (key, model, prompt_version, summary),
+            )
+            self._conn.commit()
+
+
+class RFPSummarizer:
+    """
+    문서 요약을 비동기로 동시에 처리합니다.
+    - 동시 요청 수 제한 (asyncio.Semaphore)
+    - 실패 시 지수 백오프 + 지터로 재시도
+    - 요약 결과는 디스크 캐시에 저장되어, 내용이 바뀐 문서만 다시 요약
+    """
+    # 프롬프트를 수정하면 버전을 올려 기존 캐시를 무효화합니다.
+    PROMPT_VERSION = "v1"
+    TEMPLATE = """
+        당신은 공공 입찰 문서 전처리 전문가입니다.
+        아래 문서를 RAG 검색에 최적화되도록 핵심만 요약하세요.
+
+        [필수 포함 정보]
+        1. 문서 파일 형식: 원본 파일의 확장자가 {ext}임을 반드시 명시 (예: "이 문서는 hwp 파일입니다.")
+        2. 사업명: {title}
+        3. 예산 정보: 금액 관련 내용이 있다면 숫자와 단위(원)를 정확히 명시
+        4. 발주 기관: {agency}
+        5. 핵심 요약: 사업의 목적과 주요 과업 내용을 3줄 내외로 요약
+
+        [원본 텍스트 일부]
+        {text}
+
+        [요약 결과]
+        """
+    MAX_INPUT_CHARS = 4000
+
+    def __init__(self, llm, cache_path: str, max_concurrency: int = 8, max_retries: int = 4,
+                 base_delay: float = 1.0):
+        self.llm = llm
+        self.model_name = getattr(llm, "model_name", None) or getattr(llm, "model", "unknown")
+        self.cache = SummaryCache(cache_path)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.chain = ChatPromptTemplate.from_template(self.TEMPLATE) | llm | StrOutputParser()
+        self.stats = {"cached": 0, "generated": 0, "failed": 0}
+
+    def _inputs(self, text: str, meta: dict) -> dict:
+        # 텍스트가 너무 길면 앞부분만 잘라서 요약 (토큰 비용 절약)
+        return {
+            "text": text[:self.MAX_INPUT_CHARS],
+            "title": meta['title'],
+            "agency": meta['agency'],
+            "ext": meta['file_ext'],
+        }
+
+    def cache_key(self, text: str, meta: dict) -> str:
+        inputs = self._inputs(text, meta)
+        return content_hash("|".join([self.PROMPT_VERSION, self.model_name] + [str(inputs[k]) for k in sorted(inputs)]))
+
+    @staticmethod
+    def _fallback(text: str) -> str:
+        return text[:500] + "..."  # 실패 시 원본 앞부분만 반환
+
+    async def _summarize_one(self, semaphore: asyncio.Semaphore, text: str, meta: dict, key: str) -> str:
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with tracer.span("summarize") as span:
+                        summary = await self.chain.ainvoke(self._inputs(text, meta))
+                    # 대체 모델(failover)이 쓴 요약은 캐시하지 않음 (캐시 키의 모델과 다름)
+                    if not span.attrs.get("failover"):
+                        self.cache.put(key, self.model_name, self.PROMPT_VERSION, summary)
+                    self.stats["generated"] += 1
+                    return summary
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        print(f"⚠️ 요약 중 에러 발생 (건너뜀): {meta.get('source', '')} - {e}")
+                        self.stats["failed"] += 1
+                        return self._fallback(text)
+                    # 지수 백오프 + 지터 (429/일시 오류 대응)
+                    await asyncio.sleep(self.base_delay * (2 ** attempt) * (0.5 + random.random()))
+
+    async def asummarize_many(self, items: List[Tuple[str, dict]]) -> List[str]:
+        """
+        :param items: [(본문, 메타데이터), ...]
+        :return: 입력과 같은 순서의 요약 목록
+        """
+        results: List[Optional[str]] = [None] * len(items)
+        pending = []
+        for i, (text, meta) in enumerate(items):
+            if not text or len(text) < 100:  # 너무 짧으면 요약 안 함
+                results[i] = text
+                continue
+            key = self.cache_key(text, meta)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = cached
+                self.stats["cached"] += 1
+            else:
+                pending.append((i, text, meta, key))
+
+        if pending:
+            print(f"📝 요약 생성 {len(pending)}건 (캐시 사용 {len(items) - len(pending)}건, 동시 {self.max_concurrency}개)")
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            summaries = await asyncio.gather(
+                *(self._summarize_one(semaphore, text, meta, key) for _, text, meta, key in pending)
+            )
+            for (i, _, _, _), summary in zip(pending, summaries):
+                results[i] = summary
+        return results
+
+    def summarize_many(self, items: List[Tuple[str, dict]]) -> List[str]:
+        """동기 코드(Streamlit, CLI)에서 호출하는 진입점"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.asummarize_many(items))
+        # 이미 이벤트 루프가 돌고 있으면 별도 스레드에서 실행
+        result = []
+        worker = threading.Thread(target=lambda: result.append(asyncio.run(self.asummarize_many(items))))
+        worker.start()
+        worker.join()
+        return result[0]
@@ -0,0 +1,243 @@
+# @title src/tracing.py
+"""
+파이프라인 단계별 추적 (span) 및 지표.
+- tracer.span("retrieve") 처럼 감싸면 중첩 span(부모/자식)과 소요 시간이 기록됩니다.
+- LLM/임베딩 호출 span에는 토큰 수와 추정 비용(USD)을 붙입니다 (span.add_tokens).
+- 끝난 span은 JSONL로 한 줄씩, 단계별 누적 지표는 Prometheus 텍스트 형식 파일로 내보냅니다.
+- RAG_TRACE_DIR 환경 변수를 지정하면 import 시 그 폴더에 traces.jsonl / metrics.prom을 씁니다.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+import numpy as np
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional
+
+# 모델별 100만 토큰당 가격 (USD, 입력/출력) - 비용은 추정치이며 로컬 모델은 0
+MODEL_PRICES = {
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+# Prometheus 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current_span = contextvars.ContextVar("rag_current_span", default=None)
+
+
+def estimate_cost(model: str, input_tokens: int = 0, output_tokens: int = 0) -> float:
+    price_in, price_out = MODEL_PRICES.get(model or "", (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"], attrs: dict):
+        self.name = name
+        self.parent = parent
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_tokens(self, model: str, input_tokens: int = 0, output_tokens: int = 0):
+        """토큰 수와 추정 비용을 누적합니다 (한 span에서 여러 번 호출 가능)."""
+        self.attrs["model"] = model
+        self.attrs["tokens_in"] = self.attrs.get("tokens_in", 0) + input_tokens
+        self.attrs["tokens_out"] = self.attrs.get("tokens_out", 0) + output_tokens
+        self.attrs["cost_usd"] = self.attrs.get("cost_usd", 0.0) + estimate_cost(model, input_tokens, output_tokens)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name, "start": round(self.start, 6), "duration_ms": round(self.duration_ms or 0.0, 3),
+            "error": self.error, **self.attrs,
+        }
+
+
+class Tracer:
+    """프로세스 공용 추적기 (스레드 안전). 최근 span은 메모리에 남겨 대시보드 지연 시간 분석에 사용합니다."""
+
+    def __init__(self, max_recent: int = 5000):
+        self.jsonl_path = None
+        self.prometheus_path = None
+        self.flush_interval = 5.0
+        self._recent = deque(maxlen=max_recent)
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._count = defaultdict(int)
+        self._sum = defaultdict(float)
+        self._errors = defaultdict(int)
+        self._buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self._tokens = defaultdict(int)  # (단계, 모델, in/out) -> 토큰 수
+        self._cost = defaultdict(float)  # (단계, 모델) -> USD
+
+    def configure(self, jsonl_path: str = None, prometheus_path: str = None, flush_interval: float = 5.0):
+        """내보내기 경로 지정 (None이면 해당 형식은 쓰지 않음)"""
+        for path in (jsonl_path, prometheus_path):
+            if path:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.flush_interval = flush_interval
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        parent = _current_span.get()
+        span = Span(name, parent, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - span._start_perf) * 1000
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 스트리밍 제너레이터가 다른 컨텍스트에서 닫힌 경우
+                _current_span.set(parent)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        record = span.to_dict()
+        seconds = span.duration_ms / 1000
+        with self._lock:
+            self._recent.append(record)
+            self._count[span.name] += 1
+            self._sum[span.name] += seconds
+            if span.error:
+                self._errors[span.name] += 1
+            buckets = self._buckets[span.name]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            model = span.attrs.get("model")
+            if model:
+                self._tokens[(span.name, model, "input")] += span.attrs.get("tokens_in", 0)
+                self._tokens[(span.name, model, "output")] += span.attrs.get("tokens_out", 0)
+                self._cost[(span.name, model)] += span.attrs.get("cost_usd", 0.0)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            flush = (self.prometheus_path and span.parent is None
+                     and time.time() - self._last_flush >= self.flush_interval)
+            if flush:
+                self._last_flush = time.time()
+        if flush:
+            self.write_prometheus()
+
+    def wrap(self, fn):
+        """스레드 풀에 넘길 함수에 현재 span 컨텍스트를 실어 보냅니다 (자식 span이 같은 trace로 묶임)."""
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+    # ---------- 조회 / 내보내기 ----------
+    def recent(self, limit: int = None) -> List[dict]:
+        with self._lock:
+            records = list(self._recent)
+        return records[-limit:] if limit else records
+
+    def stage_summary(self, limit: int = None) -> List[dict]:
+        """최근 span 기준 단계별 호출 수, 평균/p50/p95 지연(ms), 토큰, 비용"""
+        by_stage = defaultdict(list)
+        for record in self.recent(limit):
+            by_stage[record["name"]].append(record)
+        rows = []
+        for name, records in by_stage.items():
+            durations = np.array([r["duration_ms"] for r in records])
+            rows.append({
+                "stage": name, "count": len(records),
+                "mean_ms": round(float(durations.mean()), 1),
+                "p50_ms": round(float(np.percentile(durations, 50)), 1),
+                "p95_ms": round(float(np.percentile(durations, 95)), 1),
+                "total_ms": round(float(durations.sum()), 1),
+                "tokens": sum(r.get("tokens_in", 0) + r.get("tokens_out", 0) for r in records),
+                "cost_usd": round(sum(r.get("cost_usd", 0.0) for r in records), 6),
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def totals(self) -> Dict[str, float]:
+        """프로세스 시작 후 누적 토큰 / 추정 비용"""
+        with self._lock:
+            return {
+                "tokens_in": sum(v for (_, _, kind), v in self._tokens.items() if kind == "input"),
+                "tokens_out": sum(v for (_, _, kind), v in self._tokens.items() if kind == "output"),
+                "cost_usd": sum(self._cost.values()),
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP rag_stage_duration_seconds RAG 파이프라인 단계별 소요 시간",
+            "# TYPE rag_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._count):
+                for bound, count in zip(LATENCY_BUCKETS, self._buckets[name]):
+                    lines.append(f'rag_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'rag_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {self._count[name]}')
+                lines.append(f'rag_stage_duration_seconds_sum{{stage="{name}"}} {self._sum[name]:.6f}')
+                lines.append(f'rag_stage_duration_seconds_count{{stage="{name}"}} {self._count[name]}')
+            lines += ["# HELP rag_stage_errors_total 단계별 오류 수", "# TYPE rag_stage_errors_total counter"]
+            lines += [f'rag_stage_errors_total{{stage="{name}"}} {count}' for name, count in sorted(self._errors.items())]
+            lines += ["# HELP rag_tokens_total LLM/임베딩 토큰 수", "# TYPE rag_tokens_total counter"]
+            lines += [f'rag_tokens_total{{stage="{name}",model="{model}",kind="{kind}"}} {count}'
+                      for (name, model, kind), count in sorted(self._tokens.items())]
+            lines += ["# HELP rag_cost_usd_total 추정 비용 (USD)", "# TYPE rag_cost_usd_total counter"]
+            lines += [f'rag_cost_usd_total{{stage="{name}",model="{model}"}} {cost:.8f}'
+                      for (name, model), cost in sorted(self._cost.items())]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = None):
+        """node_exporter textfile collector 등에서 읽을 수 있게 원자적으로 씁니다."""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._reset_metrics()
+
+
+tracer = Tracer()
+if os.getenv("RAG_TRACE_DIR"):
+    tracer.configure(jsonl_path=os.path.join(os.getenv("RAG_TRACE_DIR"), "traces.jsonl"),
+                     prometheus_path=os.path.join(os.getenv("RAG_TRACE_DIR"), "metrics.prom"))
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: str):
+    """함수 전체를 span으로 감싸는 데코레이터"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
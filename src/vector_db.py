@@ -2,35 +2,158 @@
 import os
 import shutil
 import time
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
-from typing import List
+from typing import List, Tuple
 from langchain_core.documents import Document
+from src.manifest import IngestManifest
+from src.chunking import HierarchicalChunker
+from src.llm_gateway import gateway
+from src.tracing import traced, tracer
+from src.embedding_cache import CachedEmbeddings
+from src.local_embeddings import LocalEmbeddings
+from src.mmap_vector_store import MmapVectorStore
+
+
+def _openai_embeddings(model_name: str, quantize):
+    return gateway.embeddings(model_name)
+
+
+def _local_embeddings(model_name: str, quantize):
+    return LocalEmbeddings(model_name, quantize=quantize)
+
+
+# 임베딩 백엔드: 이름 -> (기본 모델, 생성 함수, 캐시 동시 요청 수)
+# 로컬 모델은 내부에서 여러 스레드로 추론하므로 캐시 래퍼에서 배치를 동시에 보내지 않음
+EMBEDDING_BACKENDS = {
+    "openai": ("text-embedding-3-small", _openai_embeddings, 4),
+    "local": (LocalEmbeddings.DEFAULT_MODEL, _local_embeddings, 1),
+}
+
+class BatchChroma(Chroma):
+    """Chroma + 질문 벡터 여러 개 일괄 검색 (MmapVectorStore와 같은 메서드, 일괄 질의응답용)"""
+
+    def similarity_search_by_vectors_with_score(self, embeddings, k: int = 4,
+                                                filter: dict = None) -> List[List[Tuple[Document, float]]]:
+        """질문별 [(문서, 거리)] - 컬렉션 query 한 번으로 모든 질문 검색"""
+        if not len(embeddings):
+            return []
+        result = self._collection.query(query_embeddings=[list(map(float, v)) for v in embeddings], n_results=k,
+                                        where=filter, include=["documents", "metadatas", "distances"])
+        return [
+            [(Document(id=doc_id, page_content=text, metadata=meta or {}), dist)
+             for doc_id, text, meta, dist in zip(result["ids"][j], result["documents"][j],
+                                                 result["metadatas"][j], result["distances"][j])]
+            for j in range(len(embeddings))
+        ]
+
+    def apply_changes(self, delete_ids: List[str], documents: List[Document], ids: List[str]):
+        """매니페스트 증분 갱신: 오래된 청크 삭제 + 새 청크 추가"""
+        if delete_ids:
+            self.delete(ids=delete_ids)
+        if documents:
+            self.add_documents(documents, ids=ids)
+
+
+# 벡터 저장소 백엔드 (둘 다 persist_directory/embedding_function 생성자, from_documents, add_documents/delete(ids),
+# apply_changes(증분 갱신), similarity_search_by_vectors_with_score(일괄 검색) 지원)
+VECTOR_BACKENDS = {
+    "chroma": BatchChroma,
+    "mmap": MmapVectorStore,  # 프로세스 내장 memory-map 색인 (IVF + int8 + 정확 재채점)
+}
 
 
 class RFPVectorDB:
-    def __init__(self, db_path: str = "./chroma_db"):
+    EMBEDDING_MODEL = EMBEDDING_BACKENDS["openai"][0]
+
+    def __init__(self, db_path: str = "./chroma_db", cache_dir: str = None, embedding_backend: str = "openai",
+                 embedding_model: str = None, quantize: bool = None, vector_backend: str = "chroma",
+                 chunker: HierarchicalChunker = None):
+        """
+        :param vector_backend: "chroma" 또는 "mmap"
+        :param embedding_backend: "openai" 또는 "local"(CPU 로컬 모델, 네트워크 호출 없음)
+        :param embedding_model: 백엔드 기본 모델 대신 사용할 모델명/경로
+        :param quantize: 로컬 모델 int8 동적 양자화 (None이면 LOCAL_EMBEDDING_QUANTIZE 환경 변수)
+        :param chunker: 자식(검색용)/부모(반환용) 청크 분할기 (기본값 HierarchicalChunker())
+        """
         self.db_path = db_path
-        self.embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+        self.vector_backend = vector_backend
+        self.store_cls = VECTOR_BACKENDS[vector_backend]
+        # 임베딩 캐시는 DB 폴더가 삭제되어도 유지되도록 DB 폴더 밖(기본: 같은 위치의 .cache)에 둡니다.
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), ".cache")
+        default_model, factory, max_workers = EMBEDDING_BACKENDS[embedding_backend]
+        underlying = factory(embedding_model or default_model, quantize)
+        self.embedding_backend = embedding_backend
+        # 캐시/매니페스트용 모델 식별자 (로컬 모델은 경로 + 양자화 여부)
+        self.embedding_model_name = getattr(underlying, "model_id", None) or embedding_model or default_model
+        self.embedding_model = CachedEmbeddings(
+            underlying,
+            model_name=self.embedding_model_name,
+            cache_path=os.path.join(self.cache_dir, "embeddings.sqlite"),
+            max_workers=max_workers,
+        )
+        self.chunker = chunker or HierarchicalChunker()
         self.vector_store = None
+        self.manifest = IngestManifest.load(db_path)
+
+    def _config(self) -> dict:
+        # 청킹/임베딩 설정이 바뀌면 기존 청크를 재사용할 수 없으므로 전체 재구축
+        return {
+            **self.chunker.config(),
+            "embedding_backend": self.embedding_backend,
+            "embedding_model": self.embedding_model_name,
+            "vector_backend": self.vector_backend,
+        }
+
+    def _check_store(self):
+        """기존 DB를 만든 임베딩 모델/저장소 백엔드(매니페스트 기록)와 현재 설정이 다르면 열 수 없으므로 중단"""
+        if not self.manifest.exists():
+            return
+        store_backend = self.manifest.config.get("vector_backend", "chroma")
+        if store_backend != self.vector_backend:
+            raise ValueError(
+                f"벡터 DB가 다른 저장소 백엔드({store_backend})로 구축되었습니다. "
+                f"현재 설정({self.vector_backend})으로 DB를 다시 구축하세요."
+            )
+        built_with = (self.manifest.config.get("embedding_backend", "openai"), self.manifest.config.get("embedding_model"))
+        if built_with != (self.embedding_backend, self.embedding_model_name):
+            raise ValueError(
+                f"벡터 DB가 다른 임베딩 모델로 구축되었습니다 ({built_with[0]}: {built_with[1]}). "
+                f"현재 설정({self.embedding_backend}: {self.embedding_model_name})으로 DB를 다시 구축하세요."
+            )
+
+    def _split(self, doc: Document):
+        """문서 하나를 자식 청크로 나눕니다. (청크 id는 doc_id#순번, 부모 섹션은 metadata["parent_id"])"""
+        chunks = self.chunker.split(doc)[0]
+        return chunks, [chunk.metadata["chunk_id"] for chunk in chunks]
 
-    def create_vector_db(self, documents: List[Document], force_rebuild: bool = False):
+    @traced("index")
+    def create_vector_db(self, documents: List[Document], force_rebuild: bool = False, incremental: bool = True):
+        """
+        :param force_rebuild: True면 기존 DB를 지우고 문서 목록으로 전부 다시 구축합니다.
+        :param incremental: True면 기존 DB를 열 때 매니페스트를 비교해 신규/변경 문서만 임베딩하고
+                            삭제된 문서는 제거합니다 (매니페스트의 청킹/임베딩 설정이 현재와 같을 때).
+        """
         # 1. 문서가 하나도 없으면 바로 중단 (에러 방지 핵심)
         if not documents:
             print("🚫 로드된 문서가 없습니다. DB 생성을 중단합니다.")
             return None
 
-        # 2. 기존 DB 로드 시도
+        # 2. 기존 DB 로드 + 증분 갱신 (매니페스트가 있고 설정이 같을 때)
         if os.path.exists(self.db_path) and not force_rebuild:
             print(f"📂 기존 벡터 DB를 불러옵니다.")
-            self.vector_store = Chroma(
+            self._check_store()
+            if self.manifest.exists() and self.manifest.config == self._config():
+                if incremental:
+                    return self._sync_vector_db(documents)
+            elif self.manifest.exists():
+                print("⚠️ 청킹 설정이 DB 구축 때와 다릅니다. 변경 문서를 반영하려면 force_rebuild=True로 다시 구축하세요.")
+            self.vector_store = self.store_cls(
                 persist_directory=self.db_path,
                 embedding_function=self.embedding_model
             )
             return self.vector_store
 
-        # 3. DB 폴더 삭제 및 재생성
+        # 3. DB 폴더 삭제 및 재생성 (전체 재구축)
         if os.path.exists(self.db_path):
             print("🗑️ 기존 DB 폴더 삭제 시도 중...")
             for _ in range(3):
@@ -44,8 +167,16 @@ class RFPVectorDB:
                 print("⚠️ 삭제 실패(파일 사용 중). 덮어쓰기를 시도합니다.")
 
         print("✂️ 문서를 청킹(Chunking) 중입니다...")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        split_docs = text_splitter.split_documents(documents)
+        self.manifest = IngestManifest(self.db_path)
+        self.manifest.config = self._config()
+        split_docs, split_ids = [], []
+        with tracer.span("index.chunk", documents=len(documents)) as span:
+            for doc in documents:
+                chunks, chunk_ids = self._split(doc)
+                split_docs.extend(chunks)
+                split_ids.extend(chunk_ids)
+                self.manifest.record(doc, chunk_ids)
+            span.set(chunks=len(split_docs))
 
         # [방어 코드] 청킹 결과가 비어있으면 중단
         if not split_docs:
@@ -55,9 +186,47 @@ class RFPVectorDB:
         print(f"💾 벡터 DB 생성 및 저장 중... (총 {len(split_docs)} 청크)")
 
         # 여기서 에러가 났던 부분입니다. 이제 split_docs가 있을 때만 실행됩니다.
-        self.vector_store = Chroma.from_documents(
-            documents=split_docs,
-            embedding=self.embedding_model,
-            persist_directory=self.db_path
+        with tracer.span("index.store", chunks=len(split_docs), backend=self.vector_backend):
+            self.vector_store = self.store_cls.from_documents(
+                documents=split_docs,
+                embedding=self.embedding_model,
+                ids=split_ids,
+                persist_directory=self.db_path
+            )
+        self.manifest.save()
+        return self.vector_store
+
+    def _sync_vector_db(self, documents: List[Document]):
+        """매니페스트와 비교해 변경분만 DB에 반영합니다."""
+        self.vector_store = self.store_cls(
+            persist_directory=self.db_path,
+            embedding_function=self.embedding_model
         )
-        return self.vector_store
\ No newline at end of file
+        changed_docs, removed_ids = self.manifest.diff(documents)
+        print(f"🔄 증분 갱신: 신규/변경 {len(changed_docs)}건, 삭제 {len(removed_ids)}건")
+
+        # 1. 삭제된 문서의 청크 제거
+        stale_chunk_ids = []
+        for doc_id in removed_ids:
+            stale_chunk_ids.extend(self.manifest.remove(doc_id))
+
+        # 2. 변경 문서는 기존 청크를 지우고 다시 적재
+        new_docs, new_ids = [], []
+        with tracer.span("index.chunk", documents=len(changed_docs)) as span:
+            for doc in changed_docs:
+                stale_chunk_ids.extend(self.manifest.chunk_ids(doc.metadata["doc_id"]))
+                chunks, chunk_ids = self._split(doc)
+                new_docs.extend(chunks)
+                new_ids.extend(chunk_ids)
+                self.manifest.record(doc, chunk_ids)
+            span.set(chunks=len(new_docs))
+
+        # 3. 삭제 + 추가를 한 번에 (mmap 저장소는 세대 한 번 쓰기)
+        if stale_chunk_ids or new_docs:
+            print(f"💾 변경 청크 반영 중... (삭제 {len(stale_chunk_ids)}, 추가 {len(new_docs)} 청크)")
+            with tracer.span("index.store", chunks=len(new_docs), deleted=len(stale_chunk_ids),
+                             backend=self.vector_backend):
+                self.vector_store.apply_changes(stale_chunk_ids, new_docs, new_ids)
+
+        self.manifest.save()
+        return self.vector_store
@@ -0,0 +1,36 @@
+# @title tests/conftest.py
+import os
+import sys
+
+# `pytest`로 바로 실행해도 src 패키지를 import할 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+from typing import List
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+
+class HashEmbeddings(Embeddings):
+    """텍스트 해시로 만든 고정 난수 벡터 (같은 텍스트 -> 같은 벡터, 네트워크/모델 없음)"""
+    DIM = 16
+
+    def __init__(self):
+        self.embedded = 0  # embed_documents로 임베딩한 텍스트 수
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(self.DIM).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@pytest.fixture
+def hash_embeddings() -> HashEmbeddings:
+    return HashEmbeddings()
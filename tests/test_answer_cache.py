@@ -0,0 +1,52 @@
+# @title tests/test_answer_cache.py
+from typing import List
+from langchain_core.embeddings import Embeddings
+from src.answer_cache import AnswerCache
+
+
+class SameVectorEmbeddings(Embeddings):
+    """모든 질문을 같은 벡터로 (사업명만 다른 질문의 유사도가 매우 높은 상황)"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [1.0, 0.0]
+
+
+def test_exact_hit_after_normalization():
+    cache = AnswerCache()
+    cache.put("A 사업 예산은 얼마인가?", "1억 원", version="v1")
+    assert cache.get("  a 사업   예산은 얼마인가 ", version="v1") == "1억 원"
+    assert cache.get("B 사업 예산은 얼마인가?", version="v1") is None
+
+
+def test_version_change_invalidates():
+    cache = AnswerCache()
+    cache.put("질문", "답변", version="v1")
+    assert cache.get("질문", version="v2") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_semantic_tier_is_opt_in():
+    cache = AnswerCache(embeddings=SameVectorEmbeddings())
+    cache.put("A 사업 예산은?", "A 답변", project="a")
+    assert cache.get("A 사업의 예산 알려줘", project="a") is None
+
+
+def test_semantic_hit_requires_same_project():
+    cache = AnswerCache(embeddings=SameVectorEmbeddings(), semantic=True)
+    cache.put("A 사업 예산은?", "A 답변", project="a")
+    assert cache.get("B 사업 예산은?", project="b") is None
+    assert cache.get("예산은?") is None
+    assert cache.get("A 사업의 예산 알려줘", project="a") == "A 답변"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_lru_eviction():
+    cache = AnswerCache(max_size=2)
+    for i in range(3):
+        cache.put(f"질문 {i}", f"답변 {i}")
+    assert cache.get("질문 0") is None
+    assert cache.get("질문 2") == "답변 2"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,62 @@
+# @title tests/test_bm25_index.py
+import math
+from collections import Counter
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src.bm25_index import BM25Index, BM25IndexRetriever, tokenize
+
+DOCS = [Document(page_content=text, metadata={"doc_id": str(i)}) for i, text in enumerate([
+    "발주기관은 한영대학입니다. 사업 예산은 1억 원",
+    "철도인프라 디지털트윈 플랫폼 구축 사업",
+    "학사정보시스템 구축 사업 과업 범위와 하자보수 기간",
+    "hwp 파일 형식의 제안요청서 v2.0",
+])]
+
+
+def _reference_scores(documents, query, k1=1.5, b=0.75):
+    """BM25 공식을 그대로 계산한 기준값"""
+    tokenized = [Counter(tokenize(d.page_content)) for d in documents]
+    avgdl = sum(sum(c.values()) for c in tokenized) / len(tokenized)
+    scores = []
+    for counts in tokenized:
+        dl, score = sum(counts.values()), 0.0
+        for term, qtf in Counter(tokenize(query)).items():
+            tf = counts.get(term, 0)
+            if not tf:
+                continue
+            df = sum(term in c for c in tokenized)
+            idf = math.log1p((len(documents) - df + 0.5) / (df + 0.5))
+            score += qtf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_korean_bigrams():
+    assert tokenize("발주기관은 HWP v2.0") == ["발주", "주기", "기관", "관은", "hwp", "v2.0"]
+    assert tokenize("및") == ["및"]
+
+
+@pytest.mark.parametrize("query", ["발주기관은 어디인가", "사업 구축", "하자보수 기간은?", "hwp 파일", "없는단어"])
+def test_csr_scores_match_reference(query):
+    index = BM25Index.build(DOCS)
+    np.testing.assert_allclose(index.scores(query), _reference_scores(DOCS, query), rtol=1e-5)
+
+
+def test_top_k_skips_zero_scores():
+    index = BM25Index.build(DOCS)
+    top = index.top_k("디지털트윈 플랫폼", 3)
+    assert [i for i, _ in top] == [1]
+
+
+def test_saved_index_is_reused_until_documents_change(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    retriever = BM25IndexRetriever.from_documents(DOCS, index_dir=index_dir, k=2)
+    reopened = BM25IndexRetriever.from_documents(DOCS, index_dir=index_dir, k=2)
+    assert isinstance(reopened.index.data, np.memmap)
+    assert [d.metadata["doc_id"] for d in reopened.invoke("하자보수 기간")] == \
+           [d.metadata["doc_id"] for d in retriever.invoke("하자보수 기간")]
+
+    changed = DOCS[:3] + [Document(page_content="하자보수 기간 3년", metadata={"doc_id": "9"})]
+    rebuilt = BM25IndexRetriever.from_documents(changed, index_dir=index_dir, k=2)
+    assert rebuilt.invoke("하자보수 기간 3년")[0].metadata["doc_id"] == "9"
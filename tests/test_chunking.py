@@ -0,0 +1,66 @@
+# @title tests/test_chunking.py
+import random
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.chunking import HEADER_SEPARATOR, HierarchicalChunker, ParentDocStore
+
+HEADER = "[[문서 정보]]\n- 파일형식: hwp\n- 사업명: 학사정보시스템 고도화\n- 기관: 한영대학\n- 예산: 130000000"
+WORDS = ["시스템", "구축", "요구사항", "데이터", "연계", "보안", "기능", "사용자", "관리", "제공하여야", "한다", "운영"]
+
+
+def _sample_doc(doc_id: str, seed: int) -> Document:
+    """목차 제목 + 길이가 제각각인 섹션(짧은 항목, 긴 본문)으로 이루어진 제안요청서 모양의 문서"""
+    rng = random.Random(seed)
+    lines = []
+    for major in ["Ⅰ. 사업 개요", "Ⅱ. 제안요청 내용", "Ⅲ. 제안서 작성 요령"]:
+        lines.append(major)
+        for n in range(1, rng.randint(4, 8)):
+            lines.append(f"{n}. 세부 항목 {n}")
+            for _ in range(rng.choice([1, 2, 3, 12])):
+                lines.append("- " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))))
+    body = "\n".join(lines)
+    return Document(page_content=f"{HEADER}{HEADER_SEPARATOR}{body}",
+                    metadata={"doc_id": doc_id, "title": "학사정보시스템 고도화"})
+
+
+def test_fewer_chunks_than_baseline_splitter():
+    docs = [_sample_doc(f"doc{i}.hwp", i) for i in range(20)]
+    baseline = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents(docs)
+    chunker = HierarchicalChunker()
+    children = [c for doc in docs for c in chunker.split(doc)[0]]
+    assert len(children) < len(baseline)
+    # 작은 섹션은 이웃 섹션과 합쳐지므로 문서 끝 조각 외에는 작은 청크가 거의 없음
+    assert sum(len(c.page_content) < chunker.child_size // 4 for c in children) <= len(docs)
+
+
+def test_children_fit_child_size_including_prefix():
+    chunker = HierarchicalChunker(child_size=300, parent_size=1200)
+    children, parents, _ = chunker.split(_sample_doc("a.hwp", 1))
+    assert all(len(c.page_content) <= 300 for c in children)
+    assert all(c.page_content.startswith("학사정보시스템 고도화") for c in children[1:])
+    # 자식 순서대로 이어지는 부모에 속함
+    parent_ids = [p[0] for p in parents]
+    assert [c.metadata["parent_id"] for c in children] == sorted((c.metadata["parent_id"] for c in children),
+                                                                 key=parent_ids.index)
+    assert all(len(text) <= 1200 for _, _, text in parents)
+
+
+def test_header_is_folded_into_first_child():
+    chunker = HierarchicalChunker()
+    doc = _sample_doc("a.hwp", 2)
+    children, parents, header = chunker.split(doc)
+    assert header == HEADER
+    assert children[0].page_content.startswith(HEADER)
+    assert len(children[0].page_content) > len(HEADER) + 1
+    assert all(HEADER not in c.page_content for c in children[1:])
+    # 부모 본문에는 헤더가 없고, 검색 결과로 돌려줄 때 헤더가 앞에 붙음
+    assert all("[[문서 정보]]" not in text for _, _, text in parents)
+    store = ParentDocStore.from_documents([doc], chunker)
+    assert store.parent_document(parents[0][0]).page_content.startswith(HEADER + HEADER_SEPARATOR)
+
+
+def test_header_only_document_keeps_one_parent():
+    doc = Document(page_content=f"{HEADER}{HEADER_SEPARATOR}   ", metadata={"doc_id": "empty.hwp", "title": ""})
+    children, parents, _ = HierarchicalChunker().split(doc)
+    assert [c.page_content for c in children] == [HEADER]
+    assert parents == [("empty.hwp#p0", "", "")]
@@ -0,0 +1,52 @@
+# @title tests/test_context_builder.py
+from langchain_core.documents import Document
+from src.chunking import HEADER_SEPARATOR
+from src.context_builder import ContextBuilder
+
+
+def _doc(doc_id: str, title: str, sentences: list) -> Document:
+    header = f"[[문서 정보]]\n- 사업명: {title}\n- 기관: {title} 발주처\n- 예산: 100000000"
+    return Document(page_content=header + HEADER_SEPARATOR + "\n".join(sentences), metadata={"doc_id": doc_id})
+
+
+DOCS = [
+    _doc("a.hwp", "학사정보시스템 고도화", ["사업 기간은 계약일로부터 6개월이다.", "수강신청 기능을 개선하여야 한다.",
+                                   "보안 취약점 점검을 수행하여야 한다."]),
+    _doc("b.hwp", "재난통합관리시스템", ["재난 문자 발송 기능을 제공하여야 한다.", "사업 기간은 계약일로부터 8개월이다."]),
+]
+
+
+def test_selects_overlapping_sentences_under_budget():
+    # encoding=None: tiktoken 없이 근사 토큰 수 사용 (환경과 무관하게 같은 결과)
+    builder = ContextBuilder(max_tokens=200, encoding=None)
+    context, stats = builder.build("수강신청 기능 개선", DOCS)
+    assert "수강신청 기능을 개선하여야 한다." in context
+    assert "보안 취약점" not in context
+    assert context.startswith("[[문서 정보]]\n- 사업명: 학사정보시스템 고도화")
+    assert stats["tokens"] <= 200
+
+
+def test_headers_never_exceed_budget():
+    docs = [_doc(f"{i}.hwp", f"사업 {i} " + "정보시스템 구축 " * 10, ["본문 문장입니다 사업 기간."]) for i in range(10)]
+    builder = ContextBuilder(max_tokens=150, encoding=None)
+    context, stats = builder.build("사업 기간", docs)
+    assert stats["tokens"] <= 150
+    # 검색 순위가 높은 문서의 헤더가 남고, 낮은 문서의 헤더는 생략
+    assert "사업 0 " in context
+    assert "사업 9 " not in context
+
+
+def test_header_larger_than_budget_is_truncated():
+    doc = _doc("a.hwp", "학사정보시스템 " * 200, ["사업 기간은 6개월이다."])
+    context, stats = ContextBuilder(max_tokens=30, encoding=None).build("사업 기간", [doc])
+    assert stats["tokens"] <= 30
+    assert context.startswith("[[문서 정보]]")
+
+
+def test_paraphrased_query_falls_back_to_leading_sentences():
+    builder = ContextBuilder(max_tokens=200, encoding=None)
+    context, stats = builder.build("언제까지 끝내야 하나요", DOCS)
+    body = context.split(HEADER_SEPARATOR, 1)[1].split("\n\n")[0]
+    assert body.startswith("사업 기간은 계약일로부터 6개월이다.")
+    assert stats["sentences"] > 0
+    assert stats["tokens"] <= 200
@@ -0,0 +1,55 @@
+# @title tests/test_conversation.py
+import pytest
+from langchain_core.documents import Document
+from src.conversation import ConversationStore, clean_condensed, is_followup
+
+
+def _doc(doc_id: str, title: str) -> Document:
+    return Document(page_content="", metadata={"doc_id": doc_id, "title": title})
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("그 사업 예산은?", True),
+    ("해당 용역 기간은 얼마야?", True),
+    ("거기 발주처는?", True),
+    ("예산은?", False),
+    ("차이 사업 비교 자료는?", False),
+    ("차세대 학사정보시스템 구축 사업의 예산은 얼마인가?", False),
+])
+def test_is_followup_uses_pattern_only(query, expected):
+    assert is_followup(query) is expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("학사정보시스템 구축 사업의 예산은 얼마인가요?", "학사정보시스템 구축 사업의 예산은 얼마인가요?"),
+    ("'학사정보시스템 구축 사업의 하자보수 기간은?'", "학사정보시스템 구축 사업의 하자보수 기간은?"),
+    ("", None),
+    ("요청하신 사업의 예산은 1억 3천만 원이며, 발주 기관은 한국모의기관입니다.", None),
+    ("학사정보시스템 예산은?\n참고: 이전 대화 기준", None),
+    ("가" * 200 + "?", None),
+])
+def test_clean_condensed(text, expected):
+    assert clean_condensed(text) == expected
+
+
+def test_remember_single_project():
+    store = ConversationStore()
+    store.remember("c1", [_doc("a", "학사정보시스템"), _doc("a", "학사정보시스템")])
+    state = store.get("c1")
+    assert state.doc_ids == ["a"]
+    assert state.condense("그 사업 예산은?") == "학사정보시스템 예산은?"
+
+
+def test_remember_ignores_mixed_projects():
+    store = ConversationStore()
+    store.remember("c1", [_doc("b", "철도인프라 디지털트윈"), _doc("a", "학사정보시스템")])
+    assert store.get("c1") is None
+    store.remember("c1", [_doc("a", "학사정보시스템")])
+    store.remember("c1", [_doc("b", "철도인프라 디지털트윈"), _doc("a", "학사정보시스템")])
+    assert store.get("c1").title == "학사정보시스템"
+
+
+def test_version_change_clears_state():
+    store = ConversationStore()
+    store.remember("c1", [_doc("a", "학사정보시스템")], version="v1")
+    assert store.get("c1", version="v2") is None
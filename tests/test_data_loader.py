@@ -0,0 +1,33 @@
+# @title tests/test_data_loader.py
+from src import data_loader
+
+
+def test_extract_file_cache_is_versioned(tmp_path, monkeypatch):
+    source = tmp_path / "공고문.hwp"
+    source.write_bytes(b"hwp bytes")
+    cache_dir = str(tmp_path / "extracted")
+    calls = []
+    monkeypatch.setitem(data_loader.EXTRACTORS, "hwp", lambda path: calls.append(path) or "본문 v1")
+
+    assert data_loader.extract_file(str(source), "hwp", cache_dir)["status"] == "ok"
+    cached = data_loader.extract_file(str(source), "hwp", cache_dir)
+    assert cached["status"] == "cached" and cached["content"] == "본문 v1"
+    assert len(calls) == 1
+
+    # 추출기 버전이 바뀌면 같은 파일도 다시 추출
+    monkeypatch.setattr(data_loader, "EXTRACTOR_VERSION", data_loader.EXTRACTOR_VERSION + 1)
+    monkeypatch.setitem(data_loader.EXTRACTORS, "hwp", lambda path: "본문 v2")
+    result = data_loader.extract_file(str(source), "hwp", cache_dir)
+    assert result["status"] == "ok" and result["content"] == "본문 v2"
+
+
+def test_failed_extraction_is_reported(tmp_path, monkeypatch):
+    source = tmp_path / "깨진파일.pdf"
+    source.write_bytes(b"%PDF")
+
+    def _fail(path):
+        raise ValueError("broken")
+
+    monkeypatch.setitem(data_loader.EXTRACTORS, "pdf", _fail)
+    result = data_loader.extract_file(str(source), "pdf", str(tmp_path / "extracted"))
+    assert result["status"] == "failed" and "broken" in result["error"]
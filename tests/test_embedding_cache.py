@@ -0,0 +1,60 @@
+# @title tests/test_embedding_cache.py
+from typing import List
+from langchain_core.embeddings import Embeddings
+from src.embedding_cache import CachedEmbeddings
+
+
+class PrefixEmbeddings(Embeddings):
+    """e5처럼 질문/문서에 다른 접두어를 붙이는 가짜 임베딩 (접두어에 따라 벡터가 달라짐)"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        self.calls += 1
+        return [float(len(text)), float(text.startswith("query: "))]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector("passage: " + t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector("query: " + text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+def _cached(tmp_path):
+    underlying = PrefixEmbeddings()
+    return underlying, CachedEmbeddings(underlying, "e5", str(tmp_path / "embeddings.sqlite"))
+
+
+def test_query_and_passage_do_not_share_cache(tmp_path):
+    underlying, cached = _cached(tmp_path)
+    text = "사업 예산"
+    passage = cached.embed_documents([text])[0]
+    query = cached.embed_query(text)
+    assert passage == underlying.embed_documents([text])[0]
+    assert query == underlying.embed_query(text)
+    assert passage != query
+    assert cached.embed_queries([text]) == [query]
+
+
+def test_cache_hits_per_kind(tmp_path):
+    underlying, cached = _cached(tmp_path)
+    cached.embed_documents(["a", "b", "a"])
+    cached.embed_query("a")
+    calls = underlying.calls
+    cached.embed_documents(["a", "b"])
+    cached.embed_query("a")
+    cached.embed_queries(["a"])
+    assert underlying.calls == calls
+    assert cached.stats["misses"] == 3
+
+
+def test_cache_persists_across_instances(tmp_path):
+    _, cached = _cached(tmp_path)
+    query = cached.embed_query("발주 기관")
+    underlying, reopened = _cached(tmp_path)
+    assert reopened.embed_query("발주 기관") == query
+    assert underlying.calls == 0
@@ -0,0 +1,47 @@
+# @title tests/test_engine_registry.py
+import os
+import pytest
+from langchain_core.documents import Document
+from src.engine_registry import EngineRegistry
+
+
+@pytest.fixture
+def registry_factory(tmp_path, monkeypatch):
+    (tmp_path / "DATA").mkdir()
+    (tmp_path / "DATA" / "data_list.csv").write_text("사업명\n", encoding="utf-8")
+    loads, builds = [], []
+
+    def load(self, use_summary=False, use_snapshot=True):
+        loads.append(use_summary)
+        return [Document(page_content="요약" if use_summary else "원문", metadata={"doc_id": "a.hwp"})]
+
+    def build(self, kind, documents, force_rebuild):
+        os.makedirs(self.db_path(kind), exist_ok=True)
+        builds.append((kind, documents[0].page_content, force_rebuild))
+        return object()
+
+    monkeypatch.setattr("src.data_loader.RFPDataLoader.load", load)
+    monkeypatch.setattr(EngineRegistry, "_build", build)
+    return (lambda: EngineRegistry(str(tmp_path))), loads, builds
+
+
+def test_documents_are_cached_per_summary_mode(registry_factory):
+    make, loads, _ = registry_factory
+    registry = make()
+    assert registry.documents()[0].page_content == "원문"
+    assert registry.documents(True)[0].page_content == "요약"
+    registry.documents(), registry.documents(True)
+    assert loads == [False, True]
+
+
+def test_summary_engine_reopens_with_summary_documents(registry_factory):
+    make, _, builds = registry_factory
+    registry = make()
+    registry.rebuild("b", use_summary=True)
+    registry.rebuild("a", use_summary=False)
+    assert registry.use_summary("b") and not registry.use_summary("a")
+
+    # 재시작 후 엔진을 열 때도 DB를 구축한 문서 목록 사용
+    restarted = make()
+    restarted.get("b"), restarted.get("a")
+    assert builds[-2:] == [("b", "요약", False), ("a", "원문", False)]
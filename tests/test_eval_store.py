@@ -0,0 +1,50 @@
+# @title tests/test_eval_store.py
+from src.eval_store import EvalResultStore, dataset_hash
+
+ROWS = [
+    {"source": "a.hwp", "question": "질문1", "ground_truth": "정답1"},
+    {"source": "b.pdf", "question": "질문2", "ground_truth": "정답2"},
+]
+
+
+def _result(row, verdict):
+    return {"질문": row["question"], "정답": row["ground_truth"], "AI 답변": "답변", "결과": verdict}
+
+
+def test_dataset_hash_depends_on_order():
+    assert dataset_hash(ROWS) == dataset_hash([dict(r) for r in ROWS])
+    assert dataset_hash(ROWS) != dataset_hash(ROWS[::-1])
+
+
+def test_resume_from_completed_rows(tmp_path):
+    path = str(tmp_path / "eval" / "results.db")
+    data_hash = dataset_hash(ROWS)
+    store = EvalResultStore(path)
+    run_id = store.start_run(data_hash, {"기본": "key-a"}, len(ROWS))
+    store.put(data_hash, "key-a", 0, "a.hwp", _result(ROWS[0], "정답"))
+
+    # 재시작: 같은 데이터셋 + 엔진 설정이면 같은 run, 완료된 행만 돌려줌
+    reopened = EvalResultStore(path)
+    assert reopened.start_run(data_hash, {"기본": "key-a"}, len(ROWS)) == run_id
+    assert list(reopened.completed(data_hash, "key-a")) == ["질문1"]
+    assert reopened.completed(data_hash, "key-b") == {}
+    assert reopened.start_run(data_hash, {"기본": "key-b"}, len(ROWS)) != run_id
+
+
+def test_load_run_in_dataset_order(tmp_path):
+    store = EvalResultStore(str(tmp_path / "results.db"))
+    data_hash = dataset_hash(ROWS)
+    run_id = store.start_run(data_hash, {"기본": "key-a", "요약": "key-s"}, len(ROWS))
+    store.put(data_hash, "key-a", 1, "b.pdf", _result(ROWS[1], "오답"))
+    store.put(data_hash, "key-a", 0, "a.hwp", _result(ROWS[0], "정답"))
+    store.put(data_hash, "key-s", 0, "a.hwp", _result(ROWS[0], "정답"))
+
+    outcome = store.load_run(run_id)
+    accuracy, results = outcome["기본"]
+    assert accuracy == 50.0
+    assert [(r["source"], r["질문"], r["결과"]) for r in results] == [("a.hwp", "질문1", "정답"),
+                                                                    ("b.pdf", "질문2", "오답")]
+    # 일부만 끝난 엔진도 전체 데이터셋 크기 기준 정확도
+    assert outcome["요약"][0] == 50.0
+    assert store.list_runs()[0]["done"] == {"기본": 2, "요약": 1}
+    assert store.load_run("없는-run") is None
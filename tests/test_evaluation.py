@@ -0,0 +1,54 @@
+# @title tests/test_evaluation.py
+import pandas as pd
+import pytest
+from src.eval_store import EvalResultStore
+from src.evaluation import EvaluationRunner
+
+
+class FakeGenerator:
+    def generate_answer(self, question, use_router=True, use_cache=True):
+        if "실패" in question:
+            raise RuntimeError("generation failed")
+        return f"{question} 답변"
+
+
+class FakeEvaluator:
+    """RFPEvaluator와 같은 속성만 가진 대역 (정답에 '오답'이 들어간 행은 오답 처리)"""
+    backend = "openai"
+    JUDGE_BACKEND = "openai"
+
+    def __init__(self):
+        self.generator = FakeGenerator()
+
+    def _judge_answer(self, question, ground_truth, ai_answer):
+        return "오답" if ground_truth == "오답" else "정답"
+
+    def config_key(self):
+        return "fake"
+
+
+def _dataset(questions):
+    return pd.DataFrame([{"question": q, "ground_truth": gt, "source": "a.hwp"} for q, gt in questions])
+
+
+def test_accuracy_ignores_rows_without_question(tmp_path):
+    dataset = _dataset([("예산은?", "1억"), ("", "빈 행"), ("기관은?", "오답"), ("기간은?", "6개월")])
+    store = EvalResultStore(str(tmp_path / "eval.sqlite"))
+    runner = EvaluationRunner({"openai": 2})
+    accuracy, results = runner.run({"gpt": FakeEvaluator()}, dataset, store=store)["gpt"]
+
+    assert [r["질문"] for r in results] == ["예산은?", "기관은?", "기간은?"]
+    assert accuracy == pytest.approx(200 / 3)
+    run = store.list_runs()[0]
+    assert run["size"] == 3 and run["done"] == {"gpt": 3}
+    assert store.load_run(runner.run_id)["gpt"][0] == pytest.approx(200 / 3)
+
+
+def test_progress_counts_only_finished_rows():
+    dataset = _dataset([("예산은?", "1억"), ("실패하는 질문", "x"), ("기간은?", "6개월")])
+    updates = []
+    with pytest.raises(RuntimeError):
+        EvaluationRunner({"openai": 1}).run({"gpt": FakeEvaluator()}, dataset,
+                                            progress_callback=lambda ratio, msg: updates.append((ratio, msg)))
+    assert [msg for _, msg in updates] == ["채점 중: 1/3", "채점 중: 2/3"]
+    assert updates[-1][0] == pytest.approx(2 / 3)
@@ -0,0 +1,68 @@
+# @title tests/test_generator_streaming.py
+import asyncio
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from src.answer_cache import AnswerCache
+from src.generator import RFPGenerator
+
+ANSWER = "사업 예산은 1억 3천만 원입니다."
+
+
+class FakeRetriever:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("검색 서버 응답 없음")
+        header = "[[문서 정보]]\n- 사업명: 학사정보시스템 고도화"
+        return [Document(page_content=f"{header}\n================\n사업 예산은 1억 3천만 원이다.",
+                         metadata={"doc_id": "a.hwp"})]
+
+
+class FakeGenerator(RFPGenerator):
+    def _create_llm(self):
+        # 공백 단위로 나눠 스트리밍하는 가짜 채팅 모델 (호출마다 같은 답변)
+        return GenericFakeChatModel(messages=iter([AIMessage(content=ANSWER)] * 10))
+
+
+@pytest.fixture
+def generator():
+    generator = FakeGenerator(answer_cache=AnswerCache())
+    generator.hybrid_retriever = FakeRetriever()
+    return generator
+
+
+def test_stream_answer_yields_tokens_and_caches(generator):
+    tokens = list(generator.stream_answer("사업 예산은?"))
+    assert len(tokens) > 1 and "".join(tokens) == ANSWER
+    assert generator.last_ttft is not None
+    assert generator.last_context_stats["tokens"] > 0
+
+    # 같은 질문은 답변 캐시에서 한 번에 (검색/LLM 호출 없음)
+    assert list(generator.stream_answer("사업 예산은?")) == [ANSWER]
+    assert generator.hybrid_retriever.calls == 1
+
+
+def test_answers_with_history_are_not_cached(generator):
+    history = [HumanMessage(content="학사정보시스템 사업 알려줘"), AIMessage(content="학사정보시스템 고도화 사업입니다.")]
+    assert generator.generate_answer("사업 예산은?", chat_history=history) == ANSWER
+    assert generator.answer_cache.get("사업 예산은?", version=generator.store_version) is None
+
+
+def test_astream_answer_matches_stream_answer(generator):
+    async def collect():
+        return [token async for token in generator.astream_answer("사업 예산은?", use_cache=False)]
+
+    tokens = asyncio.run(collect())
+    assert tokens == list(generator.stream_answer("사업 예산은?", use_cache=False))
+    assert len(tokens) > 1
+
+
+def test_stream_answer_reports_errors_as_text(generator):
+    generator.hybrid_retriever = FakeRetriever(fail=True)
+    assert list(generator.stream_answer("사업 예산은?")) == ["오류 발생: 검색 서버 응답 없음"]
@@ -0,0 +1,99 @@
+# @title tests/test_hwp_reader.py
+import io
+import struct
+import zlib
+import pytest
+from src import hwp_reader
+from src.hwp_reader import (HWPTAG_CTRL_HEADER, HWPTAG_LIST_HEADER, HWPTAG_PARA_TEXT, HWPReadError,
+                            _decode_para_text, _iter_records, _iter_section_bytes)
+
+
+def _record(tag_id: int, level: int, data: bytes) -> bytes:
+    if len(data) >= 0xFFF:
+        return struct.pack("<II", tag_id | level << 10 | 0xFFF << 20, len(data)) + data
+    return struct.pack("<I", tag_id | level << 10 | len(data) << 20) + data
+
+
+def _text(value: str, level: int = 0) -> bytes:
+    return _record(HWPTAG_PARA_TEXT, level, value.encode("utf-16-le"))
+
+
+def _cell(row: int, col: int, value: str) -> bytes:
+    return _record(HWPTAG_LIST_HEADER, 2, struct.pack("<8xHH", col, row)) + _text(value, level=3)
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class FakeOle:
+    """olefile.OleFileIO 대역 (FileHeader + BodyText/Section* 스트림)"""
+
+    def __init__(self, streams: dict):
+        self.streams = streams
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def listdir(self):
+        return [name.split("/") for name in self.streams]
+
+    def openstream(self, name):
+        return io.BytesIO(self.streams[name])
+
+
+def _patch_ole(monkeypatch, flags: int, sections: dict):
+    header = b"HWP Document File".ljust(36, b"\0") + struct.pack("<I", flags)
+    streams = {"FileHeader": header, **sections}
+    monkeypatch.setattr(hwp_reader.olefile, "isOleFile", lambda path: True)
+    monkeypatch.setattr(hwp_reader.olefile, "OleFileIO", lambda path: FakeOle(streams))
+
+
+def test_decode_para_text_skips_controls():
+    # 확장 제어(2: 구역 정의)는 8 WCHAR, 탭(9)은 탭 문자로
+    units = [2] + [0] * 7 + [ord("가"), 9] + [0] * 7 + [ord("나"), 13]
+    assert _decode_para_text(struct.pack(f"<{len(units)}H", *units)) == "가\t나"
+
+
+def test_iter_records_across_chunk_boundaries():
+    long_text = "가" * 3000  # 0xFFF 이상 -> 확장 크기 헤더
+    data = _text("첫 문단") + _text(long_text) + _text("끝")
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+    texts = [_decode_para_text(body) for _, _, body in _iter_records(iter(chunks))]
+    assert texts == ["첫 문단", long_text, "끝"]
+
+
+def test_iter_section_bytes_decompresses_stream():
+    data = _text("압축된 본문") * 10000
+    stream = io.BytesIO(_deflate(data))
+    assert b"".join(_iter_section_bytes(stream, compressed=True)) == data
+
+
+def test_extract_text_paragraphs_and_tables(monkeypatch):
+    section0 = (_text("제안요청서") + _record(HWPTAG_CTRL_HEADER, 1, b" lbt")
+                + _cell(0, 0, "사업명") + _cell(0, 1, "학사정보시스템")
+                + _cell(1, 0, "예산") + _cell(1, 1, "1억 원")
+                + _text("과업 범위", level=0))
+    _patch_ole(monkeypatch, flags=0x1, sections={"BodyText/Section1": _deflate(_text("두 번째 구역")),
+                                                 "BodyText/Section0": _deflate(section0)})
+    assert hwp_reader.extract_text("sample.hwp").split("\n") == [
+        "제안요청서", "사업명 | 학사정보시스템", "예산 | 1억 원", "과업 범위", "두 번째 구역",
+    ]
+
+
+@pytest.mark.parametrize("flags", [0x2, 0x4])
+def test_rejects_encrypted_and_distribution_documents(monkeypatch, flags):
+    _patch_ole(monkeypatch, flags=flags, sections={})
+    with pytest.raises(HWPReadError):
+        hwp_reader.extract_text("locked.hwp")
+
+
+def test_rejects_non_ole_file(tmp_path):
+    path = tmp_path / "plain.hwp"
+    path.write_bytes(b"not an ole file")
+    with pytest.raises(HWPReadError):
+        hwp_reader.extract_text(str(path))
@@ -0,0 +1,77 @@
+# @title tests/test_hybrid_fusion.py
+import threading
+import pytest
+from langchain_core.documents import Document
+from src.generator import SimpleHybridRetriever
+
+
+def _doc(chunk_id: str) -> Document:
+    return Document(page_content=chunk_id, metadata={"chunk_id": chunk_id})
+
+
+class ScoredRetriever:
+    """invoke_with_scores를 주는 검색기 (BM25IndexRetriever와 같은 형식)"""
+
+    def __init__(self, results, barrier: threading.Barrier = None):
+        self.results = results
+        self.barrier = barrier
+
+    def invoke_with_scores(self, query):
+        if self.barrier:
+            # 두 검색기가 동시에 실행되지 않으면 여기서 시간 초과
+            self.barrier.wait(timeout=5)
+        return [(_doc(chunk_id), score) for chunk_id, score in self.results]
+
+
+class RankedRetriever:
+    """점수 없이 순위만 주는 검색기"""
+
+    def __init__(self, chunk_ids):
+        self.chunk_ids = chunk_ids
+
+    def invoke(self, query):
+        return [_doc(chunk_id) for chunk_id in self.chunk_ids]
+
+
+class FailingRetriever:
+    def invoke(self, query):
+        raise RuntimeError("down")
+
+
+def _ids(docs):
+    return [d.metadata["chunk_id"] for d in docs]
+
+
+def test_rrf_prefers_documents_found_by_both():
+    bm25 = ScoredRetriever([("a", 9.0), ("b", 5.0), ("c", 1.0)])
+    vector = RankedRetriever(["c", "d", "b"])
+    fused = SimpleHybridRetriever(vector, bm25, top_k=3).invoke("질문")
+    # b, c는 두 검색기 모두에서 나옴 -> 한쪽 1위(a)보다 위, c는 벡터 1위라 b보다 위
+    assert _ids(fused) == ["c", "b", "a"]
+    assert len(fused) == 3
+
+
+def test_weighted_fusion_normalizes_scores():
+    bm25 = ScoredRetriever([("a", 100.0), ("b", 0.0)])
+    vector = ScoredRetriever([("b", 0.9), ("a", 0.1)])
+    retriever = SimpleHybridRetriever(vector, bm25, fusion="weighted", weights=(0.3, 0.7), top_k=2)
+    assert _ids(retriever.invoke("질문")) == ["b", "a"]
+    retriever.weights = (0.7, 0.3)
+    assert _ids(retriever.invoke("질문")) == ["a", "b"]
+
+
+def test_retrievers_run_in_parallel():
+    barrier = threading.Barrier(2)
+    retriever = SimpleHybridRetriever(ScoredRetriever([("a", 1.0)], barrier), ScoredRetriever([("b", 1.0)], barrier))
+    assert sorted(_ids(retriever.invoke("질문"))) == ["a", "b"]
+
+
+def test_failed_retriever_is_skipped():
+    retriever = SimpleHybridRetriever(FailingRetriever(), RankedRetriever(["a", "b"]), top_k=5)
+    assert _ids(retriever.invoke("질문")) == ["a", "b"]
+
+
+def test_fuse_with_precomputed_vector_results():
+    retriever = SimpleHybridRetriever(FailingRetriever(), RankedRetriever(["a", "b"]), top_k=2)
+    fused = retriever.fuse_with_vector_results("질문", [(_doc("b"), -0.1), (_doc("c"), -0.2)])
+    assert _ids(fused)[0] == "b"
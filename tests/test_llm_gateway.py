@@ -0,0 +1,99 @@
+# @title tests/test_llm_gateway.py
+import httpx
+import pytest
+from langchain_core.messages import AIMessage
+from src.llm_gateway import LLMGateway, ModelBudget
+from src.tracing import tracer
+
+
+def _status_error(status: int, retry_after: str = None) -> httpx.HTTPStatusError:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    request = httpx.Request("POST", "http://mock/v1/chat/completions")
+    return httpx.HTTPStatusError("mock", request=request, response=httpx.Response(status, headers=headers,
+                                                                                  request=request))
+
+
+class FakeLLM:
+    """미리 정한 오류를 차례로 던진 뒤 고정 답변을 반환"""
+
+    def __init__(self, answer: str, errors=()):
+        self.answer = answer
+        self.errors = list(errors)
+        self.calls = 0
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return AIMessage(content=self.answer)
+
+    def stream(self, input, config=None, **kwargs):
+        yield self.invoke(input, config, **kwargs)
+
+
+class FakeGateway(LLMGateway):
+    BASE_DELAY = 0.0
+    MAX_DELAY = 0.0
+
+    def __init__(self, clients: dict):
+        super().__init__()
+        self.fakes = clients
+
+    def _create(self, backend, model):
+        return self.fakes[(backend, model)]
+
+
+def test_failover_is_opt_in(monkeypatch):
+    gateway = FakeGateway({})
+    monkeypatch.delenv("LLM_FAILOVER", raising=False)
+    assert gateway.chat("gpt-5-mini").routes == [("openai", "gpt-5-mini")]
+    monkeypatch.setenv("LLM_FAILOVER", "1")
+    assert gateway.chat("gpt-5-mini").routes[1][0] == "ollama"
+    assert gateway.chat("gpt-5", fallback=False).routes == [("openai", "gpt-5")]
+
+
+def test_retries_retryable_errors(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    fake = FakeLLM("답변", errors=[_status_error(503), _status_error(429, retry_after="0")])
+    gateway = FakeGateway({("openai", "gpt-5-mini"): fake})
+    llm = gateway.chat("gpt-5-mini", fallback=False)
+    assert llm.invoke("질문").content == "답변"
+    assert fake.calls == 3
+    stats = gateway.stats()
+    assert stats["openai.retries"] == 2 and stats["openai.rate_limited"] == 1
+
+
+def test_non_retryable_error_is_raised():
+    fake = FakeLLM("답변", errors=[_status_error(400)])
+    gateway = FakeGateway({("openai", "gpt-5-mini"): fake})
+    with pytest.raises(httpx.HTTPStatusError):
+        gateway.chat("gpt-5-mini", fallback=False).invoke("질문")
+    assert fake.calls == 1
+
+
+def test_failover_marks_calling_span(monkeypatch):
+    monkeypatch.setenv("LLM_FAILOVER", "1")
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    primary = FakeLLM("gpt", errors=[_status_error(503)] * (LLMGateway.MAX_RETRIES + 1))
+    fallback = FakeLLM("llama")
+    gateway = FakeGateway({("openai", "gpt-5-mini"): primary, ("ollama", "llama3"): fallback})
+    llm = gateway.chat("gpt-5-mini", fallback=("ollama", "llama3"))
+    with tracer.span("llm.generate") as span:
+        assert "".join(chunk.content for chunk in llm.stream("질문")) == "llama"
+    assert span.attrs["failover"] is True
+    assert gateway.stats()["failovers"] == 1
+
+
+def test_budget_waits_when_requests_exhausted():
+    budget = ModelBudget(requests_per_minute=2, max_concurrency=8)
+    assert budget.try_acquire(10) == 0.0
+    assert budget.try_acquire(10) == 0.0
+    assert budget.try_acquire(10) > 0
+
+
+def test_budget_limits_concurrency():
+    budget = ModelBudget(max_concurrency=1)
+    assert budget.try_acquire(10) == 0.0
+    assert budget.try_acquire(10) > 0
+    budget.release()
+    assert budget.try_acquire(10) == 0.0
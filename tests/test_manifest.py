@@ -0,0 +1,77 @@
+# @title tests/test_manifest.py
+import pytest
+from langchain_core.documents import Document
+from src import vector_db
+from src.manifest import IngestManifest, content_hash
+from src.vector_db import RFPVectorDB
+
+
+def _doc(doc_id: str, text: str) -> Document:
+    return Document(page_content=text, metadata={"doc_id": doc_id, "source": doc_id, "title": doc_id,
+                                                 "content_hash": content_hash(text)})
+
+
+def test_diff_add_change_delete(tmp_path):
+    manifest = IngestManifest(str(tmp_path))
+    manifest.record(_doc("a.hwp", "가"), ["a.hwp#0"])
+    manifest.record(_doc("b.hwp", "나"), ["b.hwp#0", "b.hwp#1"])
+    manifest.save()
+
+    loaded = IngestManifest.load(str(tmp_path))
+    assert loaded.exists() and loaded.version == manifest.version
+    changed, removed = loaded.diff([_doc("a.hwp", "가"), _doc("b.hwp", "나나"), _doc("c.hwp", "다")])
+    assert sorted(d.metadata["doc_id"] for d in changed) == ["b.hwp", "c.hwp"]
+    assert removed == []
+
+    changed, removed = loaded.diff([_doc("a.hwp", "가")])
+    assert changed == [] and removed == ["b.hwp"]
+    assert loaded.remove("b.hwp") == ["b.hwp#0", "b.hwp#1"]
+    assert loaded.version != manifest.version
+
+
+@pytest.fixture
+def embeddings(monkeypatch, hash_embeddings):
+    fake = hash_embeddings
+    monkeypatch.setitem(vector_db.EMBEDDING_BACKENDS, "fake", ("hash-16", lambda model, quantize: fake, 1))
+    return fake
+
+
+def _chunk_docs(store) -> set:
+    return {d.metadata["doc_id"] for d in store.similarity_search("본문", k=100)}
+
+
+def _db(tmp_path) -> RFPVectorDB:
+    return RFPVectorDB(db_path=str(tmp_path / "db"), cache_dir=str(tmp_path / "cache"), embedding_backend="fake",
+                       vector_backend="mmap")
+
+
+def test_normal_load_syncs_changes(tmp_path, embeddings):
+    # main.py처럼 force_rebuild=False로 열어도 신규/변경/삭제 문서가 반영됨
+    docs = [_doc(f"{i}.hwp", f"{i}번 사업 본문 " * 20) for i in range(3)]
+    store = _db(tmp_path).create_vector_db(docs, force_rebuild=False)
+    assert _chunk_docs(store) == {"0.hwp", "1.hwp", "2.hwp"}
+
+    first = embeddings.embedded
+    store = _db(tmp_path).create_vector_db([docs[0], _doc("1.hwp", "1번 사업 변경된 본문 " * 20),
+                                            _doc("3.hwp", "3번 사업 본문 " * 20)], force_rebuild=False)
+    assert _chunk_docs(store) == {"0.hwp", "1.hwp", "3.hwp"}
+    # 변경/신규 문서만 다시 임베딩
+    assert 0 < embeddings.embedded - first < first
+    assert set(IngestManifest.load(str(tmp_path / "db")).entries) == {"0.hwp", "1.hwp", "3.hwp"}
+
+    # 바뀐 것이 없으면 임베딩 없이 그대로 열림
+    second = embeddings.embedded
+    store = _db(tmp_path).create_vector_db([docs[0]], force_rebuild=False)
+    assert _chunk_docs(store) == {"0.hwp"}
+    assert embeddings.embedded == second
+
+
+def test_force_rebuild_replaces_db(tmp_path, embeddings):
+    docs = [_doc(f"{i}.hwp", f"{i}번 사업 본문 " * 20) for i in range(3)]
+    _db(tmp_path).create_vector_db(docs, force_rebuild=False)
+    stale = tmp_path / "db" / "stale.txt"
+    stale.write_text("x")
+    store = _db(tmp_path).create_vector_db(docs[:1], force_rebuild=True)
+    assert not stale.exists()
+    assert _chunk_docs(store) == {"0.hwp"}
+    assert set(IngestManifest.load(str(tmp_path / "db")).entries) == {"0.hwp"}
@@ -0,0 +1,101 @@
+# @title tests/test_mmap_vector_store.py
+import json
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src.mmap_vector_store import MmapVectorStore
+
+
+def test_add_search_delete(tmp_path, hash_embeddings):
+    store = MmapVectorStore(str(tmp_path / "db"), hash_embeddings)
+    store.add_texts(["가", "나", "다"], metadatas=[{"doc_id": "a"}, {"doc_id": "b"}, {"doc_id": "a"}],
+                    ids=["1", "2", "3"])
+    doc, distance = store.similarity_search_with_score("나", k=1)[0]
+    assert doc.id == "2" and distance == pytest.approx(0.0, abs=1e-5)
+
+    store.delete(["2"])
+    reopened = MmapVectorStore(str(tmp_path / "db"), hash_embeddings)
+    assert [d.id for d in reopened.similarity_search("나", k=3)] == [d.id for d in store.similarity_search("나", k=3)]
+    assert "2" not in {d.id for d in reopened.similarity_search("나", k=3)}
+
+
+def test_refuses_chroma_directory(tmp_path, hash_embeddings):
+    (tmp_path / "chroma.sqlite3").write_bytes(b"")
+    with pytest.raises(ValueError):
+        MmapVectorStore(str(tmp_path), hash_embeddings)
+
+
+def test_filtered_search_is_not_limited_by_ivf_probes(tmp_path, monkeypatch, hash_embeddings):
+    monkeypatch.setattr(MmapVectorStore, "IVF_MIN_VECTORS", 64)
+    texts = [f"청크 {i}" for i in range(400)]
+    # 필터 대상 문서는 몇 개뿐이라 질문과 가까운 군집에 없을 수 있음
+    metadatas = [{"doc_id": "target" if i % 100 == 0 else f"d{i % 7}"} for i in range(400)]
+    store = MmapVectorStore(str(tmp_path / "db"), hash_embeddings, nprobe=1)
+    store.add_texts(texts, metadatas=metadatas, ids=[str(i) for i in range(400)])
+    assert store._data.centroids is not None
+
+    for query in ["청크 1", "청크 250", "질문"]:
+        results = store.similarity_search(query, k=4, filter={"doc_id": "target"})
+        assert sorted(d.id for d in results) == ["0", "100", "200", "300"]
+
+
+def test_apply_changes_writes_once_and_keeps_centroids(tmp_path, monkeypatch, hash_embeddings):
+    monkeypatch.setattr(MmapVectorStore, "IVF_MIN_VECTORS", 64)
+    store = MmapVectorStore(str(tmp_path / "db"), hash_embeddings)
+    store.add_texts([f"청크 {i}" for i in range(200)], ids=[str(i) for i in range(200)])
+    centroids = np.array(store._data.centroids)
+
+    writes = []
+    original = MmapVectorStore._write
+    monkeypatch.setattr(MmapVectorStore, "_write", lambda self, *a, **kw: writes.append(1) or original(self, *a, **kw))
+    docs = [Document(page_content=f"새 청크 {i}", metadata={"doc_id": "new"}) for i in range(5)]
+    store.apply_changes(["0", "1", "2"], docs, [f"n{i}" for i in range(5)])
+
+    assert len(writes) == 1
+    assert len(store._data.ids) == 202
+    # 증분 추가는 기존 군집 중심에 배정 (재학습 없음), 새 문서도 검색됨
+    np.testing.assert_array_equal(store._data.centroids, centroids)
+    assert store.similarity_search("새 청크 3", k=1)[0].id == "n3"
+    assert "0" not in store._data.id_index
+
+
+def test_keeps_previous_generation_until_next_write(tmp_path, hash_embeddings):
+    db = tmp_path / "db"
+    store = MmapVectorStore(str(db), hash_embeddings)
+    generations = []
+    for i in range(3):
+        store.add_texts([f"문서 {i}"], ids=[str(i)])
+        generations.append((db / "CURRENT").read_text())
+    remaining = sorted(p.name for p in db.iterdir() if p.name.startswith("gen-"))
+    assert remaining == sorted(generations[1:])
+
+
+def test_records_are_memory_mapped_and_read_lazily(tmp_path, hash_embeddings):
+    db = tmp_path / "db"
+    store = MmapVectorStore(str(db), hash_embeddings)
+    store.add_texts(["가나다", "라마바"], metadatas=[{"doc_id": "a", "budget": 1}, {"doc_id": "b"}], ids=["1", "2"])
+    current = db / (db / "CURRENT").read_text()
+    assert not (current / "records.jsonl").exists()
+
+    reopened = MmapVectorStore(str(db), hash_embeddings)
+    assert [d.page_content for d in reopened.get_by_ids(["2", "1"])] == ["라마바", "가나다"]
+    assert reopened.get_by_ids(["1"])[0].metadata == {"doc_id": "a", "budget": 1}
+    assert [d.id for d in reopened.similarity_search("가나다", k=2, filter={"doc_id": "b"})] == ["2"]
+
+
+def test_reads_previous_records_format(tmp_path, hash_embeddings):
+    db = tmp_path / "db"
+    store = MmapVectorStore(str(db), hash_embeddings)
+    store.add_texts(["가나다"], metadatas=[{"doc_id": "a"}], ids=["1"])
+    # 이전 형식(records.jsonl) 세대로 바꿔 씀
+    current = db / (db / "CURRENT").read_text()
+    for name in ["ids.json", "texts.bin", "texts.bin.idx.npy", "metadata.bin", "metadata.bin.idx.npy"]:
+        (current / name).unlink()
+    (current / "records.jsonl").write_text(
+        json.dumps({"id": "1", "text": "가나다", "metadata": {"doc_id": "a"}}, ensure_ascii=False) + "\n",
+        encoding="utf-8")
+
+    reopened = MmapVectorStore(str(db), hash_embeddings)
+    assert reopened.similarity_search("가나다", k=1)[0].page_content == "가나다"
+    reopened.add_texts(["라마바"], ids=["2"])
+    assert sorted(d.page_content for d in reopened.get_by_ids(["1", "2"])) == ["가나다", "라마바"]
@@ -0,0 +1,70 @@
+# @title tests/test_query_router.py
+import pytest
+from langchain_core.documents import Document
+from src.query_router import MetadataQueryRouter, detect_intent
+
+TITLE = "차세대 학사정보시스템 구축 사업"
+SOURCE = "한영대학_차세대 학사정보시스템 구축.hwp"
+
+
+@pytest.fixture
+def router():
+    docs = [
+        Document(page_content="", metadata={"doc_id": "a", "title": TITLE, "agency": "한영대학",
+                                            "budget": 130000000, "source": SOURCE, "file_ext": "hwp"}),
+        Document(page_content="", metadata={"doc_id": "b", "title": "철도인프라 디지털트윈 플랫폼 구축",
+                                            "agency": "국가철도공단", "budget": 520000000,
+                                            "source": "국가철도공단_디지털트윈.pdf", "file_ext": "pdf"}),
+    ]
+    return MetadataQueryRouter(docs)
+
+
+@pytest.mark.parametrize("question, expected", [
+    (f"{TITLE}의 예산은 얼마인가?", ("budget", TITLE)),
+    (f"{TITLE}의 발주 기관은 어디인가?", ("agency", TITLE)),
+    (f"'{SOURCE}' 문서의 파일 확장자는 무엇인가?", ("file_ext", SOURCE)),
+    (f"{TITLE}의 사업 예산은 얼마인가요?", ("budget", TITLE)),
+    (f"{TITLE}의 발주처는 어디야?", ("agency", TITLE)),
+    # 사업명 안의 키워드는 사업명으로 취급
+    ("예산 관리 시스템 구축의 예산은 얼마인가?", ("budget", "예산 관리 시스템 구축")),
+])
+def test_detect_intent_full_question(question, expected):
+    assert detect_intent(question) == expected
+
+
+@pytest.mark.parametrize("question", [
+    f"{TITLE}의 예산 중 인건비 비율은?",
+    f"{TITLE} 사업의 예산 집행 일정은?",
+    f"{TITLE}의 발주 기관 담당자 연락처는?",
+    f"{TITLE}에서 요구하는 제출 파일 형식은?",
+    f"{TITLE}의 예산은 얼마이고 기간은 언제인가?",
+    "예산은 얼마인가?",
+    "사업 예산",
+])
+def test_detect_intent_rejects_other_questions(question):
+    assert detect_intent(question) is None
+
+
+def test_route_record_answers_from_metadata(router):
+    answer, record = router.route_record(f"{TITLE}의 예산은 얼마인가?")
+    assert answer == f"{TITLE}의 사업 예산은 130,000,000원입니다."
+    assert record["doc_id"] == "a"
+
+    answer, _ = router.route_record(f"'{SOURCE}' 문서의 파일 확장자는 무엇인가?")
+    assert "hwp" in answer
+
+
+@pytest.mark.parametrize("question", [
+    f"{TITLE}의 예산 중 인건비 비율은?",
+    f"{TITLE}의 발주 기관 담당자 연락처는?",
+    f"{TITLE}에서 요구하는 제출 파일 형식은?",
+    "없는 사업의 예산은 얼마인가?",
+])
+def test_route_record_falls_back_to_rag(router, question):
+    assert router.route_record(question) == (None, None)
+
+
+def test_mentioned_finds_project_named_in_question(router):
+    assert router.mentioned(f"{TITLE} 과업 범위는?")["doc_id"] == "a"
+    assert router.mentioned("철도인프라 디지털트윈 플랫폼 구축의 하자보수 기간은?")["doc_id"] == "b"
+    assert router.mentioned("시스템 구축 과업 범위는?") is None
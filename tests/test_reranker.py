@@ -0,0 +1,46 @@
+# @title tests/test_reranker.py
+from langchain_core.documents import Document
+from src.reranker import RerankingRetriever
+
+
+class FakeReranker:
+    """본문 길이 역순으로 재순위화, fail_on 질문이면 추론 오류"""
+    model_id = "fake-cross-encoder"
+
+    def __init__(self, load_error: Exception = None, fail_on: str = None):
+        self.load_error = load_error
+        self.fail_on = fail_on
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        if self.load_error:
+            raise self.load_error
+
+    def rerank(self, query, docs, top_n=3):
+        if query == self.fail_on:
+            raise RuntimeError("inference failed")
+        return sorted(docs, key=lambda d: len(d.page_content), reverse=True)[:top_n]
+
+
+DOCS = [Document(page_content="가"), Document(page_content="가나다"), Document(page_content="가나")]
+
+
+def test_reranks_candidates():
+    retriever = RerankingRetriever(None, FakeReranker(), top_n=2)
+    assert [d.page_content for d in retriever.rerank("질문", DOCS)] == ["가나다", "가나"]
+
+
+def test_query_error_falls_back_for_that_query_only():
+    retriever = RerankingRetriever(None, FakeReranker(fail_on="나쁜 질문"), top_n=2)
+    assert retriever.rerank("나쁜 질문", DOCS) == DOCS[:2]
+    assert retriever.enabled
+    assert [d.page_content for d in retriever.rerank("질문", DOCS)] == ["가나다", "가나"]
+
+
+def test_load_error_disables_reranking():
+    reranker = FakeReranker(load_error=FileNotFoundError("no model"))
+    retriever = RerankingRetriever(None, reranker, top_n=2)
+    assert retriever.rerank("질문", DOCS) == DOCS[:2]
+    assert retriever.rerank("질문", DOCS) == DOCS[:2]
+    assert not retriever.enabled and reranker.loads == 1
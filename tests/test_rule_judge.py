@@ -0,0 +1,58 @@
+# @title tests/test_rule_judge.py
+import pytest
+from src.rule_judge import RuleBasedJudge, normalize_agency, parse_amounts
+
+BUDGET_Q = "차세대 학사정보시스템 구축 사업의 예산은 얼마인가?"
+AGENCY_Q = "차세대 학사정보시스템 구축 사업의 발주 기관은 어디인가?"
+EXT_Q = "'한영대학_학사정보시스템.hwp' 문서의 파일 확장자는 무엇인가?"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("사업 예산은 130,000,000원입니다.", [130000000]),
+    ("1억 3천만 원", [130000000]),
+    ("1.3억", [130000000]),
+    ("삼천만원", [30000000]),
+    ("5억 2천만 원 (부가세 포함)", [520000000]),
+    ("1억 2억", [100000000, 200000000]),
+    ("2024년 사업으로 3개 과업", []),
+    ("이 사업은 천안시에서 발주했습니다. 만약 변경되면", []),
+])
+def test_parse_amounts(text, expected):
+    assert parse_amounts(text) == expected
+
+
+def test_normalize_agency():
+    assert normalize_agency("한영대학교") == normalize_agency("(재)한영대학")
+    assert normalize_agency("㈜ 한국모의기관") == normalize_agency("한국모의기관")
+
+
+@pytest.fixture
+def judge():
+    return RuleBasedJudge()
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("사업 예산은 1억 3천만 원입니다.", True),
+    ("예산은 130,000,000원입니다.", True),
+    ("예산은 2억 원입니다.", False),
+    ("문서에서 예산 정보를 찾을 수 없습니다.", False),
+    # 부가세 차이 / 여러 금액은 LLM 채점관에게
+    ("예산은 1억 1,818만 1,818원(부가세 별도)입니다.", None),
+    ("1차 2억 원, 2차 3억 원입니다.", None),
+])
+def test_budget(judge, answer, expected):
+    assert judge.judge(BUDGET_Q, "130000000", answer) is expected
+
+
+def test_agency_and_extension(judge):
+    assert judge.judge(AGENCY_Q, "한영대학", "발주 기관은 한영대학교입니다.") is True
+    assert judge.judge(AGENCY_Q, "한영대학", "발주 기관은 알 수 없습니다.") is False
+    assert judge.judge(AGENCY_Q, "한영대학", "국가철도공단입니다.") is None
+    assert judge.judge(EXT_Q, "hwp", "이 문서는 hwp 파일입니다.") is True
+    assert judge.judge(EXT_Q, "hwp", "이 문서는 pdf 파일입니다.") is False
+
+
+def test_other_questions_go_to_llm(judge):
+    assert judge.judge("차세대 학사정보시스템 구축 사업의 예산 중 인건비 비율은?", "30%", "30%입니다.") is None
+    assert judge.judge(BUDGET_Q, "nan", "1억 원") is None
+    assert judge.stats()["llm"] == 2
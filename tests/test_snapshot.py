@@ -0,0 +1,46 @@
+# @title tests/test_snapshot.py
+import math
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+from src.data_loader import RFPDataLoader
+from src.snapshot import DocumentSnapshot
+
+pytest.importorskip("pyarrow")
+
+SIGNATURE = {"version": "test", "files": []}
+
+
+def test_round_trip_keeps_all_metadata(tmp_path):
+    snapshot = DocumentSnapshot(str(tmp_path / "documents.arrow"))
+    docs = [
+        Document(page_content="본문 1", metadata={"doc_id": "a.hwp", "title": "사업", "budget": 130000000.0,
+                                                "pages": 12, "is_summary": False, "notice_id": None}),
+        Document(page_content="본문 2", metadata={"doc_id": "b.pdf", "budget": 0, "extra": "추가 키"}),
+    ]
+    snapshot.write(docs, SIGNATURE)
+    assert snapshot.read(SIGNATURE) == docs
+    assert snapshot.read({**SIGNATURE, "version": "other"}) is None
+
+
+def test_nan_is_stored_as_none(tmp_path):
+    snapshot = DocumentSnapshot(str(tmp_path / "documents.arrow"))
+    snapshot.write([Document(page_content="본문", metadata={"title": math.nan, "budget": float("nan")})], SIGNATURE)
+    assert snapshot.read(SIGNATURE)[0].metadata == {"title": None, "budget": None}
+
+
+def test_loader_snapshot_matches_raw_load(tmp_path):
+    # 사업명/기관/금액이 빈 행 포함 (첨부 파일 없음 -> CSV 텍스트 사용)
+    pd.DataFrame([
+        {"공고 번호": 20241001798, "사업명": "학사정보시스템 고도화", "사업 금액": 130000000, "발주 기관": "한영대학",
+         "파일명": "a.hwp", "텍스트": "본문 가"},
+        {"공고 번호": None, "사업명": None, "사업 금액": None, "발주 기관": None, "파일명": "b.pdf", "텍스트": "본문 나"},
+    ]).to_csv(tmp_path / "data_list.csv", index=False)
+
+    loader = RFPDataLoader(str(tmp_path / "data_list.csv"), cache_dir=str(tmp_path / ".cache"), max_workers=1)
+    raw = loader.load()
+    assert loader.snapshot(False).read(loader._signature(str(tmp_path / "data_list.csv"), False)) is not None
+    cached = loader.load()
+    assert cached == raw
+    assert raw[1].metadata["title"] == "무제" and raw[1].metadata["agency"] == "알수없음"
+    assert "nan" not in raw[1].page_content
@@ -0,0 +1,55 @@
+# @title tests/test_tracing.py
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.tracing import Tracer, current_span, estimate_cost
+
+
+def test_nested_spans_share_trace_and_record_errors(tmp_path):
+    tracer = Tracer()
+    tracer.configure(jsonl_path=str(tmp_path / "traces.jsonl"))
+    with tracer.span("answer", engine="openai"):
+        with tracer.span("retrieve") as child:
+            child.set(documents=3)
+        with pytest.raises(ValueError):
+            with tracer.span("llm.generate"):
+                raise ValueError("boom")
+    assert current_span() is None
+
+    records = {r["name"]: r for r in map(json.loads, (tmp_path / "traces.jsonl").read_text().splitlines())}
+    assert set(records) == {"answer", "retrieve", "llm.generate"}
+    assert {r["trace_id"] for r in records.values()} == {records["answer"]["trace_id"]}
+    assert records["retrieve"]["parent_id"] == records["answer"]["span_id"]
+    assert records["retrieve"]["documents"] == 3 and records["answer"]["engine"] == "openai"
+    assert records["llm.generate"]["error"] == "ValueError: boom"
+
+
+def test_wrap_carries_span_into_worker_threads():
+    tracer = Tracer()
+    with tracer.span("retrieve") as parent, ThreadPoolExecutor(max_workers=2) as pool:
+        def search(name):
+            with tracer.span(f"retrieve.{name}") as span:
+                return span.parent
+
+        parents = list(pool.map(tracer.wrap(search), ["bm25", "vector"]))
+    assert parents == [parent, parent]
+
+
+def test_tokens_cost_and_prometheus_export(tmp_path):
+    tracer = Tracer()
+    with tracer.span("llm.generate") as span:
+        span.add_tokens("gpt-5-mini", 1000, 200)
+        span.add_tokens("gpt-5-mini", 1000, 0)
+    with tracer.span("llm.generate") as span:
+        span.add_tokens("llama3", 500, 50)
+
+    totals = tracer.totals()
+    assert (totals["tokens_in"], totals["tokens_out"]) == (2500, 250)
+    assert totals["cost_usd"] == pytest.approx(estimate_cost("gpt-5-mini", 2000, 200))
+    assert tracer.stage_summary()[0]["count"] == 2
+
+    path = tmp_path / "metrics.prom"
+    tracer.write_prometheus(str(path))
+    text = path.read_text()
+    assert 'rag_stage_duration_seconds_count{stage="llm.generate"} 2' in text
+    assert 'rag_tokens_total{stage="llm.generate",model="gpt-5-mini",kind="input"} 2000' in text
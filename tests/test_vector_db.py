@@ -0,0 +1,45 @@
+# @title tests/test_vector_db.py
+import pytest
+from langchain_core.documents import Document
+from src.mmap_vector_store import MmapVectorStore
+from src.vector_db import BatchChroma
+
+TEXTS = [f"문서 {i} 본문" for i in range(30)]
+METADATAS = [{"doc_id": f"d{i % 3}"} for i in range(30)]
+
+
+@pytest.fixture(params=["chroma", "mmap"])
+def store(request, tmp_path, hash_embeddings):
+    ids = [f"c{i}" for i in range(len(TEXTS))]
+    if request.param == "chroma":
+        store = BatchChroma(collection_name=f"test_{tmp_path.name}", persist_directory=str(tmp_path / "chroma"),
+                            embedding_function=hash_embeddings, collection_metadata={"hnsw:space": "cosine"})
+    else:
+        store = MmapVectorStore(str(tmp_path / "mmap"), hash_embeddings)
+    store.add_texts(TEXTS, metadatas=METADATAS, ids=ids)
+    return store
+
+
+def test_batch_search_matches_single_search(store):
+    queries = ["문서 3 본문", "문서 17 본문", "없는 질문"]
+    vectors = store.embeddings.embed_documents(queries)
+    batched = store.similarity_search_by_vectors_with_score(vectors, k=4)
+    assert len(batched) == len(queries)
+    for vector, results in zip(vectors, batched):
+        assert [d.id for d, _ in results] == [d.id for d in store.similarity_search_by_vector(vector, k=4)]
+    assert batched[0][0][0].id == "c3"
+
+
+def test_batch_search_with_filter(store):
+    vectors = store.embeddings.embed_documents(["문서 3 본문"])
+    results = store.similarity_search_by_vectors_with_score(vectors, k=5, filter={"doc_id": "d1"})[0]
+    assert len(results) == 5
+    assert all(d.metadata["doc_id"] == "d1" for d, _ in results)
+
+
+def test_apply_changes(store):
+    docs = [Document(page_content="새 문서 본문", metadata={"doc_id": "new"})]
+    store.apply_changes(["c0", "c1"], docs, ["n0"])
+    assert store.get_by_ids(["c0", "c1"]) == []
+    assert {d.id: d.page_content for d in store.get_by_ids(["n0", "c2"])} == {"n0": "새 문서 본문", "c2": "문서 2 본문"}
+    assert store.similarity_search("새 문서 본문", k=1)[0].id == "n0"